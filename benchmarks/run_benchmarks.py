@@ -0,0 +1,274 @@
+"""
+Benchmarks: PersonaTwin stages on synthetic populations.
+
+Generates a population per domain and scale (personatwin.synthetic_population)
+and times each benchmark on it:
+
+- merge: PeopleMerging.merge_similar_people
+- risk: PopulationTraceability.calculate_population_risk
+- network: add_social_network
+- end_to_end: PersonaTwinPipeline.process_dataset, with its stage profile
+
+Results are written as JSON and can be compared with a baseline run
+generated with the same settings; the exit status is 1 when a benchmark
+got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scales 10k --output results.json
+    python benchmarks/run_benchmarks.py --scales 10k,100k --domains healthcare \\
+        --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+import personatwin as pt
+from personatwin.privacy import PopulationTraceability
+from personatwin.profiling import Profiler
+from personatwin.social_network import add_social_network
+from personatwin.synthetic_population import generate_population
+
+
+BENCHMARKS = ("merge", "risk", "network", "end_to_end")
+DEFAULT_DOMAINS = [domain for domain in pt.Domain if domain != pt.Domain.CUSTOM]
+NETWORK_LIMIT = 100_000  # Largest population the network benchmark runs on by default
+# Population generation settings; results are only comparable when they match
+GENERATION_SETTINGS = (
+    "seed",
+    "events_per_person",
+    "geography_skew",
+    "shared_event_rate",
+    "shared_event_skew",
+)
+
+
+def parse_scale(text: str) -> int:
+    """Population size from "10k", "1m" or a plain number."""
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def run_population(
+    domain: pt.Domain,
+    n_people: int,
+    benchmarks: List[str],
+    args: argparse.Namespace
+) -> List[Dict]:
+    """Run the selected benchmarks on one generated population."""
+    def population() -> List[pt.Person]:
+        return generate_population(
+            domain,
+            n_people,
+            events_per_person=args.events_per_person,
+            geography_skew=args.geography_skew,
+            shared_event_rate=args.shared_event_rate,
+            shared_event_skew=args.shared_event_skew,
+            seed=args.seed,
+        )
+    
+    people = population()
+    n_events = sum(len(person.events) for person in people)
+    print(f"{domain.value} x {n_people}: {n_events} events", flush=True)
+    
+    results = []
+    personas = None
+    
+    def record(name: str, timing, stages: Optional[List[Dict]] = None) -> None:
+        result = {
+            "domain": domain.value,
+            "people": n_people,
+            "events": n_events,
+            "benchmark": name,
+            **{
+                key: value
+                for key, value in timing.to_dict().items()
+                if key not in ("stage", "iteration", "parent")
+            },
+        }
+        if stages is not None:
+            result["stages"] = stages
+        results.append(result)
+        print(
+            f"  {name:<12} {timing.wall_seconds:9.3f}s wall  {timing.cpu_seconds:9.3f}s CPU",
+            flush=True,
+        )
+    
+    def timed(
+        name: str, items: int, work: Callable, fresh_input: Optional[Callable[[], Any]] = None
+    ):
+        # Best of --repeat runs; fresh_input builds the argument of each run, untimed
+        best = None
+        for _ in range(args.repeat):
+            arguments = (fresh_input(),) if fresh_input is not None else ()
+            profiler = Profiler()
+            with profiler.stage(name, items=items):
+                value = work(*arguments)
+            timing = profiler.profile.stages[-1]
+            if best is None or timing.wall_seconds < best[0].wall_seconds:
+                best = (timing, value)
+        return best
+    
+    if set(benchmarks) & {"merge", "risk", "network"}:
+        merger = pt.PeopleMerging(min_group_size=5, domain=domain, seed=args.seed)
+        timing, personas = timed("merge", n_people, lambda: merger.merge_similar_people(people))
+        if "merge" in benchmarks:
+            record("merge", timing)
+    
+    if "risk" in benchmarks:
+        calculator = PopulationTraceability(use_census_data=False)
+        timing, _ = timed(
+            "risk", len(personas), lambda: calculator.calculate_population_risk(personas, people)
+        )
+        record("risk", timing)
+    
+    if "network" in benchmarks:
+        if n_people > args.network_limit:
+            print(f"  network      skipped (more than {args.network_limit} people)")
+        else:
+            timing, _ = timed(
+                "network",
+                n_people,
+                lambda: add_social_network(people, personas, random_seed=args.seed),
+            )
+            record("network", timing)
+    
+    if "end_to_end" in benchmarks:
+        config = pt.ProcessingConfig(
+            domain=domain,
+            random_seed=args.seed,
+            use_census_data=False,
+            profile=True,
+        )
+        # The pipeline filters events of the input people in place, so
+        # every run gets a newly generated population (the first reuses people)
+        inputs = iter([people])
+        timing, result = timed(
+            "end_to_end",
+            n_people,
+            lambda run_people: pt.PersonaTwinPipeline(config).process_dataset(run_people),
+            fresh_input=lambda: next(inputs, None) or population(),
+        )
+        record("end_to_end", timing, stages=result.profile.to_dict()["stages"])
+    
+    return results
+
+
+def compare(
+    results: List[Dict], baseline: List[Dict], tolerance: float
+) -> List[Tuple[Dict, float]]:
+    """Print wall-time ratios against the baseline and return the regressions."""
+    key = lambda result: (result["domain"], result["people"], result["benchmark"])
+    previous = {key(result): result for result in baseline}
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for result in results:
+        before = previous.get(key(result))
+        if before is None or not before["wall_seconds"]:
+            continue
+        ratio = result["wall_seconds"] / before["wall_seconds"]
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        name = f"{result['domain']}/{result['people']}/{result['benchmark']}"
+        print(
+            f"{name:<40} {before['wall_seconds']:10.3f} {result['wall_seconds']:10.3f}"
+            f" {ratio:7.2f}{flag}"
+        )
+        if flag:
+            regressions.append((result, ratio))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark PersonaTwin on synthetic populations")
+    parser.add_argument("--domains", default=",".join(d.value for d in DEFAULT_DOMAINS),
+                        help="Comma-separated domains (default: all built-in domains)")
+    parser.add_argument(
+        "--scales", default="10k", help="Comma-separated population sizes, e.g. 10k,100k,1m"
+    )
+    parser.add_argument(
+        "--benchmarks", default=",".join(BENCHMARKS), help="Comma-separated benchmarks"
+    )
+    parser.add_argument("--events-per-person", type=float, default=3.0)
+    parser.add_argument(
+        "--geography-skew", type=float, default=1.0, help="Zipf exponent of county sizes"
+    )
+    parser.add_argument(
+        "--shared-event-rate",
+        type=float,
+        default=0.05,
+        help="Fraction of events shared with others",
+    )
+    parser.add_argument("--shared-event-skew", type=float, default=2.0,
+                        help="Zipf exponent of shared event sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Runs per benchmark; the fastest is kept"
+    )
+    parser.add_argument("--network-limit", type=int, default=NETWORK_LIMIT)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)"
+    )
+    args = parser.parse_args(argv)
+    
+    domains = [pt.Domain(name.strip()) for name in args.domains.split(",")]
+    scales = [parse_scale(scale) for scale in args.scales.split(",")]
+    benchmarks = [name.strip() for name in args.benchmarks.split(",")]
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    
+    settings = {name: getattr(args, name) for name in GENERATION_SETTINGS}
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        baseline_settings = {name: baseline["metadata"].get(name) for name in GENERATION_SETTINGS}
+        if baseline_settings != settings:
+            differences = ", ".join(
+                f"{name}={baseline_settings[name]!r} (now {settings[name]!r})"
+                for name in GENERATION_SETTINGS if baseline_settings[name] != settings[name]
+            )
+            parser.error(f"baseline populations were generated with other settings: {differences}")
+    
+    results = []
+    for n_people in scales:
+        for domain in domains:
+            results.extend(run_population(domain, n_people, benchmarks, args))
+    
+    output = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            **settings,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(output, indent=2))
+    print(f"\nWrote {len(results)} results to {args.output}")
+    
+    if baseline is not None:
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(
+                f"\n{len(regressions)} benchmark(s) slower than the baseline"
+                f" by more than {args.tolerance:.0%}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
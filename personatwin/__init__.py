@@ -14,8 +14,16 @@ Domain-agnostic system supporting:
 """
 
 from personatwin.models import Person, Event, Persona, Demographics, EventPatterns, PrivacyMetadata
-from personatwin.privacy import PrivacyLevel, RiskMetrics, PopulationTraceability
-from personatwin.domains import Domain, DomainConfig, get_domain_config, create_custom_config
+from personatwin.event_store import EventStore, EventView
+from personatwin.privacy import PrivacyLevel, RiskEngine, RiskMetrics, PopulationTraceability
+from personatwin.domains import (
+    Domain,
+    DomainConfig,
+    CompiledDomainConfig,
+    get_domain_config,
+    get_compiled_domain_config,
+    create_custom_config,
+)
 
 # Optional census module
 try:
@@ -31,6 +39,8 @@ try:
         SocialNetworkAnalyzer,
         SocialConnection,
         SocialCircle,
+        SocialGraph,
+        SharedEvent,
         ConnectionType,
         ConnectionStrength,
         add_social_network
@@ -45,11 +55,23 @@ from personatwin.domains import (
     SOCIAL_SERVICES_CONFIG,
     EMPLOYMENT_CONFIG,
 )
-from personatwin.merging import PeopleMerging
+from personatwin.merging import PeopleMerging, GroupingStrategy, MergeTree
 from personatwin.noise import EventNoiseGeneration, NoiseConfig
+from personatwin.rng import RandomStreams
+from personatwin.synthetic_population import generate_population
 from personatwin.pipeline import PersonaTwinPipeline, ProcessingConfig, ProcessingResult
+from personatwin.profiling import (
+    Profiler,
+    PipelineProfile,
+    StageTiming,
+    LoggingSink,
+    JSONFileSink,
+    PrometheusTextfileSink,
+)
 from personatwin.api import (
     create_safe_personas,
+    create_safe_personas_from_file,
+    stream_people,
     personas_to_dataframe,
     personas_to_event_dataframe,
     load_criminal_justice_data,
@@ -69,14 +91,19 @@ __all__ = [
     "Demographics",
     "EventPatterns",
     "PrivacyMetadata",
+    "EventStore",
+    "EventView",
     # Privacy
     "PrivacyLevel",
+    "RiskEngine",
     "RiskMetrics",
     "PopulationTraceability",
     # Domains
     "Domain",
     "DomainConfig",
+    "CompiledDomainConfig",
     "get_domain_config",
+    "get_compiled_domain_config",
     "create_custom_config",
     "CRIMINAL_JUSTICE_CONFIG",
     "HEALTHCARE_CONFIG",
@@ -85,17 +112,29 @@ __all__ = [
     "EMPLOYMENT_CONFIG",
     # Processing
     "PeopleMerging",
+    "GroupingStrategy",
+    "MergeTree",
     "EventNoiseGeneration",
     "NoiseConfig",
+    "RandomStreams",
     "PersonaTwinPipeline",
     "ProcessingConfig",
     "ProcessingResult",
+    "Profiler",
+    "PipelineProfile",
+    "StageTiming",
+    "LoggingSink",
+    "JSONFileSink",
+    "PrometheusTextfileSink",
     # API
     "create_safe_personas",
+    "create_safe_personas_from_file",
+    "stream_people",
     "personas_to_dataframe",
     "personas_to_event_dataframe",
     "load_criminal_justice_data",
     "load_healthcare_data",
     "export_personas",
     "export_privacy_report",
+    "generate_population",
 ]
@@ -0,0 +1,116 @@
+"""
+Aggregation helpers shared by the merging code.
+
+Merging people and events repeatedly needs "most common value", "middle
+value" and "share of each outcome". These helpers compute them in linear
+time with deterministic results:
+
+- mode: most common value; ties go to the value seen first
+- median_high: the upper median (element len // 2 in sorted order)
+- outcome_distribution / outcome_distributions: outcome shares for one
+  event list or for a whole batch of them at once
+"""
+
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+import numpy as np
+
+
+# Below this size sorting (in C) beats selection
+_SELECTION_THRESHOLD = 256
+
+
+def mode(
+    values: Iterable[Hashable], default: Any = None, weights: Optional[Iterable[float]] = None
+) -> Any:
+    """
+    Most common value, or default when there are no values.
+    
+    With weights, each value counts its weight times (e.g. the people a
+    persona stands for). Ties go to the value that appears first, so
+    results do not depend on set or hash ordering.
+    """
+    counts: Counter = Counter()
+    if weights is None:
+        counts.update(values)
+    else:
+        for value, weight in zip(values, weights):
+            counts[value] += weight
+    if not counts:
+        return default
+    # Counter keeps first-seen order and max() keeps the first maximum
+    return max(counts.items(), key=lambda item: item[1])[0]
+
+
+def median_high(values: Sequence[Any]) -> Any:
+    """
+    Upper median: the element at index len // 2 of the sorted values.
+    
+    Small inputs are sorted; larger ones use selection (numpy partition),
+    which is linear in the number of values.
+    """
+    if not values:
+        raise ValueError("median_high() of an empty sequence")
+    middle = len(values) // 2
+    if len(values) <= _SELECTION_THRESHOLD:
+        return sorted(values)[middle]
+    return np.partition(np.array(values, dtype=object), middle)[middle]
+
+
+def outcome_label(outcome: Any) -> str:
+    """Outcome as counted in distributions ("unknown" when missing)."""
+    return str(outcome) if outcome else "unknown"
+
+
+def outcome_distribution(outcomes: Iterable[Any]) -> Dict[str, float]:
+    """Share of each outcome label, in first-seen order."""
+    counts = Counter(outcome_label(outcome) for outcome in outcomes)
+    total = sum(counts.values())
+    return {label: count / total for label, count in counts.items()}
+
+
+def outcome_distributions(batches: Sequence[Sequence[Any]]) -> List[Dict[str, float]]:
+    """
+    Outcome shares for many event lists at once.
+    
+    Labels are coded once for the whole batch and counted with a single
+    bincount, instead of one counting pass per list.
+    
+    Args:
+        batches: One sequence of events (anything with .outcome) per persona
+    
+    Returns:
+        One distribution per batch, as outcome_distribution would give
+    """
+    codes: Dict[str, int] = {}
+    labels: List[str] = []
+    flat: List[int] = []
+    lengths = np.fromiter((len(events) for events in batches), dtype=np.int64, count=len(batches))
+    for events in batches:
+        for event in events:
+            label = outcome_label(event.outcome)
+            code = codes.get(label)
+            if code is None:
+                code = codes[label] = len(labels)
+                labels.append(label)
+            flat.append(code)
+    
+    if not flat:
+        return [{} for _ in batches]
+    
+    owners = np.repeat(np.arange(len(batches)), lengths)
+    pairs = owners * len(labels) + np.array(flat, dtype=np.int64)
+    counts = np.bincount(pairs, minlength=len(batches) * len(labels)).reshape(
+        len(batches), len(labels)
+    )
+    
+    # Keys in first-seen order within each batch, as outcome_distribution
+    ends = np.cumsum(lengths).tolist()
+    distributions = []
+    start = 0
+    for row, end in enumerate(ends):
+        total = end - start
+        seen = dict.fromkeys(flat[start:end])
+        distributions.append({labels[code]: int(counts[row, code]) / total for code in seen})
+        start = end
+    return distributions
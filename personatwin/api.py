@@ -5,10 +5,12 @@ This module provides easy-to-use functions for generating
 privacy-protected personas without dealing with complex configuration.
 """
 
-from typing import List, Optional, Dict, Any, Union
+from typing import Iterator, List, Optional, Dict, Any, Set, Union
+import numpy as np
 import pandas as pd
 
 from personatwin.models import Person, Persona, Demographics, Event
+from personatwin.event_store import EventStore, Interner
 from personatwin.pipeline import PersonaTwinPipeline, ProcessingConfig, ProcessingResult
 from personatwin.privacy import PrivacyLevel
 from personatwin.domains import Domain, DomainConfig, get_domain_config
@@ -67,6 +69,81 @@ def create_safe_personas(
         >>> personas_df = personas_to_dataframe(result.personas)
         >>> personas_df.to_csv("safe_personas.csv", index=False)
     """
+    # Convert data to Person objects
+    people = _convert_to_people(data)
+    
+    config = _build_processing_config(
+        privacy_level, domain, domain_config, target_risk,
+        enable_llm, llm_api_key, use_census_data
+    )
+    
+    # Run pipeline
+    pipeline = PersonaTwinPipeline(config)
+    result = pipeline.process_dataset(people, target_risk)
+    
+    return result
+
+
+def create_safe_personas_from_file(
+    filepath: Union[str, List[str]],
+    privacy_level: Union[str, PrivacyLevel] = "medium",
+    domain: Union[str, Domain] = "custom",
+    domain_config: Optional[DomainConfig] = None,
+    target_risk: float = 0.05,
+    enable_llm: bool = False,
+    llm_api_key: Optional[str] = None,
+    use_census_data: bool = True,
+    chunksize: int = 100_000,
+    compact_events: bool = False,
+) -> ProcessingResult:
+    """
+    Generate privacy-protected personas from event-level CSV/Parquet files.
+    
+    Unlike create_safe_personas, the file is never loaded whole: it is read
+    in chunks of rows and processed partition by partition, so peak memory
+    is bounded by the chunk size rather than the dataset size. Rows for each
+    person must be contiguous (e.g. sorted or partitioned by person_id);
+    a person whose rows are split raises a ValueError.
+    
+    Args:
+        filepath: Path (or list of paths) to .csv or .parquet files
+        chunksize: Rows read per chunk
+        compact_events: Hold events in array-backed EventStores (see event_store)
+        (other arguments as in create_safe_personas)
+        
+    Returns:
+        ProcessingResult with personas and risk metrics
+        
+    Example:
+        >>> result = pt.create_safe_personas_from_file(
+        ...     "court_events_sorted_by_person.csv",
+        ...     privacy_level="high",
+        ...     domain="criminal_justice",
+        ...     chunksize=500_000,
+        ... )
+    """
+    config = _build_processing_config(
+        privacy_level, domain, domain_config, target_risk,
+        enable_llm, llm_api_key, use_census_data
+    )
+    config.compact_events = compact_events
+    
+    pipeline = PersonaTwinPipeline(config)
+    return pipeline.process_partitions(
+        stream_people(filepath, chunksize, compact_events), target_risk
+    )
+
+
+def _build_processing_config(
+    privacy_level: Union[str, PrivacyLevel],
+    domain: Union[str, Domain],
+    domain_config: Optional[DomainConfig],
+    target_risk: float,
+    enable_llm: bool,
+    llm_api_key: Optional[str],
+    use_census_data: bool,
+) -> ProcessingConfig:
+    """Build a ProcessingConfig from the simple API arguments."""
     # Convert privacy level
     if isinstance(privacy_level, str):
         privacy_level = PrivacyLevel(privacy_level.lower())
@@ -75,9 +152,6 @@ def create_safe_personas(
     if isinstance(domain, str):
         domain = Domain(domain.lower())
     
-    # Convert data to Person objects
-    people = _convert_to_people(data)
-    
     # Get domain config
     if domain_config is None:
         domain_config = get_domain_config(domain)
@@ -96,11 +170,87 @@ def create_safe_personas(
         from personatwin.llm_integration import LLMConfig
         config.llm_config = LLMConfig(api_key=llm_api_key)
     
-    # Run pipeline
-    pipeline = PersonaTwinPipeline(config)
-    result = pipeline.process_dataset(people, target_risk)
+    return config
+
+
+def stream_people(
+    filepath: Union[str, List[str]],
+    chunksize: int = 100_000,
+    compact_events: bool = False,
+) -> Iterator[List[Person]]:
+    """
+    Read event-level CSV/Parquet files in chunks and yield batches of people.
     
-    return result
+    Rows for a person must be contiguous across the files (sorted or
+    partitioned by person_id). A person whose rows continue into the next
+    chunk is held back until all of their rows have been read, so every
+    yielded Person is complete. The ids of yielded people are remembered,
+    and rows of a person already yielded raise a ValueError instead of
+    producing a second, partial Person.
+    
+    Args:
+        filepath: Path (or list of paths) to .csv or .parquet files
+        chunksize: Rows read per chunk
+        compact_events: Store each person's events in an EventStore
+        
+    Yields:
+        Lists of Person objects, roughly one chunk of rows each
+    """
+    paths = [filepath] if isinstance(filepath, str) else list(filepath)
+    pending: Optional[pd.DataFrame] = None
+    vocabulary = Interner() if compact_events else None  # Shared by the streamed stores
+    emitted: Set[Any] = set()  # Ids of people already yielded
+    
+    for path in paths:
+        for chunk in _read_chunks(path, chunksize):
+            if 'person_id' not in chunk.columns:
+                raise ValueError("Event-level files must have a 'person_id' column")
+            if chunk.empty:
+                continue
+            
+            if pending is not None:
+                chunk = pd.concat([pending, chunk], ignore_index=True)
+            
+            # The last person may continue in the next chunk
+            ids = chunk['person_id'].to_numpy()
+            tail_start = len(ids)
+            while tail_start > 0 and ids[tail_start - 1] == ids[-1]:
+                tail_start -= 1
+            
+            pending = chunk.iloc[tail_start:]
+            if tail_start > 0:
+                _check_contiguous(ids[:tail_start], emitted)
+                yield _dataframe_to_people(chunk.iloc[:tail_start], compact_events, vocabulary)
+    
+    if pending is not None and not pending.empty:
+        _check_contiguous(pending['person_id'].to_numpy(), emitted)
+        yield _dataframe_to_people(pending, compact_events, vocabulary)
+
+
+def _check_contiguous(ids: np.ndarray, emitted: Set[Any]) -> None:
+    """Record the person ids about to be yielded; raise if one was yielded before."""
+    batch = set(pd.unique(ids).tolist())
+    repeated = batch & emitted
+    if repeated:
+        raise ValueError(
+            f"Rows for person {next(iter(repeated))!r} are not contiguous; "
+            "sort or partition the input by person_id"
+        )
+    emitted |= batch
+
+
+def _read_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read a CSV or Parquet file as DataFrame chunks."""
+    if path.endswith(".parquet") or path.endswith(".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required to stream Parquet files: pip install pyarrow")
+        
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
 
 
 def _convert_to_people(data: Union[List[Person], pd.DataFrame, List[Dict]]) -> List[Person]:
@@ -120,7 +270,11 @@ def _convert_to_people(data: Union[List[Person], pd.DataFrame, List[Dict]]) -> L
     raise ValueError(f"Unsupported data type: {type(data)}")
 
 
-def _dataframe_to_people(df: pd.DataFrame) -> List[Person]:
+def _dataframe_to_people(
+    df: pd.DataFrame,
+    compact_events: bool = False,
+    vocabulary: Optional[Interner] = None
+) -> List[Person]:
     """
     Convert DataFrame to list of Person objects.
     
@@ -130,66 +284,121 @@ def _dataframe_to_people(df: pd.DataFrame) -> List[Person]:
     - event_* columns: event information
     
     Or grouped format with multiple rows per person.
-    """
-    people = []
     
+    Columns are converted once (dates parsed per column, values pulled out
+    as plain lists) and people are cut from contiguous index ranges, rather
+    than walking rows with iterrows.
+    """
     # Check if this is a person-level or event-level DataFrame
     if 'event_id' in df.columns or 'event_type' in df.columns:
         # Event-level data: group by person
         if 'person_id' not in df.columns:
             raise ValueError("DataFrame must have 'person_id' column")
-        
-        for person_id, group in df.groupby('person_id'):
-            # Extract demographics from first row
-            first_row = group.iloc[0]
-            demographics = Demographics(
-                age=first_row.get('age'),
-                gender=first_row.get('gender'),
-                ethnicity=first_row.get('ethnicity'),
-                geography=first_row.get('geography'),
-            )
-            
-            # Extract events
-            events = []
-            for _, row in group.iterrows():
-                if 'event_type' in row and row['event_type']:
-                    event = Event(
-                        event_id=row.get('event_id', ''),
-                        date=pd.to_datetime(row.get('date', pd.Timestamp.now())),
-                        event_type=str(row['event_type']),
-                        outcome=row.get('outcome'),
-                        location=row.get('location'),
-                        details=row.get('details', {}),
-                    )
-                    events.append(event)
-            
-            person = Person(
-                person_id=str(person_id),
-                demographics=demographics,
-                events=events
-            )
-            people.append(person)
+        return _event_rows_to_people(df, compact_events, vocabulary)
     
+    # Person-level data: one row per person
+    ages, genders, ethnicities, geographies = (
+        _column_values(df, name) for name in ('age', 'gender', 'ethnicity', 'geography')
+    )
+    if 'person_id' in df.columns:
+        person_ids = df['person_id'].tolist()
     else:
-        # Person-level data: one row per person
-        for _, row in df.iterrows():
-            demographics = Demographics(
-                age=row.get('age'),
-                gender=row.get('gender'),
-                ethnicity=row.get('ethnicity'),
-                geography=row.get('geography'),
-            )
-            
-            person = Person(
-                person_id=str(row['person_id']) if 'person_id' in row else str(row.name),
-                demographics=demographics,
-                events=[]
+        person_ids = df.index.tolist()
+    
+    return [
+        Person(
+            person_id=str(person_ids[i]),
+            demographics=Demographics(
+                age=ages[i],
+                gender=genders[i],
+                ethnicity=ethnicities[i],
+                geography=geographies[i],
+            ),
+            events=[]
+        )
+        for i in range(len(df))
+    ]
+
+
+def _event_rows_to_people(
+    df: pd.DataFrame,
+    compact_events: bool = False,
+    vocabulary: Optional[Interner] = None
+) -> List[Person]:
+    """Build people from event-level rows, one Person per person_id."""
+    if compact_events and vocabulary is None:
+        vocabulary = Interner()  # One for all the people built here
+    # Sorted person order and row order within each person, as groupby gives
+    codes, person_ids = pd.factorize(df['person_id'], sort=True)
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]  # groupby drops missing person_ids
+    if len(order) == 0:
+        return []
+    sorted_codes = codes[order]
+    boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+    starts = np.r_[0, boundaries]
+    ends = np.r_[boundaries, len(order)]
+    
+    rows = df.iloc[order]
+    ages, genders, ethnicities, geographies = (
+        _column_values(rows, name) for name in ('age', 'gender', 'ethnicity', 'geography')
+    )
+    event_ids = _column_values(rows, 'event_id', '')
+    event_types = _column_values(rows, 'event_type')
+    outcomes = _column_values(rows, 'outcome')
+    locations = _column_values(rows, 'location')
+    details = _column_values(rows, 'details')
+    dates = _parse_dates(rows)
+    has_details = 'details' in rows.columns
+    
+    people = []
+    for start, end in zip(starts, ends):
+        events = (
+            Event(
+                event_id=event_ids[i],
+                date=dates[i],
+                event_type=str(event_types[i]),
+                outcome=outcomes[i],
+                location=locations[i],
+                details=details[i] if has_details else {},
             )
-            people.append(person)
+            for i in range(start, end)
+            if event_types[i]
+        )
+        
+        # Demographics come from the person's first row
+        people.append(Person(
+            person_id=str(person_ids[sorted_codes[start]]),
+            demographics=Demographics(
+                age=ages[start],
+                gender=genders[start],
+                ethnicity=ethnicities[start],
+                geography=geographies[start],
+            ),
+            events=EventStore(events, vocabulary) if compact_events else list(events)
+        ))
     
     return people
 
 
+def _column_values(df: pd.DataFrame, name: str, default: Any = None) -> List[Any]:
+    """Column values as a plain list, or the default repeated if the column is missing."""
+    if name in df.columns:
+        return df[name].tolist()
+    return [default] * len(df)
+
+
+def _parse_dates(df: pd.DataFrame) -> List[Any]:
+    """Parse the date column once for all rows."""
+    if 'date' not in df.columns:
+        return [pd.Timestamp.now()] * len(df)
+    try:
+        return pd.to_datetime(df['date']).tolist()
+    except (ValueError, TypeError):
+        # Mixed formats: fall back to parsing each value on its own
+        return [pd.to_datetime(value) for value in df['date'].tolist()]
+
+
 def personas_to_dataframe(personas: List[Persona]) -> pd.DataFrame:
     """
     Convert personas to pandas DataFrame for easy analysis and export.
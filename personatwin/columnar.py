@@ -0,0 +1,416 @@
+"""
+Columnar persona tables for vectorized risk scoring.
+
+The scoring helpers in privacy.py work on one Persona object at a time.
+For populations of millions of personas this module encodes personas once
+into integer-coded NumPy arrays and computes every weighted risk component
+as array operations:
+
+- PersonaTable: demographics, age, merge count, geography specificity
+  and an event-type bitmask per persona
+- ColumnarRiskScorer: demographic, event pattern, k-anonymity and external
+  linkage risks for a whole table at once
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import math
+import numpy as np
+
+from personatwin.models import Persona
+
+
+# Geography specificity codes and the external linkage risk they carry
+GEO_UNKNOWN = 0
+GEO_COUNTY = 1
+GEO_CITY = 2
+GEO_ADDRESS = 3
+GEO_RISK = np.array([0.0, 0.1, 0.3, 0.5])
+
+# Bits set in each byte value, for NumPy versions without bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Largest event-type sets scored through their subsets (2^size of them)
+_SUBSET_SIZE_LIMIT = 12
+
+
+def geography_specificity(geography: Optional[str]) -> int:
+    """Classify how precisely a geography string locates someone."""
+    if not geography:
+        return GEO_UNKNOWN
+    geo = geography.lower()
+    if "address" in geo or "street" in geo:
+        return GEO_ADDRESS
+    elif "city" in geo:
+        return GEO_CITY
+    elif "county" in geo:
+        return GEO_COUNTY
+    return GEO_UNKNOWN
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Count set bits of each element of an unsigned 64-bit array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+class _Vocabulary:
+    """Assign integer codes to values in first-seen order (None -> -1)."""
+    
+    def __init__(self):
+        self.codes: Dict = {}
+        self.values: List = []
+    
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+@dataclass
+class PersonaTable:
+    """
+    Integer-coded columnar view of a persona population.
+    
+    Codes of -1 mean the value is missing. Ages are stored as float64 with
+    a separate has_age flag so that missing (None) and NaN ages stay distinct.
+    """
+    persona_ids: List[str]
+    gender: np.ndarray  # int32 codes into gender_values
+    ethnicity: np.ndarray  # int32 codes into ethnicity_values
+    age: np.ndarray  # float64, 0.0 where has_age is False
+    has_age: np.ndarray  # bool
+    has_age_range: np.ndarray  # bool
+    merged_from: np.ndarray  # int64
+    geo_code: np.ndarray  # int8 geography specificity (GEO_* constants)
+    event_mask: np.ndarray  # uint64 (n, words) bitmask into event_type_values
+    gender_values: List[str] = field(default_factory=list)
+    ethnicity_values: List[str] = field(default_factory=list)
+    event_type_values: List[str] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.persona_ids)
+    
+    @classmethod
+    def from_personas(cls, personas: List[Persona]) -> 'PersonaTable':
+        """Encode personas into a table in a single pass."""
+        genders = _Vocabulary()
+        ethnicities = _Vocabulary()
+        event_types = _Vocabulary()
+        geo_codes: Dict[Optional[str], int] = {}
+        
+        n = len(personas)
+        gender = np.empty(n, dtype=np.int32)
+        ethnicity = np.empty(n, dtype=np.int32)
+        age = np.zeros(n, dtype=np.float64)
+        has_age = np.zeros(n, dtype=bool)
+        has_age_range = np.zeros(n, dtype=bool)
+        merged_from = np.empty(n, dtype=np.int64)
+        geo_code = np.empty(n, dtype=np.int8)
+        masks: List[int] = []
+        
+        for i, persona in enumerate(personas):
+            demo = persona.demographics
+            gender[i] = genders.encode(demo.gender)
+            ethnicity[i] = ethnicities.encode(demo.ethnicity)
+            if demo.age is not None:
+                has_age[i] = True
+                age[i] = demo.age
+            has_age_range[i] = bool(demo.age_range)
+            merged_from[i] = persona.merged_from
+            
+            geo = demo.geography
+            code = geo_codes.get(geo)
+            if code is None:
+                code = geography_specificity(geo)
+                geo_codes[geo] = code
+            geo_code[i] = code
+            
+            mask = 0
+            for event_type in persona.event_patterns.event_types:
+                mask |= 1 << event_types.encode(event_type)
+            masks.append(mask)
+        
+        words = max(1, math.ceil(len(event_types.values) / 64))
+        event_mask = np.empty((n, words), dtype=np.uint64)
+        for w in range(words):
+            event_mask[:, w] = [(m >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for m in masks]
+        
+        return cls(
+            persona_ids=[p.persona_id for p in personas],
+            gender=gender,
+            ethnicity=ethnicity,
+            age=age,
+            has_age=has_age,
+            has_age_range=has_age_range,
+            merged_from=merged_from,
+            geo_code=geo_code,
+            event_mask=event_mask,
+            gender_values=genders.values,
+            ethnicity_values=ethnicities.values,
+            event_type_values=event_types.values,
+        )
+
+
+@dataclass
+class ColumnarRiskScores:
+    """Per-persona risk components computed over a PersonaTable."""
+    persona_ids: List[str]
+    demographic: np.ndarray
+    event_pattern: np.ndarray
+    k_anonymity: np.ndarray
+    external_linkage: np.ndarray
+    total: np.ndarray
+    
+    def individual_risks(self) -> Dict[str, float]:
+        """Map persona_id -> combined risk."""
+        return dict(zip(self.persona_ids, self.total.tolist()))
+
+
+class ColumnarRiskScorer:
+    """
+    Vectorized equivalent of PopulationTraceability's per-persona scoring.
+    
+    Args:
+        risk_weights: Component weights from PopulationTraceability._get_risk_weights
+        age_tolerance: Years within which ages count as similar
+        chunk_size: Cells of the event-pattern comparison matrix held at once
+    """
+    
+    def __init__(
+        self,
+        risk_weights: Dict[str, float],
+        age_tolerance: int = 5,
+        chunk_size: int = 1 << 22
+    ):
+        self.risk_weights = risk_weights
+        self.age_tolerance = age_tolerance
+        self.chunk_size = chunk_size
+    
+    def score(self, table: PersonaTable) -> ColumnarRiskScores:
+        """Compute all weighted risk components for every persona."""
+        demographic = self.demographic_uniqueness(table)
+        event_pattern = self.event_pattern_uniqueness(table)
+        k_anonymity = 1.0 / np.maximum(table.merged_from, 1)
+        external = self.external_linkage(table)
+        
+        weights = self.risk_weights
+        total = (
+            weights["demographic"] * demographic +
+            weights["event_pattern"] * event_pattern +
+            weights["k_anonymity"] * k_anonymity +
+            weights["external_linkage"] * external
+        )
+        
+        return ColumnarRiskScores(
+            persona_ids=table.persona_ids,
+            demographic=demographic,
+            event_pattern=event_pattern,
+            k_anonymity=k_anonymity,
+            external_linkage=external,
+            total=np.minimum(total, 1.0),
+        )
+    
+    def demographic_uniqueness(self, table: PersonaTable) -> np.ndarray:
+        """1 / number of personas with same gender, ethnicity and similar age."""
+        n = len(table)
+        similar = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return similar.astype(np.float64)
+        
+        # One class per (gender, ethnicity) pair, members grouped by a stable sort
+        class_ids = (table.gender.astype(np.int64) + 1) * (len(table.ethnicity_values) + 1)
+        class_ids += table.ethnicity.astype(np.int64) + 1
+        order = np.argsort(class_ids, kind="stable")
+        boundaries = np.flatnonzero(np.diff(class_ids[order])) + 1
+        tolerance = self.age_tolerance
+        
+        for members in np.split(order, boundaries):
+            has_age = table.has_age[members]
+            ages = table.age[members]
+            nan_age = has_age & np.isnan(ages)
+            known = has_age & ~nan_age
+            unknown_count = int(np.count_nonzero(~has_age))
+            
+            # Unknown ages are similar to everyone; NaN ages only to unknown ages
+            similar[members[~has_age]] = len(members)
+            similar[members[nan_age]] = unknown_count
+            
+            known_ages = np.sort(ages[known])
+            queries = ages[known]
+            within = (
+                np.searchsorted(known_ages, queries + tolerance, side="right") -
+                np.searchsorted(known_ages, queries - tolerance, side="left")
+            )
+            similar[members[known]] = unknown_count + within
+        
+        return 1.0 / np.maximum(similar, 1)
+    
+    def event_pattern_uniqueness(self, table: PersonaTable) -> np.ndarray:
+        """
+        1 / number of personas sharing at least half of the event types.
+        
+        A pattern p of s types counts the personas sharing r = ceil(s / 2)
+        of them. With sup(S) the personas whose pattern contains the type
+        set S, inclusion-exclusion over the subsets S of p gives that
+        count as the sum over |S| = j >= r of (-1)^(j - r) C(j - 1, r - 1)
+        sup(S). sup is tallied by enumerating each pattern's own subsets,
+        so the cost grows with the distinct patterns times 2^s rather than
+        with their square. Patterns whose subsets outnumber the distinct
+        patterns are compared against the others as bitmasks instead.
+        """
+        n = len(table)
+        if n == 0:
+            return np.zeros(0, dtype=np.float64)
+        
+        patterns, inverse, counts = self._unique_patterns(table.event_mask, return_inverse=True)
+        sizes = popcount(patterns).sum(axis=1)
+        n_patterns = len(patterns)
+        
+        # Subsets are keyed by their bitmask when types fit in one word,
+        # else by their type ids (+ 1) packed in ascending order into words
+        limit = min(_SUBSET_SIZE_LIMIT, int(math.log2(n_patterns)) + 1)
+        key_bits = 0 if patterns.shape[1] == 1 else (64 * patterns.shape[1]).bit_length()
+        per_word = 64 // key_bits if key_bits else limit
+        key_words = -(-limit // per_word)
+        
+        enumerated = (sizes > 0) & (sizes <= limit)
+        compared = np.flatnonzero(sizes > limit)
+        similar = np.zeros(n_patterns, dtype=np.float64)
+        if len(compared):
+            similar[compared] = self._count_similar(
+                patterns, sizes, counts, compared, np.arange(n_patterns)
+            )
+            rows = np.flatnonzero(enumerated)
+            similar[rows] = self._count_similar(patterns, sizes, counts, rows, compared)
+        
+        # Type ids of each pattern, ascending
+        bits = np.unpackbits(
+            np.ascontiguousarray(patterns).view(np.uint8), axis=1, bitorder="little"
+        )
+        holders, type_ids = np.nonzero(bits)
+        first_type = np.searchsorted(holders, np.arange(n_patterns))
+        
+        # Every nonempty subset of every enumerated pattern, by size and subset
+        blocks = []  # (patterns, subset size, subset keys)
+        for size in range(1, limit + 1):
+            members = np.flatnonzero(enumerated & (sizes == size))
+            if not len(members):
+                continue
+            types = type_ids[first_type[members][:, None] + np.arange(size)].astype(np.uint64)
+            for subset in range(1, 1 << size):
+                columns = [c for c in range(size) if subset >> c & 1]
+                keys = np.zeros((len(members), key_words), dtype=np.uint64)
+                for position, column in enumerate(columns):
+                    if key_bits:
+                        shift = np.uint64(key_bits * (position % per_word))
+                        keys[:, position // per_word] |= (types[:, column] + np.uint64(1)) << shift
+                    else:
+                        keys[:, 0] |= np.uint64(1) << types[:, column]
+                blocks.append((members, len(columns), keys))
+        if not blocks:
+            return np.where(sizes > 0, 1.0 / np.maximum(similar, 1), 0.0)[inverse]
+        
+        # Personas containing each subset (among enumerated patterns; the
+        # compared ones were counted above)
+        all_keys = np.concatenate([keys for _, _, keys in blocks])
+        if key_words == 1:
+            all_keys = all_keys[:, 0]
+        else:
+            # One byte string per key
+            all_keys = all_keys.view(np.dtype((np.void, 8 * key_words))).ravel()
+        keys, positions = np.unique(all_keys, return_inverse=True)
+        positions = positions.reshape(-1)
+        weights = np.concatenate([counts[members] for members, _, _ in blocks])
+        supersets = np.bincount(positions, weights=weights, minlength=len(keys))
+        
+        start = 0
+        for members, subset_size, subset_keys in blocks:
+            found = supersets[positions[start:start + len(members)]]
+            start += len(members)
+            required = (sizes[members] + 1) // 2
+            coefficient = np.array(
+                [
+                    (
+                        (-1) ** (subset_size - r) * math.comb(subset_size - 1, r - 1)
+                        if subset_size >= r >= 1
+                        else 0
+                    )
+                    for r in range(int(required.max()) + 1)
+                ]
+            )[required]
+            similar[members] += coefficient * found
+        
+        risk = np.where(sizes > 0, 1.0 / np.maximum(similar, 1), 0.0)
+        return risk[inverse]
+    
+    def _count_similar(
+        self,
+        patterns: np.ndarray,
+        sizes: np.ndarray,
+        counts: np.ndarray,
+        rows: np.ndarray,
+        columns: np.ndarray
+    ) -> np.ndarray:
+        """Personas of the column patterns sharing at least half of each row pattern's types."""
+        similar = np.zeros(len(rows), dtype=np.float64)
+        if not len(rows) or not len(columns):
+            return similar
+        candidates = patterns[columns]
+        block = max(1, self.chunk_size // (len(columns) * patterns.shape[1]))
+        for start in range(0, len(rows), block):
+            chunk = rows[start:start + block]
+            overlap = popcount(patterns[chunk][:, None, :] & candidates[None, :, :]).sum(axis=2)
+            matches = overlap >= sizes[chunk, None] * 0.5
+            similar[start:start + len(chunk)] = matches @ counts[columns]
+        return similar
+    
+    def _unique_patterns(self, masks: np.ndarray, return_inverse: bool = False):
+        """Distinct event-type bitmask rows with their counts (and inverse)."""
+        if masks.shape[1] == 1:
+            # A single word sorts far faster as a flat array than as rows
+            result = np.unique(masks[:, 0], return_inverse=return_inverse, return_counts=True)
+            patterns = result[0][:, None]
+        else:
+            result = np.unique(masks, axis=0, return_inverse=return_inverse, return_counts=True)
+            patterns = result[0]
+        if return_inverse:
+            return patterns, result[1].reshape(-1), result[2]
+        return patterns, result[1]
+    
+    def external_linkage(self, table: PersonaTable) -> np.ndarray:
+        """Risk of linking to external data from geography and age specificity."""
+        age_risk = np.where(table.has_age, 0.2, np.where(table.has_age_range, 0.1, 0.0))
+        return np.minimum(0.0 + GEO_RISK[table.geo_code] + age_risk, 1.0)
+    
+    def demographic_concentration(self, table: PersonaTable) -> float:
+        """Mean Herfindahl index of the gender and ethnicity distributions."""
+        def herfindahl(codes: np.ndarray, values: List[str]) -> float:
+            present = [bool(v) for v in values]
+            counts = np.bincount(codes[codes >= 0], minlength=len(values))
+            counts = [int(c) for c, keep in zip(counts, present) if keep and c > 0]
+            total = sum(counts)
+            if total == 0:
+                return 0.0
+            return sum((count / total) ** 2 for count in counts)
+        
+        return (
+            herfindahl(table.gender, table.gender_values) +
+            herfindahl(table.ethnicity, table.ethnicity_values)
+        ) / 2
+    
+    def event_pattern_concentration(self, table: PersonaTable) -> float:
+        """Herfindahl index of the distribution of event-type sets."""
+        if len(table) == 0:
+            return 0.0
+        _, counts = self._unique_patterns(table.event_mask)
+        shares = counts / len(table)
+        return float(np.sum(shares ** 2))
@@ -13,7 +13,9 @@ Supported domains:
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Set
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Set, Tuple
 from enum import Enum
 
 
@@ -53,6 +55,91 @@ class DomainConfig:
         if not self.outcomes:
             return True  # No restrictions
         return outcome in self.outcomes
+    
+    def compiled(self) -> 'CompiledDomainConfig':
+        """
+        Frozen, precompiled form of this configuration.
+        
+        Compiled configurations are cached per process by content, so
+        configurations with the same settings share one instance.
+        """
+        return _compile_domain_config(
+            self.domain,
+            tuple(self.event_types),
+            tuple(self.outcomes),
+            frozenset(self.sensitive_fields),
+            frozenset(self.preserve_fields),
+            self.temporal_precision,
+            self.geographic_precision,
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledDomainConfig:
+    """
+    Immutable domain configuration for hot loops.
+    
+    Vocabularies are frozensets, so validating an event is one hash lookup,
+    and each value also has an integer code (its position in the
+    configuration). Empty vocabularies mean no restriction, as in
+    DomainConfig. Pickling sends the settings and recompiles through the
+    receiving process's cache, so pool workers also compile each
+    configuration once.
+    """
+    domain: Domain
+    event_types: FrozenSet[str]
+    outcomes: FrozenSet[str]
+    event_type_codes: Mapping[str, int]
+    outcome_codes: Mapping[str, int]
+    sensitive_fields: FrozenSet[str]
+    preserve_fields: FrozenSet[str]
+    temporal_precision: str
+    geographic_precision: str
+    _key: Tuple = field(repr=False, compare=False)  # Arguments of _compile_domain_config
+    
+    def is_valid_event_type(self, event_type: str) -> bool:
+        """Check if event type is valid for this domain."""
+        return not self.event_types or event_type in self.event_types
+    
+    def is_valid_outcome(self, outcome: str) -> bool:
+        """Check if outcome is valid for this domain."""
+        return not self.outcomes or outcome in self.outcomes
+    
+    def __reduce__(self):
+        return _compile_domain_config, self._key
+
+
+def _codes(values: Tuple[str, ...]) -> Mapping[str, int]:
+    """Read-only map from each value to its first position."""
+    codes: Dict[str, int] = {}
+    for value in values:
+        codes.setdefault(value, len(codes))
+    return MappingProxyType(codes)
+
+
+@lru_cache(maxsize=None)
+def _compile_domain_config(
+    domain: Domain,
+    event_types: Tuple[str, ...],
+    outcomes: Tuple[str, ...],
+    sensitive_fields: FrozenSet[str],
+    preserve_fields: FrozenSet[str],
+    temporal_precision: str,
+    geographic_precision: str,
+) -> CompiledDomainConfig:
+    return CompiledDomainConfig(
+        domain=domain,
+        event_types=frozenset(event_types),
+        outcomes=frozenset(outcomes),
+        event_type_codes=_codes(event_types),
+        outcome_codes=_codes(outcomes),
+        sensitive_fields=sensitive_fields,
+        preserve_fields=preserve_fields,
+        temporal_precision=temporal_precision,
+        geographic_precision=geographic_precision,
+        _key=(domain, event_types, outcomes, sensitive_fields, preserve_fields,
+              temporal_precision, geographic_precision),
+    )
 
 
 # Criminal Justice Domain Configuration
@@ -318,6 +405,11 @@ def get_domain_config(domain: Domain) -> DomainConfig:
     return DOMAIN_CONFIGS.get(domain, DomainConfig(domain=Domain.CUSTOM))
 
 
+def get_compiled_domain_config(domain: Domain) -> CompiledDomainConfig:
+    """Get the cached, precompiled configuration for a specific domain."""
+    return get_domain_config(domain).compiled()
+
+
 def create_custom_config(
     event_types: List[str],
     outcomes: List[str],
@@ -5,15 +5,19 @@ This module provides sophisticated event merging that creates realistic personas
 by preserving logical sequences and combining similar events.
 """
 
-from typing import List, Dict, Set, Tuple, Optional
+from typing import List, Dict, FrozenSet, Mapping, Set, Tuple, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, deque
+from functools import lru_cache
+from types import MappingProxyType
+import bisect
 
 from .models import Event, Person, Persona
 from .domains import Domain
+from .aggregation import mode, median_high
 
 
 class EventMergingStrategy(Enum):
@@ -35,20 +39,85 @@ class EventSimilarity:
     reasons: List[str]  # Why they're similar
 
 
-@dataclass
+@dataclass(frozen=True)
 class EventSequenceRule:
-    """Domain-specific rule for event sequences."""
+    """
+    Domain-specific rule for event sequences.
+    
+    Frozen, with type lists stored as tuples, so the cached domain rules
+    can be shared; build a new rule to change one.
+    """
     event_type: str
-    must_follow: Optional[List[str]] = None  # Events that must come before
-    cannot_follow: Optional[List[str]] = None  # Events that cannot come before
+    must_follow: Optional[Tuple[str, ...]] = None  # Events that must come before
+    cannot_follow: Optional[Tuple[str, ...]] = None  # Events that cannot come before
     max_occurrences: Optional[int] = None  # Max times this can occur
     requires_closure: bool = False  # Requires a closing event (e.g., discharge after admission)
     closure_event_type: Optional[str] = None
+    
+    def __post_init__(self):
+        for name in ("must_follow", "cannot_follow"):
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, tuple(value))
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledEventRules:
+    """
+    Domain event rules reduced to lookup tables for one-pass validation.
+    
+    Built once from DomainEventRules.get_rules. Validation then keeps the
+    set of event types seen so far and the currently open events, so each
+    event costs O(1) lookups instead of a scan of the events before it.
+    
+    Rules compiled for a domain are cached per process (see
+    DomainEventRules.get_compiled_rules) and pickle as the domain alone, so
+    pool workers reuse their own cached copy. The tables must not be
+    modified.
+    """
+    ruled_types: FrozenSet[str]  # Event types that have a rule
+    predecessors: Dict[str, Tuple[str, ...]]  # Event type -> types that must come before
+    closures: Dict[str, str]  # Event type -> event type that closes it
+    domain: Optional[Domain] = None  # Domain the rules were compiled for, if any
+    
+    @classmethod
+    def from_rules(
+        cls,
+        rules: Dict[str, EventSequenceRule],
+        domain: Optional[Domain] = None
+    ) -> 'CompiledEventRules':
+        """Compile a rule dictionary keyed by event type."""
+        return cls(
+            ruled_types=frozenset(rules),
+            predecessors={
+                event_type: tuple(rule.must_follow)
+                for event_type, rule in rules.items() if rule.must_follow
+            },
+            closures={
+                event_type: rule.closure_event_type
+                for event_type, rule in rules.items()
+                if rule.requires_closure and rule.closure_event_type
+            },
+            domain=domain,
+        )
+    
+    def __bool__(self) -> bool:
+        return bool(self.ruled_types)
+    
+    def __reduce__(self):
+        if self.domain is not None:
+            return _compiled_rules, (self.domain,)
+        return CompiledEventRules, (self.ruled_types, self.predecessors, self.closures)
 
 
 class DomainEventRules:
     """Event sequence rules for different domains."""
     
+    @staticmethod
+    def get_compiled_rules(domain: Domain) -> CompiledEventRules:
+        """Get the cached, compiled event rules for a domain."""
+        return _compiled_rules(domain)
+    
     @staticmethod
     def get_rules(domain: Domain) -> Dict[str, EventSequenceRule]:
         """Get event rules for a domain."""
@@ -155,14 +224,269 @@ class EventSimilarityCalculator:
         return False
 
 
+_GROUPING_WINDOW_DAYS = 180  # Temporal similarity is zero this many days apart
+_PRUNED_GROUPING_THRESHOLD = 0.6  # Lowest threshold _EventBlockIndex finds every match for
+
+
+class _EventBlock:
+    """
+    Grouped events sharing event type, outcome and location.
+    
+    Every member of a block scores the same against a given event except
+    for the temporal term, which only grows as member dates get closer.
+    Since events are grouped in date order, the most recent members of a
+    block are always its best matches.
+    """
+    
+    def __init__(self, event: Event, group_idx: int):
+        self.latest_event = event
+        self.dates: List[datetime] = [event.date]  # Distinct member dates, ascending
+        self.min_groups: List[int] = [group_idx]  # Lowest group index at each date
+        self.min_group = group_idx  # Lowest group index of any member
+    
+    def add(self, event: Event, group_idx: int) -> None:
+        """Add an event no earlier than any current member."""
+        if event.date == self.dates[-1]:
+            self.min_groups[-1] = min(self.min_groups[-1], group_idx)
+        else:
+            self.dates.append(event.date)
+            self.min_groups.append(group_idx)
+        self.latest_event = event
+        self.min_group = min(self.min_group, group_idx)
+    
+    def best_group(self, event: Event) -> int:
+        """Lowest group index among members scoring highest against event."""
+        days = (event.date - self.dates[-1]).days
+        if days >= _GROUPING_WINDOW_DAYS:
+            return self.min_group  # Temporal term is zero for every member
+        
+        # Members whose whole-day distance equals the latest member's
+        start = bisect.bisect_right(self.dates, event.date - timedelta(days=days + 1))
+        return min(self.min_groups[start:])
+
+
+def _county(location: Optional[str]) -> Optional[str]:
+    """County part of a location, as compared by EventSimilarityCalculator._same_county."""
+    if location and "County" in location:
+        return location.split("County")[0].strip()
+    return None
+
+
+_BlockSet = Dict[_EventBlock, None]  # Insertion-ordered set of blocks
+
+
+class _EventBlockIndex:
+    """
+    Event blocks indexed by what an event must share with a block to reach
+    a similarity threshold of at least 0.6.
+    
+    Against an event of type T, outcome O and location L, a grouped event
+    can only score 0.6 or more if it:
+    
+    - has type T and outcome O
+    - has type T and location L
+    - has type T, is in L's county and is within 90 days
+    - has type T and is within a day
+    - has outcome O and location L and is within a day (any type)
+    
+    Blocks are kept in a sliding window of 180 days, beyond which the
+    temporal term is zero and a block scores on type, outcome and location
+    alone. Blocks leaving the window are reduced to the lowest group of each
+    (type, outcome) and (type, outcome, county); blocks at the event's own
+    location are looked up directly.
+    """
+    
+    def __init__(self):
+        self.blocks: Dict[Tuple, _EventBlock] = {}  # (type, outcome, location) -> block
+        self.by_location: Dict[Tuple, _BlockSet] = defaultdict(dict)  # (type, location)
+        self.window_by_outcome: Dict[Tuple, _BlockSet] = defaultdict(dict)  # (type, outcome)
+        self.window_by_county: Dict[Tuple, _BlockSet] = defaultdict(dict)  # (type, county)
+        self.day_by_type: Dict[str, _BlockSet] = defaultdict(dict)
+        self.day_by_place: Dict[Tuple, _BlockSet] = defaultdict(dict)  # (outcome, location)
+        self.expired: Dict[Tuple, Tuple[int, Event]] = {}  # Lowest group and a member of it
+        self.window: deque = deque()  # (date, block) as blocks were updated
+        self.day: deque = deque()
+    
+    def advance(self, date: datetime) -> None:
+        """Drop blocks last updated too long before date from the windows."""
+        while self.window and (date - self.window[0][0]).days >= _GROUPING_WINDOW_DAYS:
+            latest, block = self.window.popleft()
+            if block.latest_event.date == latest:
+                self._expire(block)
+        
+        while self.day and (date - self.day[0][0]).days >= 1:
+            latest, block = self.day.popleft()
+            event = block.latest_event
+            if event.date == latest:
+                self.day_by_type[event.event_type].pop(block, None)
+                if event.location:
+                    self.day_by_place[(event.outcome, event.location)].pop(block, None)
+    
+    def _expire(self, block: _EventBlock) -> None:
+        event = block.latest_event
+        county = _county(event.location)
+        self.window_by_outcome[(event.event_type, event.outcome)].pop(block, None)
+        if county is not None:
+            self.window_by_county[(event.event_type, county)].pop(block, None)
+        
+        # Every member of the block scores like its latest event from now on
+        keys = [(event.event_type, event.outcome)]
+        if county is not None:
+            keys.append((event.event_type, event.outcome, county))
+        for key in keys:
+            current = self.expired.get(key)
+            if current is None or block.min_group < current[0]:
+                self.expired[key] = (block.min_group, event)
+    
+    def candidate_blocks(self, event: Event) -> _BlockSet:
+        """Blocks that may reach the threshold against event."""
+        event_type, outcome, location = event.event_type, event.outcome, event.location
+        county = _county(location)
+        
+        candidates: _BlockSet = {}
+        candidates.update(self.window_by_outcome.get((event_type, outcome), {}))
+        candidates.update(self.day_by_type.get(event_type, {}))
+        if location:
+            candidates.update(self.by_location.get((event_type, location), {}))
+            candidates.update(self.day_by_place.get((outcome, location), {}))
+        if county is not None:
+            candidates.update(self.window_by_county.get((event_type, county), {}))
+        return candidates
+    
+    def expired_members(self, event: Event) -> List[Tuple[int, Event]]:
+        """Lowest group and a member of it for expired blocks of the same type and outcome."""
+        keys = [(event.event_type, event.outcome)]
+        county = _county(event.location)
+        if county is not None:
+            keys.append((event.event_type, event.outcome, county))
+        return [self.expired[key] for key in keys if key in self.expired]
+    
+    def add(self, event: Event, group_idx: int) -> None:
+        """Add a grouped event no earlier than any event added before."""
+        event_type, outcome, location = event.event_type, event.outcome, event.location
+        key = (event_type, outcome, location)
+        block = self.blocks.get(key)
+        if block is None:
+            block = self.blocks[key] = _EventBlock(event, group_idx)
+        else:
+            block.add(event, group_idx)
+        
+        county = _county(location)
+        self.window_by_outcome[(event_type, outcome)][block] = None
+        self.day_by_type[event_type][block] = None
+        if location:
+            self.by_location[(event_type, location)][block] = None
+            self.day_by_place[(outcome, location)][block] = None
+        if county is not None:
+            self.window_by_county[(event_type, county)][block] = None
+        self.window.append((event.date, block))
+        self.day.append((event.date, block))
+
+
+@lru_cache(maxsize=None)
+def _domain_rules(domain: Domain) -> Mapping[str, EventSequenceRule]:
+    """Read-only domain rules, shared by the process (mergers copy them)."""
+    return MappingProxyType(DomainEventRules.get_rules(domain))
+
+
+class _RuleTable(dict):
+    """Rule dict of one merger that recompiles the merger's rules when modified."""
+    
+    __slots__ = ("_merger",)
+    
+    def __init__(self, merger: 'IntelligentEventMerger', rules: Mapping[str, EventSequenceRule]):
+        super().__init__(rules)
+        self._merger = merger
+    
+    def _changed(self) -> None:
+        self._merger._compile_rules()
+    
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._changed()
+    
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self._changed()
+    
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        self._changed()
+    
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._changed()
+        return value
+    
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._changed()
+        return value
+    
+    def popitem(self):
+        item = super().popitem()
+        self._changed()
+        return item
+    
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+    
+    def __ior__(self, other):
+        super().__ior__(other)
+        self._changed()
+        return self
+    
+    def __reduce__(self):
+        return dict, (dict(self),)  # Pickled as a plain dict; the merger re-wraps it
+
+
+@lru_cache(maxsize=None)
+def _compiled_rules(domain: Domain) -> CompiledEventRules:
+    return CompiledEventRules.from_rules(_domain_rules(domain), domain)
+
+
 class IntelligentEventMerger:
     """Merge events from multiple people into realistic persona events."""
     
-    def __init__(self, domain: Domain, strategy: EventMergingStrategy = EventMergingStrategy.SIMILARITY):
+    def __init__(
+        self,
+        domain: Domain,
+        strategy: EventMergingStrategy = EventMergingStrategy.SIMILARITY,
+        blocked_grouping: bool = True
+    ):
         self.domain = domain
         self.strategy = strategy
-        self.rules = DomainEventRules.get_rules(domain)
+        self._rules = _RuleTable(self, _domain_rules(domain))
+        self.compiled_rules = DomainEventRules.get_compiled_rules(domain)
         self.similarity_calculator = EventSimilarityCalculator()
+        self.blocked_grouping = blocked_grouping  # Compare against event blocks, not every event
+    
+    @property
+    def rules(self) -> Dict[str, EventSequenceRule]:
+        """
+        Event rules applied by this merger (domain defaults unless assigned).
+        
+        This merger's own dict: modifying it in place, or assigning a new
+        one, recompiles the rules sequence validation uses.
+        """
+        return self._rules
+    
+    @rules.setter
+    def rules(self, rules: Mapping[str, EventSequenceRule]) -> None:
+        self._rules = _RuleTable(self, rules)
+        self._compile_rules()
+    
+    def _compile_rules(self) -> None:
+        """Rebuild compiled_rules from the rules (the cached tables for the domain defaults)."""
+        if self._rules == _domain_rules(self.domain):
+            self.compiled_rules = DomainEventRules.get_compiled_rules(self.domain)
+        else:
+            self.compiled_rules = CompiledEventRules.from_rules(self._rules)
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._rules = _RuleTable(self, state["_rules"])
     
     def merge_events(self, people: List[Person]) -> List[Event]:
         """
@@ -242,8 +566,17 @@ class IntelligentEventMerger:
         Group similar events together.
         
         Uses greedy clustering: each event joins the first group where
-        similarity to any member exceeds threshold.
+        similarity to any member exceeds threshold. Date-sorted events are
+        grouped through _group_similar_events_blocked when the threshold is
+        at least 0.6.
         """
+        if (
+            self.blocked_grouping
+            and similarity_threshold >= _PRUNED_GROUPING_THRESHOLD
+            and all(earlier.date <= later.date for earlier, later in zip(events, events[1:]))
+        ):
+            return self._group_similar_events_blocked(events, similarity_threshold)
+        
         groups = []
         
         for event in events:
@@ -269,6 +602,56 @@ class IntelligentEventMerger:
         
         return groups
     
+    def _group_similar_events_blocked(
+        self,
+        events: List[Event],
+        similarity_threshold: float = 0.6
+    ) -> List[List[Event]]:
+        """
+        Blocked version of _group_similar_events for date-sorted events.
+        
+        Grouped events are blocked by (event_type, outcome, location) and
+        indexed by _EventBlockIndex, so each event is only scored against
+        the blocks that can reach the threshold. Produces the same groups
+        as the exhaustive comparison for thresholds of 0.6 and above.
+        """
+        groups: List[List[Event]] = []
+        index = _EventBlockIndex()
+        
+        for event in events:
+            index.advance(event.date)
+            best_group_idx = None
+            best_similarity = 0.0
+            
+            candidates = [
+                (block.latest_event, block.best_group(event))
+                for block in index.candidate_blocks(event)
+            ]
+            candidates.extend(
+                (member, group_idx) for group_idx, member in index.expired_members(event)
+            )
+            
+            for member, group_idx in candidates:
+                sim = self.similarity_calculator.calculate_similarity(
+                    event, member, self.domain
+                ).similarity
+                if sim < best_similarity or sim <= 0.0:
+                    continue
+                # Ties go to the earliest group, as in the exhaustive scan
+                if sim > best_similarity or group_idx < best_group_idx:
+                    best_similarity = sim
+                    best_group_idx = group_idx
+            
+            if best_similarity >= similarity_threshold and best_group_idx is not None:
+                groups[best_group_idx].append(event)
+            else:
+                best_group_idx = len(groups)
+                groups.append([event])
+            
+            index.add(event, best_group_idx)
+        
+        return groups
+    
     def _create_representative_event(self, event_group: List[Event]) -> Event:
         """
         Create a single representative event from a group of similar events.
@@ -285,13 +668,13 @@ class IntelligentEventMerger:
         dates = [e.date for e in event_group]
         
         # Most common event type
-        event_type = max(set(event_types), key=event_types.count)
+        event_type = mode(event_types)
         
         # Most common outcome
-        outcome = max(set(outcomes), key=outcomes.count)
+        outcome = mode(outcomes)
         
         # Most common location (or generalize if different)
-        location = max(set(locations), key=locations.count) if locations else None
+        location = mode(locations)
         if location and len(set(locations)) > len(event_group) / 2:
             # Too diverse, generalize
             filtered_locations = [loc for loc in locations if loc is not None]
@@ -299,8 +682,7 @@ class IntelligentEventMerger:
                 location = self._generalize_location(filtered_locations)
         
         # Median date
-        dates_sorted = sorted(dates)
-        median_date = dates_sorted[len(dates_sorted) // 2]
+        median_date = median_high(dates)
         
         # Merge details
         merged_data = {}
@@ -355,56 +737,60 @@ class IntelligentEventMerger:
         - Can't have admission without discharge -> Add discharge
         - Can't be hospitalized twice simultaneously -> Merge or add discharge
         """
-        if not self.rules:
+        rules = self.compiled_rules
+        if not rules:
             return events  # No rules for this domain
         
         validated_events = []
-        open_events = {}  # Track events requiring closure
+        seen_types: Set[str] = set()  # Event types already in validated_events
+        open_events: Dict[str, str] = {}  # Open event type -> closure type, in opening order
+        open_by_closure: Dict[str, Dict[str, None]] = {}  # Closure type -> open types it closes
+        
+        def add(event: Event) -> None:
+            validated_events.append(event)
+            seen_types.add(event.event_type)
         
         for event in events:
-            rule = self.rules.get(event.event_type)
+            event_type = event.event_type
             
-            if rule:
-                # Check if required predecessor events exist
-                if rule.must_follow:
-                    missing_predecessors = []
-                    for required_type in rule.must_follow:
-                        if not any(e.event_type == required_type for e in validated_events):
-                            missing_predecessors.append(required_type)
-                    
-                    # Insert missing predecessor events
-                    for missing_type in missing_predecessors:
-                        synthetic_event = self._create_synthetic_event(
-                            missing_type,
-                            before_date=event.date,
-                            reason=f"Required before {event.event_type}"
-                        )
-                        validated_events.append(synthetic_event)
+            if event_type in rules.ruled_types:
+                # Insert missing predecessor events
+                missing_predecessors = [
+                    required_type
+                    for required_type in rules.predecessors.get(event_type, ())
+                    if required_type not in seen_types
+                ]
+                for missing_type in missing_predecessors:
+                    add(self._create_synthetic_event(
+                        missing_type,
+                        before_date=event.date,
+                        reason=f"Required before {event_type}"
+                    ))
                 
-                # Check if this closes an open event
-                if event.event_type in [v for v in open_events.values()]:
-                    # Close the open event
-                    for open_type, closure_type in list(open_events.items()):
-                        if closure_type == event.event_type:
-                            del open_events[open_type]
-                            break
+                # Close the earliest open event this event closes
+                closable = open_by_closure.get(event_type)
+                if closable:
+                    open_type = next(iter(closable))
+                    del closable[open_type]
+                    del open_events[open_type]
                 
                 # Check if this requires closure
-                if rule.requires_closure and rule.closure_event_type:
-                    if rule.event_type in open_events:
+                closure_type = rules.closures.get(event_type)
+                if closure_type:
+                    if event_type in open_events:
                         # Already have an open event of this type
                         # Need to close it first
-                        closure_event = self._create_synthetic_event(
-                            rule.closure_event_type,
+                        add(self._create_synthetic_event(
+                            closure_type,
                             before_date=event.date,
-                            reason=f"Closing previous {rule.event_type}"
-                        )
-                        validated_events.append(closure_event)
+                            reason=f"Closing previous {event_type}"
+                        ))
                     
                     # Mark this event as open
-                    open_events[rule.event_type] = rule.closure_event_type
+                    open_events[event_type] = closure_type
+                    open_by_closure.setdefault(closure_type, {})[event_type] = None
             
-            validated_events.append(event)
+            add(event)
         
         # Close any remaining open events
         for open_type, closure_type in open_events.items():
@@ -457,12 +843,13 @@ class IntelligentEventMerger:
                 aggregated.append(events[0])
             else:
                 # Create aggregate
-                dates = sorted([e.date for e in events])
-                date_range = f"{dates[0].strftime('%Y-%m')} to {dates[-1].strftime('%Y-%m')}"
+                first_date = min(e.date for e in events)
+                last_date = max(e.date for e in events)
+                date_range = f"{first_date.strftime('%Y-%m')} to {last_date.strftime('%Y-%m')}"
                 
                 aggregate = Event(
                     event_id=f"aggregate_{event_type}",
-                    date=dates[0],  # Start date
+                    date=first_date,  # Start date
                     event_type=event_type,
                     outcome="multiple",
                     location=f"{len(set(e.location for e in events if e.location))} locations",
@@ -470,7 +857,7 @@ class IntelligentEventMerger:
                         "_aggregate": True,
                         "_count": len(events),
                         "_date_range": date_range,
-                        "_outcomes": list(set(e.outcome for e in events if e.outcome))
+                        "_outcomes": list(dict.fromkeys(e.outcome for e in events if e.outcome))
                     }
                 )
                 aggregated.append(aggregate)
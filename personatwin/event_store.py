@@ -0,0 +1,489 @@
+"""
+Compact, array-backed storage for large event histories.
+
+An Event dataclass carries its own attribute dict, a details dict and an
+associated_people list, which adds up to several hundred bytes per event.
+For histories of tens of millions of events this module stores events
+column-wise instead:
+
+- Event types, outcomes, locations, categories and severities are interned
+  into integer codes by a vocabulary: the store's own, or one shared by
+  the stores of a pipeline run, so it is released with them
+- Event ids are UTF-8 bytes in one buffer, delimited by an offsets array
+- Dates are int64 day numbers (proleptic Gregorian ordinals), with a
+  time-of-day column created only if some event has a time
+- Details and associated people live in side tables holding only the
+  events that have them
+
+EventStore is a mutable sequence of events. Indexing or iterating yields
+EventView objects: lightweight Event subclasses that read and write the
+underlying columns, so code written against Event keeps working.
+"""
+
+from array import array
+from collections.abc import MutableSequence
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+
+from personatwin.models import Event
+
+
+class Interner:
+    """Map values to integer codes in first-seen order (None -> -1)."""
+    
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+    
+    def encode(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+    
+    def decode(self, code: int) -> Any:
+        return None if code < 0 else self.values[code]
+
+
+# Interned Event fields, in column order
+CODED_FIELDS = ("event_type", "outcome", "location", "category", "severity")
+
+
+def _encode_date(value: Any):
+    """Split a naive datetime into (day number, microseconds into the day)."""
+    try:
+        if value.tzinfo is None:
+            micros = ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000
+            return value.toordinal(), micros + value.microsecond
+    except (AttributeError, ValueError):
+        pass  # None, NaT and non-datetimes are kept as-is in a side table
+    return None
+
+
+class EventStore(MutableSequence):
+    """
+    Column-wise list of events.
+    
+    Supports the list operations used on Person.events and Persona.events
+    (len, iteration, indexing, append, extend, assignment, deletion).
+    Items read back as EventView objects created on demand; nothing is
+    kept per event beyond the column entries. Insertion and deletion
+    shift the columns in place.
+    
+    Stores sharing a vocabulary (e.g. all stores of one pipeline run)
+    share codes, and keep each distinct value once.
+    """
+    
+    def __init__(self, events: Iterable[Event] = (), vocabulary: Optional[Interner] = None):
+        self.vocabulary = vocabulary if vocabulary is not None else Interner()
+        self._id_bytes = bytearray()  # UTF-8 event ids, back to back
+        self._id_offsets = array("q", [0])  # Id i is _id_bytes[offsets[i]:offsets[i + 1]]
+        self._other_ids: Optional[Dict[int, Any]] = None  # Ids that are not strings
+        self._days = array("q")
+        self._codes = {name: array("i") for name in CODED_FIELDS}
+        self._times: Optional[array] = None  # Created when an event has a time of day
+        self._dates: Optional[Dict[int, Any]] = None  # Dates that are not naive datetimes
+        self._details: Optional[Dict[int, Dict[str, Any]]] = None
+        self._associated: Optional[Dict[int, List[str]]] = None
+        self.extend(events)
+    
+    @classmethod
+    def from_events(
+        cls, events: Iterable[Event], vocabulary: Optional[Interner] = None
+    ) -> "EventStore":
+        """Build a store from any iterable of events."""
+        return cls(events, vocabulary)
+    
+    # Sequence protocol
+    
+    def __len__(self) -> int:
+        return len(self._days)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return EventStore(
+                (self._view(i) for i in range(*index.indices(len(self)))), self.vocabulary
+            )
+        return self._view(self._position(index))
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield EventView(self, i)
+    
+    def __setitem__(self, index, event) -> None:
+        if not isinstance(index, slice):
+            self._write(self._position(index), event)
+            return
+        
+        events = list(event)
+        positions = range(*index.indices(len(self)))
+        if index.step not in (None, 1):
+            if len(positions) != len(events):
+                raise ValueError("extended slice assignment must keep the length")
+            for i, item in zip(positions, events):
+                self._write(i, item)
+        else:
+            start = positions.start
+            self._delete(start, max(start, positions.stop))
+            self._insert_blank(start, len(events))
+            for i, item in enumerate(events, start):
+                self._write(i, item)
+    
+    def __delitem__(self, index) -> None:
+        if not isinstance(index, slice):
+            position = self._position(index)
+            self._delete(position, position + 1)
+            return
+        
+        positions = range(*index.indices(len(self)))
+        if positions.step == 1:
+            self._delete(positions.start, max(positions.start, positions.stop))
+        else:
+            for position in sorted(positions, reverse=True):
+                self._delete(position, position + 1)
+    
+    def insert(self, index: int, event: Event) -> None:
+        index = min(max(0, index + len(self) if index < 0 else index), len(self))
+        self._insert_blank(index, 1)
+        self._write(index, event)
+    
+    def append(self, event: Event) -> None:
+        self._insert_blank(len(self), 1)
+        self._write(len(self) - 1, event)
+    
+    def extend(self, events: Iterable[Event]) -> None:
+        for event in events:
+            self.append(event)
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (EventStore, list)):
+            return len(self) == len(other) and all(
+                _same_event(a, b) for a, b in zip(self, other)
+            )
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"EventStore({len(self)} events)"
+    
+    # Column access
+    
+    def day_numbers(self) -> np.ndarray:
+        """Event dates as an int64 array of day numbers."""
+        # A copy: arrays exporting a buffer could no longer grow
+        return np.array(self._days, dtype=np.int64)
+    
+    def codes(self, name: str) -> np.ndarray:
+        """Interned codes of one of CODED_FIELDS as an int32 array (-1 = None)."""
+        return np.array(self._codes[name], dtype=np.int32)
+    
+    def to_events(self) -> List[Event]:
+        """Materialize the store as standalone Event objects."""
+        return [
+            Event(
+                event_id=view.event_id,
+                date=view.date,
+                event_type=view.event_type,
+                outcome=view.outcome,
+                details=dict(view.details),
+                location=view.location,
+                associated_people=list(view.associated_people),
+                category=view.category,
+                severity=view.severity,
+            )
+            for view in self
+        ]
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle the columns with the vocabulary (pickled once for stores sharing it)."""
+        state = self.__dict__.copy()
+        for name in ("_details", "_associated"):
+            if state[name] is not None:
+                state[name] = {i: _plain(value) for i, value in state[name].items()}
+        return state
+    
+    # Internals
+    
+    def _position(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        return index
+    
+    def _view(self, i: int) -> 'EventView':
+        return EventView(self, i)
+    
+    def _insert_blank(self, index: int, count: int) -> None:
+        """Open count empty positions at index, shifting later events."""
+        shifted = index < len(self)
+        offset = self._id_offsets[index]
+        self._id_offsets[index + 1:index + 1] = array("q", [offset]) * count
+        self._days[index:index] = array("q", bytes(8 * count))
+        for column in self._codes.values():
+            column[index:index] = array("i", [-1]) * count
+        if self._times is not None:
+            self._times[index:index] = array("q", bytes(8 * count))
+        if shifted:
+            self._renumber(index, 0, count)
+    
+    def _delete(self, start: int, stop: int) -> None:
+        """Remove positions start..stop-1, shifting later events."""
+        if start >= stop:
+            return
+        first, last = self._id_offsets[start], self._id_offsets[stop]
+        del self._id_bytes[first:last]
+        del self._id_offsets[start + 1:stop + 1]
+        self._shift_offsets(start + 1, first - last)
+        del self._days[start:stop]
+        for column in self._codes.values():
+            del column[start:stop]
+        if self._times is not None:
+            del self._times[start:stop]
+        self._renumber(start, stop - start, 0)
+    
+    def _renumber(self, start: int, removed: int, inserted: int) -> None:
+        """Re-key side tables after removing and inserting positions at start."""
+        for name in ("_other_ids", "_dates", "_details", "_associated"):
+            table = getattr(self, name)
+            if table:
+                setattr(self, name, {
+                    i if i < start else i - removed + inserted: value
+                    for i, value in table.items()
+                    if not start <= i < start + removed
+                })
+    
+    def _shift_offsets(self, start: int, delta: int) -> None:
+        """Add delta to the id offsets from start on."""
+        if delta and start < len(self._id_offsets):
+            offsets = np.frombuffer(self._id_offsets, dtype=np.int64)
+            offsets[start:] += delta
+            del offsets  # Release the buffer so the array can grow again
+    
+    def _get_id(self, i: int) -> Any:
+        if self._other_ids is not None and i in self._other_ids:
+            return self._other_ids[i]
+        return self._id_bytes[self._id_offsets[i]:self._id_offsets[i + 1]].decode()
+    
+    def _set_id(self, i: int, value: Any) -> None:
+        if isinstance(value, str):
+            encoded = value.encode()
+            if self._other_ids is not None:
+                self._other_ids.pop(i, None)
+        else:
+            encoded = b""
+            if self._other_ids is None:
+                self._other_ids = {}
+            self._other_ids[i] = value
+        first, last = self._id_offsets[i], self._id_offsets[i + 1]
+        self._id_bytes[first:last] = encoded
+        self._shift_offsets(i + 1, len(encoded) - (last - first))
+    
+    def _write(self, i: int, event: Event) -> None:
+        self._set_id(i, event.event_id)
+        self._set_date(i, event.date)
+        for name in CODED_FIELDS:
+            self._codes[name][i] = self.vocabulary.encode(getattr(event, name))
+        self._set_side(i, "_details", event.details)
+        self._set_side(i, "_associated", event.associated_people)
+    
+    def _get_date(self, i: int) -> Any:
+        if self._dates is not None and i in self._dates:
+            return self._dates[i]
+        date = datetime.fromordinal(self._days[i])
+        if self._times is not None and self._times[i]:
+            date += timedelta(microseconds=self._times[i])
+        return date
+    
+    def _set_date(self, i: int, value: Any) -> None:
+        encoded = _encode_date(value)
+        if encoded is None:
+            if self._dates is None:
+                self._dates = {}
+            self._dates[i] = value
+            return
+        
+        if self._dates is not None:
+            self._dates.pop(i, None)
+        days, micros = encoded
+        self._days[i] = days
+        if micros and self._times is None:
+            self._times = array("q", bytes(8 * len(self._days)))
+        if self._times is not None:
+            self._times[i] = micros
+    
+    def _set_side(self, i: int, table_name: str, value) -> None:
+        table = getattr(self, table_name)
+        if value:
+            if table is None:
+                table = {}
+                setattr(self, table_name, table)
+            table[i] = value
+        elif table is not None:
+            table.pop(i, None)
+
+
+def _plain(value):
+    """Drop the store link from side-table entries created through a view."""
+    if isinstance(value, dict):
+        return dict(value)
+    return list(value)
+
+
+def _same_event(a: Event, b: Event) -> bool:
+    """Compare two events field by field, whatever their concrete class."""
+    return all(
+        getattr(a, name) == getattr(b, name)
+        for name in ("event_id", "date", "details", "associated_people") + CODED_FIELDS
+    )
+
+
+class _PendingDetails(dict):
+    """Empty details dict that joins the side table on first write."""
+    
+    __slots__ = ("_store", "_index")
+    
+    def __init__(self, store: EventStore, index: int):
+        super().__init__()
+        self._store = store
+        self._index = index
+    
+    def _attach(self) -> None:
+        self._store._set_side(self._index, "_details", self)
+    
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._attach()
+    
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        if self:
+            self._attach()
+    
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._attach()
+        return value
+
+
+class _PendingPeople(list):
+    """Empty associated_people list that joins the side table on first write."""
+    
+    __slots__ = ("_store", "_index")
+    
+    def __init__(self, store: EventStore, index: int):
+        super().__init__()
+        self._store = store
+        self._index = index
+    
+    def _attach(self) -> None:
+        if self:
+            self._store._set_side(self._index, "_associated", self)
+    
+    def append(self, value) -> None:
+        super().append(value)
+        self._attach()
+    
+    def extend(self, values) -> None:
+        super().extend(values)
+        self._attach()
+    
+    def insert(self, index, value) -> None:
+        super().insert(index, value)
+        self._attach()
+    
+    def __iadd__(self, values):
+        super().__iadd__(values)
+        self._attach()
+        return self
+
+
+def _coded_property(name: str) -> property:
+    """Event field read from and written to an interned column."""
+    def getter(self):
+        return self._store.vocabulary.decode(self._store._codes[name][self._index])
+    
+    def setter(self, value):
+        self._store._codes[name][self._index] = self._store.vocabulary.encode(value)
+    
+    return property(getter, setter)
+
+
+class EventView(Event):
+    """
+    One event of an EventStore, exposed with the Event interface.
+    
+    Views hold only the store and a position; attribute reads decode the
+    columns and assignments write back to them. Views stay valid while the
+    store is only appended to or assigned into; inserting or deleting
+    events shifts positions.
+    
+    Event is a plain dataclass, so each view still carries an (empty)
+    instance dict; views are meant to be short-lived.
+    """
+    
+    def __init__(self, store: EventStore, index: int):
+        self._store = store
+        self._index = index
+    
+    event_type = _coded_property("event_type")
+    outcome = _coded_property("outcome")
+    location = _coded_property("location")
+    category = _coded_property("category")
+    severity = _coded_property("severity")
+    
+    @property
+    def event_id(self) -> str:
+        return self._store._get_id(self._index)
+    
+    @event_id.setter
+    def event_id(self, value: str) -> None:
+        self._store._set_id(self._index, value)
+    
+    @property
+    def date(self) -> datetime:
+        return self._store._get_date(self._index)
+    
+    @date.setter
+    def date(self, value: datetime) -> None:
+        self._store._set_date(self._index, value)
+    
+    @property
+    def details(self) -> Dict[str, Any]:
+        table = self._store._details
+        if table is not None and self._index in table:
+            return table[self._index]
+        return _PendingDetails(self._store, self._index)
+    
+    @details.setter
+    def details(self, value: Dict[str, Any]) -> None:
+        self._store._set_side(self._index, "_details", value)
+    
+    @property
+    def associated_people(self) -> List[str]:
+        table = self._store._associated
+        if table is not None and self._index in table:
+            return table[self._index]
+        return _PendingPeople(self._store, self._index)
+    
+    @associated_people.setter
+    def associated_people(self, value: List[str]) -> None:
+        self._store._set_side(self._index, "_associated", value)
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Event):
+            return _same_event(self, other)
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __reduce__(self):
+        # Pickled on its own, a view becomes a standalone Event
+        return (Event, tuple(getattr(self, f) for f in (
+            "event_id", "date", "event_type", "outcome", "details",
+            "location", "associated_people", "category", "severity",
+        )))
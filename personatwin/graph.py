@@ -0,0 +1,443 @@
+"""
+Compact graph structures for large social networks.
+
+Node ids are interned to integers 0..n-1 and undirected edges are kept in
+numpy arrays, so a network of millions of edges costs tens of bytes per
+edge rather than a Python object and two set entries:
+
+- CSRGraph: compressed sparse row adjacency of an undirected graph, with
+  each adjacency entry pointing back to its edge so edge attributes can be
+  kept in parallel arrays
+- group_edges: groups repeated records of the same pair, to deduplicate
+  an edge list before building a CSRGraph
+- UnionFind: disjoint sets with path compression and union by rank;
+  edges can be added incrementally
+- connected_components: components of a CSRGraph, through UnionFind
+- clique_pairs: member pairs of a clique, all or by pair number
+- count_triangles: per-node triangle counts (forward algorithm), behind
+  CSRGraph.local_clustering
+- CliqueGraph: explicit edges plus cliques (e.g. shared events), with
+  degrees, clustering and components computed without expanding the
+  cliques into their pairs
+"""
+
+from array import array
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+
+# Neighbor pairs checked per vectorized step of triangle counting
+_TRIANGLE_CHUNK = 1 << 22
+
+
+class CSRGraph:
+    """
+    Undirected graph in compressed sparse row form.
+    
+    Neighbors of node i are indices[indptr[i]:indptr[i + 1]], sorted, and
+    edge_ids gives, for each adjacency entry, the edge it comes from. Every
+    edge appears in the rows of both endpoints; a self-loop appears once.
+    
+    Edges must be unique: (u, v) and (v, u) may not both be given.
+    """
+    
+    def __init__(
+        self,
+        n_nodes: int,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        edge_ids: Optional[np.ndarray] = None
+    ):
+        self.n_nodes = n_nodes
+        self.sources = np.asarray(sources, dtype=np.int32)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        if edge_ids is None:
+            edge_ids = np.arange(len(self.sources), dtype=np.int32)
+        self.labels = np.asarray(edge_ids, dtype=np.int32)  # Id of each edge
+        
+        # Both directions of every edge, once for self-loops
+        loops = self.sources == self.targets
+        rows = np.concatenate([self.sources, self.targets[~loops]])
+        cols = np.concatenate([self.targets, self.sources[~loops]])
+        ids = np.concatenate([self.labels, self.labels[~loops]])
+        order = np.lexsort((cols, rows))
+        
+        self.indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_nodes), out=self.indptr[1:])
+        self.indices = cols[order]
+        self.edge_ids = ids[order]
+        self._triangles: Optional[np.ndarray] = None
+        self._local_clustering: Optional[np.ndarray] = None
+    
+    @property
+    def n_edges(self) -> int:
+        return len(self.sources)
+    
+    @property
+    def degrees(self) -> np.ndarray:
+        """Number of distinct neighbors of each node (a self-loop counts once)."""
+        return np.diff(self.indptr)
+    
+    def neighbors(self, node: int) -> np.ndarray:
+        """Sorted neighbor nodes of a node."""
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+    
+    def find_edge(self, u: int, v: int) -> Optional[int]:
+        """Edge id of the edge between u and v, or None."""
+        start, end = self.indptr[u], self.indptr[u + 1]
+        position = start + int(np.searchsorted(self.indices[start:end], v))
+        if position < end and self.indices[position] == v:
+            return int(self.edge_ids[position])
+        return None
+    
+    def edge_subgraph(self, mask: np.ndarray) -> 'CSRGraph':
+        """Graph on the same nodes with only the edges where mask is True (edge ids kept)."""
+        return CSRGraph(self.n_nodes, self.sources[mask], self.targets[mask], self.labels[mask])
+    
+    def triangles(self) -> np.ndarray:
+        """Number of triangles through each node (self-loops ignored). Cached."""
+        if self._triangles is None:
+            self._triangles = count_triangles(self.n_nodes, self.sources, self.targets)
+        return self._triangles
+    
+    def local_clustering(self) -> np.ndarray:
+        """
+        Local clustering coefficient of each node: the share of pairs of its
+        neighbors that are linked (0 for nodes with fewer than 2 neighbors).
+        Cached.
+        
+        A node with a self-loop is its own neighbor, and linked to all of
+        its other neighbors.
+        """
+        if self._local_clustering is None:
+            degrees = self.degrees
+            has_loop = np.zeros(self.n_nodes, dtype=bool)
+            has_loop[self.sources[self.sources == self.targets]] = True
+            links = self.triangles() + has_loop * (degrees - 1)
+            possible = degrees * (degrees - 1) / 2
+            self._local_clustering = np.divide(
+                links, possible, out=np.zeros(self.n_nodes), where=possible > 0
+            )
+        return self._local_clustering
+
+
+def group_edges(
+    sources: np.ndarray, targets: np.ndarray, n_nodes: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Group undirected edge records by endpoint pair.
+    
+    Returns:
+        Tuple of (order, starts): order sorts the records by pair, and the
+        records of each distinct pair are order[starts[k]:starts[k + 1]], in
+        their original order
+    """
+    low = np.minimum(sources, targets).astype(np.int64)
+    high = np.maximum(sources, targets).astype(np.int64)
+    return group_by(low * max(n_nodes, 1) + high)
+
+
+class UnionFind:
+    """
+    Disjoint sets over nodes 0..n-1, with path compression and union by rank.
+    
+    Grows as higher node numbers are used, so edges can be added one at a
+    time while components are kept up to date.
+    """
+    
+    def __init__(self, n_nodes: int = 0):
+        self.parent = array("i", range(n_nodes))
+        self.rank = array("b", bytes(n_nodes))
+    
+    def __len__(self) -> int:
+        return len(self.parent)
+    
+    def grow(self, n_nodes: int) -> None:
+        """Add singleton sets up to node n_nodes - 1."""
+        if n_nodes > len(self.parent):
+            self.parent.extend(range(len(self.parent), n_nodes))
+            self.rank.extend(bytes(n_nodes - len(self.rank)))
+    
+    def find(self, node: int) -> int:
+        """Representative of a node's set."""
+        parent = self.parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression: point the whole path at the root
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+    
+    def union(self, u: int, v: int) -> bool:
+        """Merge the sets of u and v; False if they were already one set."""
+        self.grow(max(u, v) + 1)
+        u, v = self.find(u), self.find(v)
+        if u == v:
+            return False
+        rank = self.rank
+        if rank[u] < rank[v]:
+            u, v = v, u
+        self.parent[v] = u
+        if rank[u] == rank[v]:
+            rank[u] += 1
+        return True
+    
+    def union_edges(self, sources: np.ndarray, targets: np.ndarray) -> None:
+        """Merge the endpoints of every edge."""
+        union = self.union
+        for u, v in zip(sources.tolist(), targets.tolist()):
+            union(u, v)
+    
+    def components(self, min_size: int = 1) -> List[np.ndarray]:
+        """Nodes of each set of at least min_size nodes, sets ordered by their smallest node."""
+        n_nodes = len(self.parent)
+        find = self.find
+        roots = np.fromiter((find(node) for node in range(n_nodes)), dtype=np.int64, count=n_nodes)
+        order, starts = group_by(roots)
+        groups = [
+            group
+            for group in np.split(order.astype(np.int32), starts[1:])
+            if len(group) >= min_size
+        ]
+        groups.sort(key=lambda group: group[0])
+        return groups
+
+
+def group_by(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions grouped by label: order sorts positions by label (stable),
+    and group k is order[starts[k]:starts[k + 1]].
+    """
+    order = np.argsort(labels, kind="stable")
+    if not len(labels):
+        return order, np.zeros(0, dtype=np.int64)
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_labels[1:] != sorted_labels[:-1]]))
+    return order, starts
+
+
+def count_triangles(n_nodes: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Triangles through each node of an undirected graph with unique edges.
+    
+    Forward algorithm: nodes are ranked by degree and every edge points
+    from its lower- to its higher-ranked end, so each triangle is found
+    exactly once, from its lowest-ranked node, as a pair of that node's
+    out-neighbors that are linked. Out-degrees stay small even at hubs,
+    which makes the number of pairs checked far below the sum of squared
+    degrees. Pairs are generated and checked against the sorted edge keys
+    in vectorized chunks.
+    """
+    keep = sources != targets
+    sources = sources[keep].astype(np.int64)
+    targets = targets[keep].astype(np.int64)
+    triangles = np.zeros(n_nodes, dtype=np.int64)
+    if not len(sources):
+        return triangles
+    
+    degrees = np.bincount(sources, minlength=n_nodes) + np.bincount(targets, minlength=n_nodes)
+    rank = np.empty(n_nodes, dtype=np.int64)
+    rank[np.lexsort((np.arange(n_nodes), degrees))] = np.arange(n_nodes)
+    forward = rank[sources] < rank[targets]
+    low = np.where(forward, sources, targets)
+    high = np.where(forward, targets, sources)
+    order = np.lexsort((high, low))
+    low, high = low[order], high[order]
+    
+    # Out-neighbor lists: each position pairs with the later positions of its list
+    out_ptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(low, minlength=n_nodes), out=out_ptr[1:])
+    positions = np.arange(len(low), dtype=np.int64)
+    partners = out_ptr[low + 1] - positions - 1
+    ends = np.cumsum(partners)
+    
+    keys = np.sort(np.minimum(sources, targets) * n_nodes + np.maximum(sources, targets))
+    bounds = np.searchsorted(ends, np.arange(_TRIANGLE_CHUNK, int(ends[-1]), _TRIANGLE_CHUNK))
+    for chunk in np.split(positions, np.unique(bounds)):
+        counts = partners[chunk]
+        total = int(counts.sum())
+        if not total:
+            continue
+        first = np.repeat(chunk, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = first + 1 + offsets
+        v, w = high[first], high[second]
+        wanted = np.minimum(v, w) * n_nodes + np.maximum(v, w)
+        found = keys[np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)] == wanted
+        for nodes in (low[first[found]], v[found], w[found]):
+            triangles += np.bincount(nodes, minlength=n_nodes)
+    return triangles
+
+
+def clique_pairs(size: int, numbers: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs (i, j), i < j, of members 0..size-1 of a clique.
+    
+    Pairs are numbered in lexicographic order, (0, 1), (0, 2), ...; all
+    of them are returned, or only the given pair numbers.
+    """
+    if numbers is None:
+        return np.triu_indices(size, 1)
+    numbers = np.asarray(numbers, dtype=np.int64)
+    first_pair = lambda i: i * (2 * size - i - 1) // 2  # Number of pair (i, i + 1)
+    # Invert first_pair, then correct floating-point rounding
+    root = np.sqrt(np.maximum((2 * size - 1) ** 2 - 8 * numbers, 0))
+    i = np.clip(((2 * size - 1 - root) // 2).astype(np.int64), 0, max(size - 2, 0))
+    i += first_pair(i + 1) <= numbers
+    i -= first_pair(i) > numbers
+    return i, numbers - first_pair(i) + i + 1
+
+
+class CliqueGraph:
+    """
+    Undirected graph of explicit edges plus cliques, the cliques kept compressed.
+    
+    Cliques are taken largest first and each keeps its members not already
+    in an earlier clique as a compressed clique, so compressed cliques never
+    share nodes. Pairs a clique shares with earlier ones (and whole cliques
+    of fewer than min_clique_size new members) are expanded into the
+    residual graph, together with the explicit edges, less the pairs that
+    lie inside a compressed clique.
+    
+    A node v in a compressed clique of size k has the k - 1 other members
+    as neighbors besides its residual ones, and those members are all
+    linked, so its degree and triangle count follow in closed form:
+    C(k - 1, 2) triangles inside the clique, the residual triangles, and two
+    corrections: pairs of residual neighbors inside one clique, and
+    residual edges between v's clique and its residual neighbors. Both come
+    from per-(node, clique) counts of residual neighbors, so the cost is
+    linear in the residual edges and clique sizes, not in their pairs.
+    
+    Offers the CSRGraph queries the network metrics use: degrees,
+    triangles, local_clustering and components.
+    """
+    
+    def __init__(
+        self,
+        n_nodes: int,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        cliques: Sequence[np.ndarray] = (),
+        min_clique_size: int = 3
+    ):
+        self.n_nodes = n_nodes
+        self.labels = np.full(n_nodes, -1, dtype=np.int64)  # Compressed clique of each node
+        self.cliques: List[np.ndarray] = []  # Members of each compressed clique
+        
+        expanded_sources = [np.asarray(sources, dtype=np.int64)]
+        expanded_targets = [np.asarray(targets, dtype=np.int64)]
+        members_of = [np.unique(np.asarray(clique, dtype=np.int64)) for clique in cliques]
+        for members in sorted(members_of, key=len, reverse=True):
+            new = self.labels[members] < 0
+            if new.sum() >= min_clique_size:
+                self.labels[members[new]] = len(self.cliques)
+                self.cliques.append(members[new])
+                compressed, rest = members[new], members[~new]
+            else:
+                compressed, rest = members[:0], members
+            # Pairs outside the compressed part: within rest, and rest x compressed
+            firsts, seconds = clique_pairs(len(rest))
+            expanded_sources += [rest[firsts], np.repeat(rest, len(compressed))]
+            expanded_targets += [rest[seconds], np.tile(compressed, len(rest))]
+        
+        sources = np.concatenate(expanded_sources)
+        targets = np.concatenate(expanded_targets)
+        inside = (self.labels[sources] >= 0) & (self.labels[sources] == self.labels[targets])
+        inside &= sources != targets  # Self-loops stay residual edges
+        sources, targets = sources[~inside], targets[~inside]
+        if len(sources):
+            order, starts = group_edges(sources, targets, n_nodes)
+            sources, targets = sources[order[starts]], targets[order[starts]]
+        self.residual = CSRGraph(n_nodes, sources, targets)
+        self.sizes = np.array([len(members) for members in self.cliques], dtype=np.int64)
+        self._triangles: Optional[np.ndarray] = None
+        self._local_clustering: Optional[np.ndarray] = None
+    
+    @property
+    def n_edges(self) -> int:
+        """Number of distinct edges."""
+        return self.residual.n_edges + int((self.sizes * (self.sizes - 1) // 2).sum())
+    
+    @property
+    def degrees(self) -> np.ndarray:
+        """Number of distinct neighbors of each node (a self-loop counts once)."""
+        return self.residual.degrees + self._clique_neighbors()
+    
+    def _clique_neighbors(self) -> np.ndarray:
+        """Other members of each node's compressed clique (0 outside cliques)."""
+        neighbors = np.zeros(self.n_nodes, dtype=np.int64)
+        inside = self.labels >= 0
+        neighbors[inside] = self.sizes[self.labels[inside]] - 1
+        return neighbors
+    
+    def triangles(self) -> np.ndarray:
+        """Number of triangles through each node (self-loops ignored). Cached."""
+        if self._triangles is not None:
+            return self._triangles
+        
+        residual = self.residual
+        clique_neighbors = self._clique_neighbors()
+        triangles = residual.triangles() + clique_neighbors * (clique_neighbors - 1) // 2
+        
+        # Residual adjacency in both directions, self-loops left out
+        rows = np.repeat(np.arange(self.n_nodes, dtype=np.int64), residual.degrees)
+        cols = residual.indices.astype(np.int64)
+        keep = rows != cols
+        rows, cols = rows[keep], cols[keep]
+        labels = self.labels
+        in_clique = labels[cols] >= 0
+        if len(self.cliques) and in_clique.any():
+            # Residual neighbors of each node per compressed clique
+            n_cliques = len(self.cliques)
+            keys, counts = np.unique(
+                rows[in_clique] * n_cliques + labels[cols[in_clique]], return_counts=True
+            )
+            # Pairs of residual neighbors inside one clique are linked
+            triangles += np.bincount(
+                keys // n_cliques, weights=counts * (counts - 1) // 2, minlength=self.n_nodes
+            ).astype(np.int64)
+            # Residual edges from each residual neighbor y of v into v's clique, v itself excluded
+            from_clique = labels[rows] >= 0
+            wanted = cols[from_clique] * n_cliques + labels[rows[from_clique]]
+            found = np.searchsorted(keys, wanted)
+            links = counts[np.minimum(found, len(keys) - 1)] - 1
+            triangles += np.bincount(
+                rows[from_clique], weights=links, minlength=self.n_nodes
+            ).astype(np.int64)
+        
+        self._triangles = triangles
+        return triangles
+    
+    def local_clustering(self) -> np.ndarray:
+        """Local clustering coefficient of each node, as CSRGraph.local_clustering. Cached."""
+        if self._local_clustering is None:
+            degrees = self.degrees
+            residual = self.residual
+            has_loop = np.zeros(self.n_nodes, dtype=bool)
+            has_loop[residual.sources[residual.sources == residual.targets]] = True
+            links = self.triangles() + has_loop * (degrees - 1)
+            possible = degrees * (degrees - 1) / 2
+            self._local_clustering = np.divide(
+                links, possible, out=np.zeros(self.n_nodes), where=possible > 0
+            )
+        return self._local_clustering
+    
+    def components(self) -> List[np.ndarray]:
+        """Nodes of each connected component, components ordered by their smallest node."""
+        components = UnionFind(self.n_nodes)
+        components.union_edges(self.residual.sources, self.residual.targets)
+        for members in self.cliques:
+            first = int(members[0])
+            for node in members[1:].tolist():
+                components.union(first, node)
+        return components.components()
+
+
+def connected_components(graph: Union[CSRGraph, CliqueGraph]) -> List[np.ndarray]:
+    """Nodes of each connected component, components ordered by their smallest node."""
+    if isinstance(graph, CliqueGraph):
+        return graph.components()
+    components = UnionFind(graph.n_nodes)
+    components.union_edges(graph.sources, graph.targets)
+    return components.components()
@@ -0,0 +1,278 @@
+"""
+Numeric encoding and partitioning of people for merging.
+
+PeopleMerging groups people by an exact demographic key. This module
+works on people encoded once as NumPy columns instead:
+
+- DemographicMatrix: age, gender, ethnicity and county codes per person
+- mondrian_partition: Mondrian-style median cuts into groups of at least k
+- group_centroids / CentroidIndex: nearest existing group for stragglers
+"""
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+import bisect
+import numpy as np
+
+from personatwin.models import Demographics
+
+
+# Column order of DemographicMatrix.columns
+AGE, GENDER, ETHNICITY, COUNTY = range(4)
+
+# Weights of PeopleMerging.calculate_similarity per column
+CATEGORICAL_WEIGHTS = ((GENDER, 0.3), (ETHNICITY, 0.3), (COUNTY, 0.2))
+AGE_WEIGHT = 0.2
+AGE_SCALE = 20  # Years at which age similarity reaches zero
+
+DEFAULT_AGE = 30  # Used for missing ages, as in PeopleMerging's demographic key
+
+
+def county_of(geography: Optional[str]) -> str:
+    """County part of a geography string, as used by the demographic key."""
+    geo = geography or "unknown"
+    return geo.split(",")[0] if "," in geo else geo
+
+
+@dataclass
+class DemographicMatrix:
+    """
+    People's demographics encoded as a float64 (n, 4) matrix.
+    
+    Categorical columns hold codes into the sorted value lists, so
+    neighbouring codes are neighbouring values and median cuts on codes
+    keep similar values together. Missing categories are "unknown".
+    """
+    columns: np.ndarray
+    genders: List[str]
+    ethnicities: List[str]
+    counties: List[str]
+    
+    def __len__(self) -> int:
+        return len(self.columns)
+    
+    @classmethod
+    def from_demographics(cls, demographics: Sequence[Demographics]) -> 'DemographicMatrix':
+        """Encode a sequence of demographics in one pass per column."""
+        n = len(demographics)
+        columns = np.empty((n, 4), dtype=np.float64)
+        columns[:, AGE] = [d.age or DEFAULT_AGE for d in demographics]
+        
+        def encode(values: List[str], column: int) -> List[str]:
+            if n == 0:
+                return []
+            uniques, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+            columns[:, column] = codes.reshape(-1)
+            return [str(value) for value in uniques]
+        
+        genders = encode([d.gender or "unknown" for d in demographics], GENDER)
+        ethnicities = encode([d.ethnicity or "unknown" for d in demographics], ETHNICITY)
+        counties = encode([county_of(d.geography) for d in demographics], COUNTY)
+        return cls(columns, genders, ethnicities, counties)
+
+
+def mondrian_partition(
+    columns: np.ndarray,
+    min_size: int,
+    max_size: Optional[int] = None
+) -> List[np.ndarray]:
+    """
+    Split rows into groups of at least min_size by recursive median cuts.
+    
+    Each partition is cut on the column with the widest range relative to
+    the whole population, at the boundary between distinct values closest
+    to the median, provided both halves keep min_size rows. Partitions no
+    column can cut that way are leaves; leaves larger than max_size are
+    halved at the median row regardless of ties. Every row lands in
+    exactly one group, and every group has at least min_size rows unless
+    the whole input is smaller than that.
+    
+    Rows are sorted once per column and each cut splits those orders
+    stably, so partitioning costs O(n log n) overall.
+    
+    Args:
+        columns: (n, d) numeric matrix (e.g. DemographicMatrix.columns)
+        min_size: Minimum rows per group (k)
+        max_size: Optional size above which leaves are halved anyway
+    
+    Returns:
+        Arrays of row indices, one per group, in a deterministic order
+    """
+    n, dims = columns.shape
+    if n == 0:
+        return []
+    min_size = max(min_size, 1)
+    if n < 2 * min_size:
+        return [np.arange(n)]
+    
+    global_span = columns.max(axis=0) - columns.min(axis=0)
+    global_span[global_span == 0] = 1.0
+    in_left = np.zeros(n, dtype=bool)
+    
+    groups: List[np.ndarray] = []
+    # Each partition is its rows sorted by each column; right halves are
+    # pushed first so leaves come out left to right
+    stack = [[np.argsort(columns[:, d], kind="stable") for d in range(dims)]]
+    
+    while stack:
+        orders = stack.pop()
+        size = len(orders[0])
+        cut = _choose_cut(columns, orders, min_size, global_span)
+        if cut is None and max_size is not None and size > max_size and size >= 2 * min_size:
+            cut = (_widest_column(columns, orders, global_span), size // 2)
+        if cut is None:
+            groups.append(np.sort(orders[0]))
+            continue
+        
+        column, position = cut
+        left = orders[column][:position]
+        in_left[left] = True
+        left_orders = [order[in_left[order]] for order in orders]
+        right_orders = [order[~in_left[order]] for order in orders]
+        in_left[left] = False
+        
+        stack.append(right_orders)
+        stack.append(left_orders)
+    
+    return groups
+
+
+def _choose_cut(
+    columns: np.ndarray,
+    orders: List[np.ndarray],
+    min_size: int,
+    global_span: np.ndarray
+):
+    """Best (column, position) median cut between distinct values, or None."""
+    size = len(orders[0])
+    if size < 2 * min_size:
+        return None
+    
+    spans = []
+    for d, order in enumerate(orders):
+        values = columns[order, d]
+        spans.append(((values[-1] - values[0]) / global_span[d], d, values))
+    
+    # Widest relative range first
+    for span, d, values in sorted(spans, key=lambda item: (-item[0], item[1])):
+        if span == 0:
+            break
+        # Positions where a new value starts, within the allowed range
+        starts = np.flatnonzero(values[1:] != values[:-1]) + 1
+        starts = starts[(starts >= min_size) & (starts <= size - min_size)]
+        if len(starts):
+            position = starts[np.argmin(np.abs(starts - size / 2))]
+            return d, int(position)
+    return None
+
+
+def _widest_column(columns: np.ndarray, orders: List[np.ndarray], global_span: np.ndarray) -> int:
+    """Column with the widest range relative to the population."""
+    spans = [
+        (columns[order[-1], d] - columns[order[0], d]) / global_span[d]
+        for d, order in enumerate(orders)
+    ]
+    return int(np.argmax(spans))
+
+
+def group_centroids(columns: np.ndarray, labels: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Centroid of each group of rows: mean age and most common category codes.
+    
+    Ties between equally common categories go to the smallest code.
+    """
+    centroids = np.zeros((n_groups, columns.shape[1]), dtype=np.float64)
+    sizes = np.bincount(labels, minlength=n_groups)
+    centroids[:, AGE] = np.bincount(labels, weights=columns[:, AGE], minlength=n_groups)
+    centroids[:, AGE] /= np.maximum(sizes, 1)
+    
+    for column, _ in CATEGORICAL_WEIGHTS:
+        codes = columns[:, column].astype(np.int64)
+        width = int(codes.max()) + 1 if len(codes) else 1
+        pairs, counts = np.unique(labels * width + codes, return_counts=True)
+        pair_labels, pair_codes = pairs // width, pairs % width
+        # Per label: highest count first, then smallest code
+        order = np.lexsort((pair_codes, -counts, pair_labels))
+        first = np.r_[True, pair_labels[order][1:] != pair_labels[order][:-1]]
+        chosen = order[first]
+        centroids[pair_labels[chosen], column] = pair_codes[chosen]
+    
+    return centroids
+
+
+class CentroidIndex:
+    """
+    Find the group centroid most similar to a row, without scanning all groups.
+    
+    Similarity uses PeopleMerging.calculate_similarity's weights: 0.3 for
+    matching gender, 0.3 for ethnicity, 0.2 for county and up to 0.2 for
+    age closeness. Centroids are bucketed once for every subset of the
+    categorical columns, keyed by those columns' codes, with ages sorted
+    within each bucket. The best centroid matches the row on some subset,
+    and the centroid with the nearest age in that subset's bucket scores
+    at least as well, so checking the age neighbours in the row's bucket
+    for each subset finds the exact maximum. Subsets are tried from the
+    highest attainable score down, stopping once none can do better.
+    """
+    
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = centroids
+        self._rows = centroids.tolist()  # Plain floats are faster to compare one by one
+        # Subsets with the highest attainable score first, so lookups can stop early
+        subsets = [
+            tuple(
+                (column, weight)
+                for (column, weight), keep in zip(CATEGORICAL_WEIGHTS, mask)
+                if keep
+            )
+            for mask in product((True, False), repeat=len(CATEGORICAL_WEIGHTS))
+        ]
+        subsets.sort(key=lambda subset: -sum(weight for _, weight in subset))
+        self.subsets = [tuple(column for column, _ in subset) for subset in subsets]
+        self.bounds = [AGE_WEIGHT + sum(weight for _, weight in subset) for subset in subsets]
+        self.buckets: Dict[Tuple, Dict[Tuple, Tuple[List[float], List[int]]]] = {}
+        
+        order = np.lexsort((np.arange(len(centroids)), centroids[:, AGE]))
+        for subset in self.subsets:
+            buckets: Dict[Tuple, Tuple[List[float], List[int]]] = {}
+            for group in order.tolist():
+                key = tuple(self._rows[group][column] for column in subset)
+                ages, groups = buckets.setdefault(key, ([], []))
+                ages.append(self._rows[group][AGE])
+                groups.append(group)
+            self.buckets[subset] = buckets
+    
+    def similarity(self, row: Sequence[float], group: int) -> float:
+        """Weighted similarity between an encoded row and a group centroid."""
+        centroid = self._rows[group]
+        score = AGE_WEIGHT * max(0.0, 1 - abs(row[AGE] - centroid[AGE]) / AGE_SCALE)
+        for column, weight in CATEGORICAL_WEIGHTS:
+            if row[column] == centroid[column]:
+                score += weight
+        return score
+    
+    def nearest(self, row: Sequence[float]) -> int:
+        """Index of a most similar centroid (deterministic on ties)."""
+        best_group, best_score = -1, -1.0
+        age = row[AGE]
+        for subset, bound in zip(self.subsets, self.bounds):
+            if best_score >= bound:
+                break  # No remaining subset can do better
+            bucket = self.buckets[subset].get(tuple(row[column] for column in subset))
+            if bucket is None:
+                continue
+            ages, groups = bucket
+            position = bisect.bisect_left(ages, age)
+            # Nearest ages on either side; for equal ages the lowest group
+            candidates = []
+            if position < len(ages):
+                candidates.append(groups[position])
+            if position > 0:
+                below = bisect.bisect_left(ages, ages[position - 1])
+                candidates.append(groups[below])
+            for group in candidates:
+                score = self.similarity(row, group)
+                if score > best_score or (score == best_score and group < best_group):
+                    best_group, best_score = group, score
+        return best_group
@@ -5,14 +5,37 @@ This module implements k-anonymity through merging similar people
 into combined personas.
 """
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from enum import Enum
+import math
 import uuid
+import numpy as np
 
 from personatwin.models import Person, Persona, Demographics, EventPatterns, PrivacyMetadata
 from personatwin.privacy import PrivacyLevel
 from personatwin.event_merging import IntelligentEventMerger, EventMergingStrategy
 from personatwin.domains import Domain
+from personatwin.grouping import (
+    AGE,
+    COUNTY,
+    ETHNICITY,
+    GENDER,
+    DemographicMatrix,
+    CentroidIndex,
+    group_centroids,
+    mondrian_partition,
+)
+from personatwin.aggregation import mode, outcome_distribution, outcome_distributions
+from personatwin.rng import RandomStreams
+from personatwin.profiling import NULL_PROFILER
+from personatwin.similarity import (
+    DEFAULT_CHUNK_CELLS,
+    SimilarityEncoder,
+    similarity_matrix,
+    top_k_similar,
+)
 
 
 # Merging configuration
@@ -26,6 +49,12 @@ MERGING_CRITERIA = {
 }
 
 
+class GroupingStrategy(Enum):
+    """How people are grouped before being merged into personas."""
+    DEMOGRAPHIC_KEY = "demographic_key"  # Exact gender/ethnicity/age bin/county key
+    MONDRIAN = "mondrian"  # Median cuts guaranteeing the minimum group size
+
+
 class PeopleMerging:
     """
     Merge similar people to reduce uniqueness and improve k-anonymity.
@@ -39,13 +68,26 @@ class PeopleMerging:
         privacy_level: PrivacyLevel = PrivacyLevel.MEDIUM,
         min_group_size: int = 5,
         domain: Domain = Domain.CUSTOM,
-        event_merging_strategy: EventMergingStrategy = EventMergingStrategy.SIMILARITY
+        event_merging_strategy: EventMergingStrategy = EventMergingStrategy.SIMILARITY,
+        workers: int = 1,
+        executor: Optional[Executor] = None,
+        chunk_size: Optional[int] = None,
+        seed: Optional[int] = None,
+        grouping_strategy: GroupingStrategy = GroupingStrategy.DEMOGRAPHIC_KEY
     ):
         self.privacy_level = privacy_level
         self.min_group_size = min_group_size
         self.domain = domain
         self.criteria = self._get_merging_criteria()
         self.event_merger = IntelligentEventMerger(domain, event_merging_strategy)
+        self.workers = workers  # Processes used to build personas from groups
+        self.executor = executor  # Optional caller-managed executor (overrides workers)
+        self.chunk_size = chunk_size  # Groups per task; defaults to ~4 tasks per worker
+        self.seed = seed  # Makes persona IDs reproducible when set
+        self.streams = RandomStreams(seed) if seed is not None else None
+        self.grouping_strategy = grouping_strategy
+        self.profiler = NULL_PROFILER  # Set by the pipeline to time grouping and event merging
+        self._merge_round = 0
     
     def _get_merging_criteria(self) -> Dict:
         """Get merging criteria based on privacy level."""
@@ -85,22 +127,52 @@ class PeopleMerging:
             return []
         
         # Group people by similarity
-        groups = self._group_by_similarity(people, similarity_threshold)
-        
-        # Create personas from groups
-        personas = []
-        for group in groups:
-            persona = self._create_persona_from_group(group)
-            personas.append(persona)
+        with self.profiler.stage("grouping", items=len(people)):
+            groups = self._group_by_similarity(people, similarity_threshold)
+        self._merge_round += 1
+        
+        # Create personas from groups (independent of each other); this is
+        # where events are merged
+        with self.profiler.stage("event_merging", items=len(groups)):
+            if (self.executor is not None or self.workers > 1) and len(groups) > 1:
+                return self._create_personas_parallel(groups)
+            
+            personas = []
+            for group_index, group in enumerate(groups):
+                persona = self._create_persona_from_group(group, group_index)
+                personas.append(persona)
         
         return personas
     
+    def _create_personas_parallel(self, groups: List[List[Person]]) -> List[Persona]:
+        """Build personas for chunks of groups on a process pool, keeping group order."""
+        chunk_size = self.chunk_size or max(1, math.ceil(len(groups) / (max(self.workers, 1) * 4)))
+        starts = list(range(0, len(groups), chunk_size))
+        chunks = [groups[start:start + chunk_size] for start in starts]
+        
+        if self.executor is not None:
+            results = self.executor.map(_create_persona_chunk, [self] * len(chunks), starts, chunks)
+            return [persona for chunk in results for persona in chunk]
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = executor.map(_create_persona_chunk, [self] * len(chunks), starts, chunks)
+            return [persona for chunk in results for persona in chunk]
+    
+    def __getstate__(self) -> Dict:
+        """Drop the executor when the merger is shipped to worker processes."""
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
+    
     def _group_by_similarity(
         self,
         people: List[Person],
         threshold: float
     ) -> List[List[Person]]:
         """Group people by demographic similarity."""
+        if self.grouping_strategy == GroupingStrategy.MONDRIAN:
+            return self._group_by_partitioning(people)
+        
         # Create demographic keys for grouping
         groups = defaultdict(list)
         
@@ -120,17 +192,49 @@ class PeopleMerging:
         
         # Merge small groups
         if small_groups:
-            if len(small_groups) >= self.criteria["minimum_group_size"]:
-                final_groups.append(small_groups)
-            elif final_groups:
-                # Add to closest existing group
-                final_groups[0].extend(small_groups)
+            if final_groups:
+                # Add each person to the closest existing group
+                self._assign_to_nearest_groups(final_groups, small_groups)
             else:
                 # No choice but to keep small group
                 final_groups.append(small_groups)
         
         return final_groups
     
+    def _assign_to_nearest_groups(
+        self,
+        groups: List[List[Person]],
+        stragglers: List[Person]
+    ) -> None:
+        """Append each straggler to the group whose centroid is most similar."""
+        members = [person for group in groups for person in group]
+        matrix = DemographicMatrix.from_demographics(
+            [p.demographics for p in members] + [p.demographics for p in stragglers]
+        )
+        labels = np.repeat(np.arange(len(groups)), [len(group) for group in groups])
+        centroids = group_centroids(matrix.columns[:len(members)], labels, len(groups))
+        index = CentroidIndex(centroids)
+        
+        for person, row in zip(stragglers, matrix.columns[len(members):].tolist()):
+            groups[index.nearest(row)].append(person)
+    
+    def _group_by_partitioning(self, people: List[Person]) -> List[List[Person]]:
+        """
+        Group people by Mondrian median cuts on age, gender, ethnicity and county.
+        
+        Every group has at least the larger of min_group_size and the privacy
+        level's minimum group size (unless there are fewer people than that),
+        so no leftover bucket is needed.
+        """
+        matrix = DemographicMatrix.from_demographics([p.demographics for p in people])
+        min_size = max(self.min_group_size, self.criteria["minimum_group_size"])
+        partitions = mondrian_partition(
+            matrix.columns,
+            min_size,
+            max_size=self.criteria["maximum_group_size"]
+        )
+        return [[people[i] for i in rows] for rows in partitions]
+    
     def _create_demographic_key(self, demographics: Demographics) -> str:
         """Create a key for grouping similar demographics."""
         # Age bin
@@ -157,9 +261,9 @@ class PeopleMerging:
         
         return "|".join(key_parts)
     
-    def _create_persona_from_group(self, group: List[Person]) -> Persona:
+    def _create_persona_from_group(self, group: List[Person], group_index: int = 0) -> Persona:
         """Create a persona by merging a group of people."""
-        persona_id = str(uuid.uuid4())
+        persona_id = self._persona_id(group_index)
         
         # Merge demographics
         demographics = self._merge_demographics([p.demographics for p in group])
@@ -188,23 +292,55 @@ class PeopleMerging:
             merged_person_ids=[p.person_id for p in group]
         )
     
-    def _merge_demographics(self, demographics_list: List[Demographics]) -> Demographics:
-        """Merge demographics from multiple people."""
+    def _persona_id(self, group_index: int) -> str:
+        """Random persona ID, derived from (seed, merge round, group) when seeded."""
+        if self.seed is None:
+            return str(uuid.uuid4())
+        rng = self.streams.generator("persona_id", self._merge_round, group_index)
+        return str(uuid.UUID(bytes=rng.bytes(16), version=4))
+    
+    def _merge_demographics(
+        self,
+        demographics_list: List[Demographics],
+        weights: Optional[List[int]] = None
+    ) -> Demographics:
+        """
+        Merge demographics from multiple people.
+        
+        weights counts each entry that many times, e.g. the merged_from of
+        personas being combined, so that the result matches merging their
+        people.
+        """
         if not demographics_list:
             return Demographics()
+        if weights is None:
+            weights = [1] * len(demographics_list)
+        
+        def weighted(name: str) -> Tuple[list, list]:
+            """Values of one field that are set, and their weights."""
+            present = [
+                (getattr(d, name), w)
+                for d, w in zip(demographics_list, weights)
+                if getattr(d, name)
+            ]
+            return [value for value, _ in present], [w for _, w in present]
         
         # Take most common values
-        genders = [d.gender for d in demographics_list if d.gender]
-        ethnicities = [d.ethnicity for d in demographics_list if d.ethnicity]
-        geographies = [d.geography for d in demographics_list if d.geography]
-        ages = [d.age for d in demographics_list if d.age]
+        genders, gender_weights = weighted("gender")
+        ethnicities, ethnicity_weights = weighted("ethnicity")
+        geographies, geography_weights = weighted("geography")
+        ages, age_weights = weighted("age")
         
         merged = Demographics(
-            gender=max(set(genders), key=genders.count) if genders else None,
-            ethnicity=max(set(ethnicities), key=ethnicities.count) if ethnicities else None,
-            geography=max(set(geographies), key=geographies.count) if geographies else None,
-            age=int(sum(ages) / len(ages)) if ages else None,
-            confidence_level=1.0 / len(demographics_list)  # Decreases with merging
+            gender=mode(genders, weights=gender_weights),
+            ethnicity=mode(ethnicities, weights=ethnicity_weights),
+            geography=mode(geographies, weights=geography_weights),
+            age=(
+                int(sum(a * w for a, w in zip(ages, age_weights)) / sum(age_weights))
+                if ages
+                else None
+            ),
+            confidence_level=1.0 / len(demographics_list),  # Decreases with merging
         )
         
         # Create age range
@@ -213,8 +349,17 @@ class PeopleMerging:
         
         return merged
     
-    def _extract_event_patterns(self, events: List) -> EventPatterns:
-        """Extract statistical patterns from events."""
+    def _extract_event_patterns(
+        self,
+        events: List,
+        outcome_dist: Optional[Dict[str, float]] = None
+    ) -> EventPatterns:
+        """
+        Extract statistical patterns from events.
+        
+        outcome_dist can be passed in when it was computed for a batch of
+        personas at once (aggregation.outcome_distributions).
+        """
         if not events:
             return EventPatterns()
         
@@ -222,10 +367,8 @@ class PeopleMerging:
         event_types = [str(e.event_type) for e in events if hasattr(e, 'event_type')]
         
         # Calculate outcome distributions
-        outcomes = [str(e.outcome) if hasattr(e, 'outcome') and e.outcome else "unknown" for e in events]
-        outcome_dist = {}
-        for outcome in set(outcomes):
-            outcome_dist[outcome] = outcomes.count(outcome) / len(outcomes)
+        if outcome_dist is None:
+            outcome_dist = outcome_distribution(getattr(e, 'outcome', None) for e in events)
         
         # Temporal patterns (simplified)
         temporal_patterns = {
@@ -240,7 +383,7 @@ class PeopleMerging:
         }
         
         return EventPatterns(
-            event_types=list(set(event_types)),
+            event_types=list(dict.fromkeys(event_types)),  # First-seen order, not hash order
             temporal_patterns=temporal_patterns,
             outcome_distributions=outcome_dist,
             recidivism_indicators=recidivism
@@ -291,6 +434,58 @@ class PeopleMerging:
             return score / total_weight
         return 0.0
     
+    def similarity_matrix(
+        self,
+        people: List[Person],
+        others: Optional[List[Person]] = None
+    ) -> np.ndarray:
+        """
+        Pairwise calculate_similarity scores as a matrix.
+        
+        Args:
+            people: Row people
+            others: Column people (defaults to people)
+            
+        Returns:
+            Array of shape (len(people), len(others)) with exactly the
+            scores calculate_similarity gives for each pair
+        """
+        encoder = SimilarityEncoder()
+        block = encoder.encode([p.demographics for p in people])
+        other_block = block if others is None else encoder.encode([p.demographics for p in others])
+        return similarity_matrix(block, other_block)
+    
+    def top_k_similar(
+        self,
+        people: List[Person],
+        k: int = 10,
+        candidates: Optional[List[Person]] = None,
+        chunk_size: int = DEFAULT_CHUNK_CELLS
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k most similar candidates for each person.
+        
+        Scores are computed for a bounded block of pairs at a time, so
+        memory stays at about chunk_size scores whatever the population.
+        
+        Args:
+            people: People to find neighbours for
+            k: Neighbours per person
+            candidates: People to search (defaults to people, excluding
+                each person themselves)
+            chunk_size: Pair scores computed at once
+            
+        Returns:
+            (indices into candidates, similarity scores), each of shape
+            (len(people), k), most similar first
+        """
+        encoder = SimilarityEncoder()
+        block = encoder.encode([p.demographics for p in people])
+        if candidates is None:
+            return top_k_similar(block, block, k, chunk_size, exclude_self=True)
+        candidate_block = encoder.encode([p.demographics for p in candidates])
+        return top_k_similar(block, candidate_block, k, chunk_size)
+    
     def _same_county(self, geo1: str, geo2: str) -> bool:
         """Check if two geographies are in the same county."""
         # Simplified: check if they share a common prefix
@@ -301,3 +496,141 @@ class PeopleMerging:
             return parts1[0].strip().lower() == parts2[0].strip().lower()
         
         return False
+
+
+class MergeTree:
+    """
+    Agglomeration tree over merged personas, for raising k without re-merging.
+    
+    Leaves are the current personas ordered by (gender, ethnicity, county,
+    age), so neighbouring leaves are similar; the tree is the balanced
+    binary tree over that order. To meet a larger k, coalesce() walks the
+    tree bottom-up: a persona already representing k people stays as it
+    is, and personas below k are pooled with their siblings until each
+    pool reaches k. Pooled personas are combined by running the merger's
+    event merging over their already merged (and noised) events, which
+    are far fewer than the original people's, rather than re-grouping
+    and re-merging the people. The coalesced personas become the leaves
+    for the next escalation.
+    """
+    
+    def __init__(self, merger: PeopleMerging, personas: List[Persona]):
+        self.merger = merger
+        matrix = DemographicMatrix.from_demographics([p.demographics for p in personas])
+        columns = matrix.columns
+        order = np.lexsort(
+            (columns[:, AGE], columns[:, COUNTY], columns[:, ETHNICITY], columns[:, GENDER])
+        )
+        self.leaves: List[Persona] = [personas[i] for i in order]
+    
+    def holds(self, personas: List[Persona]) -> bool:
+        """Whether the tree's leaves are exactly these personas."""
+        if len(personas) != len(self.leaves):
+            return False
+        return {id(p) for p in personas} == {id(p) for p in self.leaves}
+    
+    def coalesce(self, min_size: int) -> List[Persona]:
+        """
+        Combine sibling personas until each represents at least min_size people.
+        
+        Returns:
+            The new leaves (personas), in tree order
+        """
+        if not self.leaves:
+            return []
+        sizes = [p.merged_from for p in self.leaves]
+        clusters, leftover = self._cut(0, len(self.leaves), sizes, min_size)
+        
+        if leftover:
+            if clusters:
+                # Join the cluster nearest in tree order
+                anchor = leftover[0]
+                nearest = min(clusters, key=lambda cluster: min(abs(i - anchor) for i in cluster))
+                nearest.extend(leftover)
+            else:
+                clusters.append(leftover)
+        
+        clusters.sort(key=min)
+        self.merger._merge_round += 1
+        
+        # Events of every pooled cluster merged again, as one group of its
+        # personas' events, then their outcome shares in one batch
+        pooled = {
+            index: [self.leaves[i] for i in sorted(cluster)]
+            for index, cluster in enumerate(clusters) if len(cluster) > 1
+        }
+        event_merger = self.merger.event_merger
+        with self.merger.profiler.stage("event_merging", items=len(pooled)):
+            events = {
+                index: event_merger.merge_events(personas) for index, personas in pooled.items()
+            }
+        distributions = dict(zip(events, outcome_distributions(list(events.values()))))
+        
+        self.leaves = [
+            self._combine(pooled[index], index, events[index], distributions[index])
+            if index in pooled else self.leaves[cluster[0]]
+            for index, cluster in enumerate(clusters)
+        ]
+        return list(self.leaves)
+    
+    def _cut(
+        self, lo: int, hi: int, sizes: List[int], min_size: int
+    ) -> Tuple[List[List[int]], List[int]]:
+        """Clusters of at least min_size in leaves [lo, hi), plus leaves still short."""
+        if hi - lo == 1:
+            return ([[lo]], []) if sizes[lo] >= min_size else ([], [lo])
+        
+        mid = (lo + hi) // 2
+        left_clusters, left_over = self._cut(lo, mid, sizes, min_size)
+        right_clusters, right_over = self._cut(mid, hi, sizes, min_size)
+        clusters = left_clusters + right_clusters
+        leftover = left_over + right_over
+        if leftover and sum(sizes[i] for i in leftover) >= min_size:
+            clusters.append(leftover)
+            leftover = []
+        return clusters, leftover
+    
+    def _combine(
+        self,
+        personas: List[Persona],
+        index: int,
+        events: List,
+        outcome_dist: Dict[str, float]
+    ) -> Persona:
+        """Build one persona from sibling personas and their merged events."""
+        merger = self.merger
+        size = sum(p.merged_from for p in personas)
+        
+        demographics = merger._merge_demographics(
+            [p.demographics for p in personas], [p.merged_from for p in personas]
+        )
+        demographics.confidence_level = 1.0 / size
+        
+        privacy_metadata = PrivacyMetadata(
+            traceability_score=1.0 / size,
+            noise_level=max(p.privacy_metadata.noise_level for p in personas),
+            merge_count=size,
+            generation_method="hierarchical_merging"
+        )
+        
+        return Persona(
+            persona_id=merger._persona_id(index),
+            merged_from=size,
+            demographics=demographics,
+            event_patterns=merger._extract_event_patterns(events, outcome_dist),
+            privacy_metadata=privacy_metadata,
+            events=events,
+            merged_person_ids=[pid for p in personas for pid in p.merged_person_ids]
+        )
+
+
+def _create_persona_chunk(
+    merger: PeopleMerging,
+    start: int,
+    groups: List[List[Person]]
+) -> List[Persona]:
+    """Build personas for a contiguous chunk of groups (runs in worker processes)."""
+    return [
+        merger._create_persona_from_group(group, start + offset)
+        for offset, group in enumerate(groups)
+    ]
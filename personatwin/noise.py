@@ -6,8 +6,8 @@ statistical patterns and research utility.
 """
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import date as date_type, datetime, timedelta
+from typing import List, Dict, Optional, Sequence
 import random
 import numpy as np
 
@@ -15,6 +15,110 @@ from personatwin.models import Event
 from personatwin.privacy import PrivacyLevel
 
 
+# datetime64[D] counts days from 1970-01-01; day numbers are ordinals
+_EPOCH_ORDINAL = date_type(1970, 1, 1).toordinal()
+
+
+def temporal_noise_days(
+    days: np.ndarray,
+    segment_lengths: np.ndarray,
+    max_days: int,
+    rng: Optional[np.random.Generator],
+    shifts: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Array version of add_temporal_noise over int64 day numbers.
+    
+    days holds many personas' events back to back, sorted by date within
+    each persona; segment_lengths gives each persona's event count. Every
+    day is shifted by a uniform draw in [-max_days, max_days] and then
+    pushed forward so each event stays at least one day after the
+    previous noised event of the same persona.
+    
+    Args:
+        days: int64 day numbers (date ordinals), sorted within segments
+        segment_lengths: Number of events of each persona
+        max_days: Maximum shift in days
+        rng: NumPy random generator
+        shifts: Day shifts already drawn, one per day (rng is then unused)
+        
+    Returns:
+        Noised int64 day numbers in the same order
+    """
+    days = np.asarray(days, dtype=np.int64)
+    segment_lengths = np.asarray(segment_lengths, dtype=np.int64)
+    n = len(days)
+    if n == 0:
+        return days.copy()
+    
+    if shifts is None:
+        shifts = rng.integers(-max_days, max_days, size=n, endpoint=True)
+    noised = days + shifts
+    
+    # z[i] = max(y[i], z[i-1] + 1) is z - i = running max of (y - i)
+    segments = np.repeat(np.arange(len(segment_lengths)), segment_lengths)
+    starts = np.cumsum(segment_lengths) - segment_lengths
+    position = np.arange(n) - starts[segments]
+    shifted = noised - position
+    
+    # One running max for all segments: lift each segment above earlier ones
+    low = shifted.min()
+    span = shifted.max() - low + 1
+    lifted = (shifted - low) + segments * span
+    running = np.maximum.accumulate(lifted) - segments * span + low
+    return running + position
+
+
+def _date_shifts(count: int, max_days: int, rng: Optional[np.random.Generator]) -> List[int]:
+    """Uniform day shifts in [-max_days, max_days], from rng or the random module."""
+    if rng is None:
+        return [random.randint(-max_days, max_days) for _ in range(count)]
+    return rng.integers(-max_days, max_days, size=count, endpoint=True).tolist()
+
+
+def _outcome_draws(
+    count: int, valid_outcomes: Optional[Sequence[str]], rng: Optional[np.random.Generator]
+):
+    """
+    (flip, choose) callables for outcome noise over count events.
+    
+    flip() returns a uniform float per event and choose(outcomes) a random
+    outcome. Without rng they are random.random and random.choice, drawn
+    in the same interleaved order as before; with rng both are drawn
+    up front as arrays.
+    """
+    if rng is None:
+        return random.random, random.choice
+    flips = iter(rng.random(count).tolist())
+    picks = iter(rng.integers(len(valid_outcomes), size=count).tolist() if valid_outcomes else ())
+    return flips.__next__, lambda outcomes: outcomes[next(picks)]
+
+
+def truncate_days(days: np.ndarray, precision: str) -> np.ndarray:
+    """
+    Array version of generalize_temporal_precision over int64 day numbers.
+    
+    Maps each day to the first day of its week (Monday), month, quarter or
+    year; "day" precision returns the days unchanged.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if precision == "week":
+        # Ordinal 1 (0001-01-01) is a Monday
+        return days - (days - 1) % 7
+    if precision not in ("month", "quarter", "year"):
+        return days.copy()
+    
+    calendar = (days - _EPOCH_ORDINAL).astype("datetime64[D]")
+    if precision == "year":
+        start = calendar.astype("datetime64[Y]").astype("datetime64[D]")
+    else:
+        months = calendar.astype("datetime64[M]").astype(np.int64)
+        if precision == "quarter":
+            months -= months % 3  # 1970-01 starts a quarter
+        start = months.astype("datetime64[M]").astype("datetime64[D]")
+    return start.astype(np.int64) + _EPOCH_ORDINAL
+
+
 @dataclass
 class NoiseConfig:
     """Configuration for noise generation."""
@@ -77,7 +181,11 @@ class EventNoiseGeneration:
                 synthetic_event_probability=0.2,
             )
     
-    def add_temporal_noise(self, events: List[Event]) -> List[Event]:
+    def add_temporal_noise(
+        self,
+        events: List[Event],
+        rng: Optional[np.random.Generator] = None
+    ) -> List[Event]:
         """
         Add noise to event dates while preserving temporal sequences.
         
@@ -85,23 +193,23 @@ class EventNoiseGeneration:
         - Blur exact dates to time periods
         - Preserve temporal sequences (Event A before Event B)
         - Maintain seasonal patterns if relevant
+        
+        Draws come from rng when given (see RandomStreams), otherwise from
+        the global random module.
         """
         if not events:
             return events
         
         # Sort events by date to preserve order
         sorted_events = sorted(events, key=lambda e: e.date)
+        shifts = _date_shifts(len(sorted_events), self.config.temporal_noise_days, rng)
         
         noised_events = []
         cumulative_shift = timedelta(0)
         
         for i, event in enumerate(sorted_events):
             # Add random noise
-            noise_days = random.randint(
-                -self.config.temporal_noise_days,
-                self.config.temporal_noise_days
-            )
-            noise = timedelta(days=noise_days)
+            noise = timedelta(days=shifts[i])
             
             # Ensure ordering is preserved
             if i > 0:
@@ -132,7 +240,12 @@ class EventNoiseGeneration:
         
         return noised_events
     
-    def add_outcome_noise(self, events: List[Event], valid_outcomes: Optional[List[str]] = None) -> List[Event]:
+    def add_outcome_noise(
+        self,
+        events: List[Event],
+        valid_outcomes: Optional[List[str]] = None,
+        rng: Optional[np.random.Generator] = None
+    ) -> List[Event]:
         """
         Add noise to event outcomes while maintaining realism.
         
@@ -140,15 +253,19 @@ class EventNoiseGeneration:
         - Slightly modify outcomes within realistic ranges
         - Preserve overall statistical distributions
         - Ensure legal/logical realism
+        
+        Draws come from rng when given (see RandomStreams), otherwise from
+        the global random module.
         """
         noised_events = []
+        flip, choose = _outcome_draws(len(events), valid_outcomes, rng)
         
         for event in events:
-            if random.random() < self.config.outcome_noise_probability:
+            if flip() < self.config.outcome_noise_probability:
                 # Add noise to this outcome
                 if valid_outcomes and event.outcome in valid_outcomes:
                     # Choose a similar valid outcome
-                    new_outcome = random.choice(valid_outcomes)
+                    new_outcome = choose(valid_outcomes)
                 else:
                     # Keep original
                     new_outcome = event.outcome
@@ -236,7 +353,8 @@ class EventNoiseGeneration:
     def add_noise_to_events(
         self,
         events: List[Event],
-        valid_outcomes: Optional[List[str]] = None
+        valid_outcomes: Optional[List[str]] = None,
+        rng: Optional[np.random.Generator] = None
     ) -> List[Event]:
         """
         Apply all noise strategies to events.
@@ -244,21 +362,193 @@ class EventNoiseGeneration:
         Args:
             events: Original events
             valid_outcomes: Valid outcomes for domain (for realistic outcome noise)
+            rng: Optional NumPy random generator (global random module if omitted)
             
         Returns:
             Events with noise applied
         """
-        # Apply temporal noise
-        noised_events = self.add_temporal_noise(events)
+        return self.apply_noise(events, valid_outcomes, rng=rng)
+    
+    def apply_noise(
+        self,
+        events: List[Event],
+        valid_outcomes: Optional[List[str]] = None,
+        precision: Optional[str] = None,
+        in_place: bool = False,
+        rng: Optional[np.random.Generator] = None
+    ) -> List[Event]:
+        """
+        Apply temporal, outcome and location noise and temporal precision in one pass.
         
-        # Apply outcome noise
-        noised_events = self.add_outcome_noise(noised_events, valid_outcomes)
+        Equivalent to add_temporal_noise, add_outcome_noise,
+        generalize_locations and generalize_temporal_precision applied in
+        turn (random numbers are drawn in the same order, so a seeded run
+        gives the same events), but each event is copied at most once.
         
-        # Generalize locations
-        noised_events = self.generalize_locations(noised_events)
+        Args:
+            events: Original events
+            valid_outcomes: Valid outcomes for domain (for realistic outcome noise)
+            precision: Optional "day", "week", "month", "quarter" or "year" generalization
+            in_place: Modify the given events instead of copying them; only
+                for callers that own the events
+            rng: Optional NumPy random generator, e.g. a persona's stream
+                from RandomStreams (global random module if omitted)
+            
+        Returns:
+            Events with noise applied, sorted by date
+        """
+        if not events:
+            return []
+        
+        sorted_events = sorted(events, key=lambda e: e.date)
+        
+        # add_temporal_noise draws every date shift before any outcome draw
+        shifts = _date_shifts(len(sorted_events), self.config.temporal_noise_days, rng)
+        flip, choose = _outcome_draws(len(sorted_events), valid_outcomes, rng)
+        
+        noised_events = []
+        previous_date = None
+        one_day = timedelta(days=1)
+        
+        for event, shift in zip(sorted_events, shifts):
+            # Temporal noise, keeping each event after the previous one
+            date = event.date + timedelta(days=shift)
+            if previous_date is not None and date < previous_date + one_day:
+                date = previous_date + one_day
+            previous_date = date
+            
+            # Outcome noise
+            outcome = event.outcome
+            if flip() < self.config.outcome_noise_probability:
+                if valid_outcomes and outcome in valid_outcomes:
+                    outcome = choose(valid_outcomes)
+            
+            # Location generalization
+            if event.location:
+                location = self._generalize_location(
+                    event.location,
+                    self.config.location_generalization_level
+                )
+            else:
+                location = None
+            
+            if precision:
+                date = self._truncate_date(date, precision)
+            
+            if in_place:
+                event.date = date
+                event.outcome = outcome
+                event.location = location
+                noised_events.append(event)
+            else:
+                noised_events.append(Event(
+                    event_id=event.event_id,
+                    date=date,
+                    event_type=event.event_type,
+                    outcome=outcome,
+                    details=event.details.copy(),
+                    location=location,
+                    associated_people=event.associated_people.copy(),
+                    category=event.category,
+                    severity=event.severity,
+                ))
         
         return noised_events
     
+    def add_noise_to_event_batch(
+        self,
+        event_lists: Sequence[Sequence[Event]],
+        valid_outcomes: Optional[List[str]] = None,
+        precision: Optional[str] = None,
+        rng: Optional[np.random.Generator] = None,
+        rngs: Optional[Sequence[np.random.Generator]] = None
+    ) -> List[List[Event]]:
+        """
+        Apply noise to many personas' events at once using array operations.
+        
+        Same noise model as apply_noise, but dates are noised and truncated
+        as int64 day arrays (temporal_noise_days, truncate_days) and all
+        random draws come from a NumPy Generator. Ordering is enforced at
+        day granularity; times of day are kept as they are.
+        
+        Args:
+            event_lists: Events of each persona
+            valid_outcomes: Valid outcomes for domain (for realistic outcome noise)
+            precision: Optional "day", "week", "month", "quarter" or "year" generalization
+            rng: NumPy random generator (a fresh unseeded one if omitted)
+            rngs: One generator per persona instead of rng; each persona's
+                draws then come from its own stream, whatever the batch
+            
+        Returns:
+            Noised events of each persona, sorted by date
+        """
+        if rng is None and rngs is None:
+            rng = np.random.default_rng()
+        ordered = [sorted(events, key=lambda e: e.date) for events in event_lists]
+        lengths = np.array([len(events) for events in ordered], dtype=np.int64)
+        flat = [event for events in ordered for event in events]
+        if not flat:
+            return [[] for _ in ordered]
+        
+        max_days = self.config.temporal_noise_days
+        if rngs is not None:
+            # Each persona's shifts, flips and outcome picks from its own stream
+            draws = [
+                (
+                    stream.integers(-max_days, max_days, size=count, endpoint=True),
+                    stream.random(count),
+                    stream.integers(len(valid_outcomes), size=count) if valid_outcomes else None,
+                )
+                for stream, count in zip(rngs, lengths.tolist())
+            ]
+            shifts = np.concatenate([draw[0] for draw in draws])
+            uniforms = np.concatenate([draw[1] for draw in draws])
+            choices = np.concatenate([draw[2] for draw in draws]) if valid_outcomes else None
+        else:
+            shifts = rng.integers(-max_days, max_days, size=len(flat), endpoint=True)
+            uniforms = rng.random(len(flat))
+            choices = rng.integers(len(valid_outcomes), size=len(flat)) if valid_outcomes else None
+        # Outcome noise: one draw per event, then a replacement where needed
+        flips = uniforms < self.config.outcome_noise_probability
+        
+        dates = [event.date for event in flat]
+        days = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(flat))
+        noised_days = temporal_noise_days(days, lengths, max_days, None, shifts=shifts)
+        if precision:
+            noised_days = truncate_days(noised_days, precision)
+        
+        level = self.config.location_generalization_level
+        generalized: Dict[str, str] = {}
+        
+        noised_events = []
+        for i, (event, day) in enumerate(zip(flat, noised_days.tolist())):
+            outcome = event.outcome
+            if flips[i] and valid_outcomes and outcome in valid_outcomes:
+                outcome = valid_outcomes[choices[i]]
+            
+            location = None
+            if event.location:
+                location = generalized.get(event.location)
+                if location is None:
+                    location = self._generalize_location(event.location, level)
+                    generalized[event.location] = location
+            
+            noised_events.append(Event(
+                event_id=event.event_id,
+                date=datetime.combine(date_type.fromordinal(day), dates[i].timetz()),
+                event_type=event.event_type,
+                outcome=outcome,
+                details=event.details.copy(),
+                location=location,
+                associated_people=event.associated_people.copy(),
+                category=event.category,
+                severity=event.severity,
+            ))
+        
+        ends = np.cumsum(lengths).tolist()
+        starts = [0] + ends[:-1]
+        return [noised_events[start:end] for start, end in zip(starts, ends)]
+    
     def generalize_temporal_precision(
         self,
         events: List[Event],
@@ -277,22 +567,7 @@ class EventNoiseGeneration:
         generalized_events = []
         
         for event in events:
-            date = event.date
-            
-            if precision == "week":
-                # First day of week
-                date = date - timedelta(days=date.weekday())
-            elif precision == "month":
-                # First day of month
-                date = date.replace(day=1)
-            elif precision == "quarter":
-                # First day of quarter
-                quarter_month = ((date.month - 1) // 3) * 3 + 1
-                date = date.replace(month=quarter_month, day=1)
-            elif precision == "year":
-                # First day of year
-                date = date.replace(month=1, day=1)
-            # "day" precision keeps the date as-is
+            date = self._truncate_date(event.date, precision)
             
             generalized_event = Event(
                 event_id=event.event_id,
@@ -309,3 +584,22 @@ class EventNoiseGeneration:
             generalized_events.append(generalized_event)
         
         return generalized_events
+    
+    @staticmethod
+    def _truncate_date(date: datetime, precision: str) -> datetime:
+        """Truncate a date to the start of its week, month, quarter or year."""
+        if precision == "week":
+            # First day of week
+            return date - timedelta(days=date.weekday())
+        elif precision == "month":
+            # First day of month
+            return date.replace(day=1)
+        elif precision == "quarter":
+            # First day of quarter
+            quarter_month = ((date.month - 1) // 3) * 3 + 1
+            return date.replace(month=quarter_month, day=1)
+        elif precision == "year":
+            # First day of year
+            return date.replace(month=1, day=1)
+        # "day" precision keeps the date as-is
+        return date
@@ -5,19 +5,24 @@ This module implements the end-to-end pipeline for generating
 privacy-protected personas from sensitive people-events data.
 """
 
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Iterable, List, Optional, Dict, Any
+from dataclasses import dataclass, field
 import logging
 
 from personatwin.models import Person, Persona
+from personatwin.event_store import EventStore, Interner
 from personatwin.privacy import (
     PrivacyLevel,
+    RiskEngine,
     RiskMetrics,
     PopulationTraceability,
     AutoPrivacyAdjustment,
+    IncrementalRiskTracker,
 )
-from personatwin.merging import PeopleMerging
+from personatwin.merging import PeopleMerging, GroupingStrategy, MergeTree
 from personatwin.noise import EventNoiseGeneration
+from personatwin.rng import RandomStreams
+from personatwin.profiling import Profiler, PipelineProfile, ProfileSink
 from personatwin.domains import DomainConfig, Domain, get_domain_config
 from personatwin.llm_integration import LLMPrivacyAssistant, SyntheticEventGenerator, LLMConfig
 
@@ -37,6 +42,16 @@ class ProcessingConfig:
     use_census_data: bool = True  # Use public census data for enhanced privacy
     max_iterations: int = 5  # Maximum privacy adjustment iterations
     min_k_anonymity: int = 5
+    risk_engine: RiskEngine = RiskEngine.INDEXED  # How persona uniqueness is scored
+    incremental_risk: bool = True  # Re-score only changed personas between iterations
+    workers: int = 1  # Processes used to build personas from merged groups
+    random_seed: Optional[int] = None  # Seed for reproducible runs
+    compact_events: bool = False  # Keep persona events in array-backed EventStores
+    vectorized_noise: bool = False  # Noise all personas' dates as NumPy arrays
+    grouping_strategy: GroupingStrategy = GroupingStrategy.DEMOGRAPHIC_KEY  # How people are grouped
+    hierarchical_merging: bool = False  # Raise k by coalescing personas, not re-merging people
+    profile: bool = False  # Record per-stage timings on ProcessingResult.profile
+    profile_sinks: List[ProfileSink] = field(default_factory=list)  # Also enables profiling
 
 
 @dataclass
@@ -47,6 +62,7 @@ class ProcessingResult:
     iterations: int
     success: bool
     message: str
+    profile: Optional[PipelineProfile] = None  # Stage timings when profiling is enabled
     
     def is_safe_for_public(self) -> bool:
         """Check if data is safe for public release."""
@@ -67,6 +83,7 @@ class ProcessingResult:
             "message": self.message,
             "safe_for_public": self.is_safe_for_public(),
             "safe_for_research": self.is_safe_for_research(),
+            "profile": self.profile.to_dict() if self.profile else None,
         }
 
 
@@ -94,19 +111,38 @@ class PersonaTwinPipeline:
         # Initialize components
         self.merger = PeopleMerging(
             privacy_level=self.config.privacy_level,
-            min_group_size=self.config.min_k_anonymity
+            min_group_size=self.config.min_k_anonymity,
+            workers=self.config.workers,
+            seed=self.config.random_seed,
+            grouping_strategy=self.config.grouping_strategy
         )
         self.noise_generator = EventNoiseGeneration(
             privacy_level=self.config.privacy_level
         )
+        self.streams = RandomStreams(self.config.random_seed)  # Noise draws keyed by persona
+        self._noise_round = 0  # Privacy-adjustment noise rounds so far
+        self.event_vocabulary = Interner()  # Codes of the run's compact event stores
         self.risk_calculator = PopulationTraceability(
             privacy_level=self.config.privacy_level,
-            use_census_data=self.config.use_census_data
+            use_census_data=self.config.use_census_data,
+            risk_engine=self.config.risk_engine
         )
+        self.merge_tree: Optional[MergeTree] = None
+        self.risk_tracker = None
+        if self.config.incremental_risk and self.config.risk_engine == RiskEngine.INDEXED:
+            self.risk_tracker = IncrementalRiskTracker(self.risk_calculator)
         self.privacy_adjuster = AutoPrivacyAdjustment(
             privacy_level=self.config.privacy_level
         )
         
+        # Stage profiling (a no-op unless enabled)
+        self.profiler = Profiler(
+            enabled=self.config.profile or bool(self.config.profile_sinks),
+            sinks=self.config.profile_sinks
+        )
+        self.merger.profiler = self.profiler
+        self.risk_calculator.profiler = self.profiler
+        
         # Optional LLM assistant
         if self.config.enable_llm and self.config.llm_config:
             self.llm_assistant = LLMPrivacyAssistant(self.config.llm_config)
@@ -143,6 +179,8 @@ class PersonaTwinPipeline:
             )
         
         target_risk = target_risk_level or self.config.target_population_risk
+        self.profiler.reset()
+        self.event_vocabulary = Interner()
         
         logger.info(f"Processing {len(input_data)} people...")
         logger.info(f"Domain: {self.domain_config.domain.value}")
@@ -153,14 +191,83 @@ class PersonaTwinPipeline:
         validated_data = self._validate_input(input_data)
         
         # Step 2: Initial merging
-        personas = self.merger.merge_similar_people(validated_data)
+        with self.profiler.stage("merging", items=len(validated_data)):
+            personas = self.merger.merge_similar_people(validated_data)
         logger.info(f"Initial merge: {len(personas)} personas from {len(validated_data)} people")
         
         # Step 3: Add initial noise
         personas = self._add_noise_to_personas(personas)
         
+        return self._adjust_privacy(personas, validated_data, target_risk)
+    
+    def process_partitions(
+        self,
+        partitions: Iterable[List[Person]],
+        target_risk_level: Optional[float] = None
+    ) -> ProcessingResult:
+        """
+        Process a dataset supplied as a stream of people partitions.
+        
+        Each partition is validated, merged and noised on its own and then
+        released, so only one partition of original people is held in memory
+        at a time. Privacy adjustment then runs over all personas. People are
+        only merged with others from the same partition, so partitions
+        should hold whole people (see api.stream_people).
+        
+        Args:
+            partitions: Iterable of Person batches
+            target_risk_level: Target population risk (uses config if not provided)
+            
+        Returns:
+            ProcessingResult with personas and metrics
+        """
+        target_risk = target_risk_level or self.config.target_population_risk
+        self.profiler.reset()
+        self.event_vocabulary = Interner()
+        
+        personas: List[Persona] = []
+        people_count = 0
+        partition_count = 0
+        
+        for partition in partitions:
+            validated_data = self._validate_input(partition)
+            with self.profiler.stage("merging", items=len(validated_data)):
+                partition_personas = self.merger.merge_similar_people(validated_data)
+            personas.extend(self._add_noise_to_personas(partition_personas))
+            people_count += len(validated_data)
+            partition_count += 1
+            logger.debug(f"Partition {partition_count}: {len(validated_data)} people")
+        
+        if not personas:
+            return ProcessingResult(
+                personas=[],
+                risk_metrics=RiskMetrics(),
+                iterations=0,
+                success=False,
+                message="No input data provided"
+            )
+        
+        logger.info(
+            f"Initial merge: {len(personas)} personas from {people_count} people "
+            f"in {partition_count} partitions"
+        )
+        return self._adjust_privacy(personas, [], target_risk)
+    
+    def _adjust_privacy(
+        self,
+        personas: List[Persona],
+        validated_data: List[Person],
+        target_risk: float
+    ) -> ProcessingResult:
+        """Score personas and apply privacy actions until the target risk is met."""
         # Step 4: Calculate risk
-        risk_metrics = self.risk_calculator.calculate_population_risk(personas, validated_data)
+        with self.profiler.stage("risk_scoring", items=len(personas)):
+            if self.risk_tracker:
+                risk_metrics = self.risk_tracker.reset(personas)
+            else:
+                risk_metrics = self.risk_calculator.calculate_population_risk(
+                    personas, validated_data
+                )
         logger.info(f"Initial risk: {risk_metrics.population_average_risk:.3f}")
         
         # Step 5: Iterative privacy adjustment
@@ -168,6 +275,7 @@ class PersonaTwinPipeline:
         while (risk_metrics.population_average_risk > target_risk and 
                iteration < self.config.max_iterations):
             iteration += 1
+            self.profiler.iteration = iteration
             logger.info(f"Iteration {iteration}: Adjusting privacy...")
             
             # Get recommended actions
@@ -177,10 +285,19 @@ class PersonaTwinPipeline:
             )
             
             # Apply actions
-            personas = self._apply_privacy_actions(personas, actions, validated_data)
+            with self.profiler.stage("privacy_actions", items=len(personas)):
+                personas = self._apply_privacy_actions(personas, actions, validated_data)
             
-            # Recalculate risk
-            risk_metrics = self.risk_calculator.calculate_population_risk(personas, validated_data)
+            # Recalculate risk (incrementally when only some personas changed)
+            with self.profiler.stage("risk_scoring", items=len(personas)):
+                if self.risk_tracker and actions.increase_merging:
+                    risk_metrics = self.risk_tracker.reset(personas)
+                elif self.risk_tracker:
+                    risk_metrics = self.risk_tracker.update(personas)
+                else:
+                    risk_metrics = self.risk_calculator.calculate_population_risk(
+                        personas, validated_data
+                    )
             logger.info(f"Risk after iteration {iteration}: {risk_metrics.population_average_risk:.3f}")
             
             # Check if we reached target
@@ -199,12 +316,19 @@ class PersonaTwinPipeline:
             risk_metrics=risk_metrics,
             iterations=iteration,
             success=success,
-            message=message
+            message=message,
+            profile=self.profiler.report()
         )
     
     def _validate_input(self, data: List[Person]) -> List[Person]:
         """Validate and clean input data."""
+        with self.profiler.stage("validation", items=len(data)):
+            return self._validated_people(data)
+    
+    def _validated_people(self, data: List[Person]) -> List[Person]:
+        """People with an ID, keeping only events valid for the domain."""
         validated = []
+        valid_types = self.domain_config.compiled().event_types  # One hash lookup per event
         
         for person in data:
             # Basic validation
@@ -213,11 +337,8 @@ class PersonaTwinPipeline:
                 continue
             
             # Validate event types against domain config
-            if self.domain_config.event_types:
-                valid_events = [
-                    e for e in person.events
-                    if self.domain_config.is_valid_event_type(e.event_type)
-                ]
+            if valid_types:
+                valid_events = [e for e in person.events if e.event_type in valid_types]
                 if len(valid_events) < len(person.events):
                     logger.warning(
                         f"Person {person.person_id}: filtered {len(person.events) - len(valid_events)} invalid events"
@@ -228,24 +349,64 @@ class PersonaTwinPipeline:
         
         return validated
     
-    def _add_noise_to_personas(self, personas: List[Persona]) -> List[Persona]:
-        """Add privacy-protecting noise to personas."""
+    def _add_noise_to_personas(
+        self,
+        personas: List[Persona],
+        in_place: bool = False,
+        noise_round: int = 0
+    ) -> List[Persona]:
+        """
+        Add privacy-protecting noise to personas.
+        
+        in_place reuses the persona's event objects; only safe once they are
+        copies owned by the pipeline (after the first noise round), since
+        freshly merged personas can share events with the input people.
+        
+        Each persona's draws come from its own stream, keyed by noise_round
+        and persona ID, on both the per-persona and the vectorized path, so
+        results do not depend on how personas are split into partitions,
+        batches or workers.
+        """
+        with self.profiler.stage("noise", items=len(personas)):
+            return self._noised_personas(personas, in_place, noise_round)
+    
+    def _noised_personas(
+        self, personas: List[Persona], in_place: bool, noise_round: int
+    ) -> List[Persona]:
+        """Noise each persona's events (see _add_noise_to_personas)."""
         noised_personas = []
+        valid_outcomes = self.domain_config.outcomes if self.domain_config.outcomes else None
         
-        for persona in personas:
-            # Add noise to events
-            noised_events = self.noise_generator.add_noise_to_events(
-                persona.events,
-                valid_outcomes=self.domain_config.outcomes if self.domain_config.outcomes else None
-            )
-            
-            # Generalize temporal precision
-            noised_events = self.noise_generator.generalize_temporal_precision(
-                noised_events,
-                precision=self.domain_config.temporal_precision
+        if self.config.vectorized_noise:
+            # Dates of all personas noised together as day arrays
+            batches = self.noise_generator.add_noise_to_event_batch(
+                [persona.events for persona in personas],
+                valid_outcomes=valid_outcomes,
+                precision=self.domain_config.temporal_precision,
+                rngs=[
+                    self.streams.generator("noise", noise_round, persona.persona_id)
+                    for persona in personas
+                ],
             )
+        else:
+            batches = None
+        
+        for i, persona in enumerate(personas):
+            if batches is not None:
+                noised_events = batches[i]
+            else:
+                # Add noise and generalize temporal precision in one pass
+                noised_events = self.noise_generator.apply_noise(
+                    persona.events,
+                    valid_outcomes=valid_outcomes,
+                    precision=self.domain_config.temporal_precision,
+                    in_place=in_place,
+                    rng=self.streams.generator("noise", noise_round, persona.persona_id)
+                )
             
             # Update persona
+            if self.config.compact_events:
+                noised_events = EventStore(noised_events, self.event_vocabulary)
             persona.events = noised_events
             persona.privacy_metadata.noise_level += 0.2  # Increment noise level
             
@@ -263,14 +424,26 @@ class PersonaTwinPipeline:
         if actions.increase_merging:
             # Re-merge with stricter criteria
             logger.info(f"Increasing merge size to {actions.recommended_merge_size}")
-            # Convert personas back to people for re-merging
-            people = self._personas_to_people(personas)
             self.merger.min_group_size = actions.recommended_merge_size
-            personas = self.merger.merge_similar_people(people)
+            if self.config.hierarchical_merging:
+                # Coalesce sibling personas in the merge tree
+                with self.profiler.stage("merging", items=len(personas)):
+                    if self.merge_tree is None or not self.merge_tree.holds(personas):
+                        self.merge_tree = MergeTree(self.merger, personas)
+                    personas = self.merge_tree.coalesce(actions.recommended_merge_size)
+            else:
+                # Convert personas back to people for re-merging
+                people = self._personas_to_people(personas)
+                with self.profiler.stage("merging", items=len(people)):
+                    personas = self.merger.merge_similar_people(people)
         
         if actions.increase_temporal_noise:
             logger.info("Adding more temporal noise")
-            personas = self._add_noise_to_personas(personas)
+            # Events were copied by the initial noise round
+            self._noise_round += 1
+            personas = self._add_noise_to_personas(
+                personas, in_place=True, noise_round=self._noise_round
+            )
         
         if actions.generalize_demographics:
             logger.info("Generalizing demographics")
@@ -297,23 +470,28 @@ class PersonaTwinPipeline:
     
     def _generalize_demographics(self, personas: List[Persona]) -> List[Persona]:
         """Apply additional demographic generalization."""
-        for persona in personas:
+        changed = []  # Positions whose risk-relevant demographics changed
+        for position, persona in enumerate(personas):
             demo = persona.demographics
             
             # Generalize age to range if not already
             if demo.age and not demo.age_range:
                 demo.age_range = demo.generalize_age(bin_size=10)
                 demo.age = None  # Remove exact age
+                changed.append(position)
             
             # Generalize geography
             if demo.geography and "," in demo.geography:
                 parts = demo.geography.split(",")
                 if len(parts) > 1:
                     demo.geography = parts[-2].strip()  # Keep only county/state
+                    changed.append(position)
             
             # Reduce confidence
             demo.confidence_level *= 0.8
         
+        if self.risk_tracker:
+            self.risk_tracker.mark_changed(changed)
         return personas
     
     def _add_synthetic_events(self, personas: List[Persona]) -> List[Persona]:
@@ -10,12 +10,16 @@ This module implements:
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set
 from enum import Enum
 import numpy as np
-from collections import Counter
+from collections import Counter, defaultdict
 import logging
 
+from personatwin.risk_index import DemographicIndex, EventPatternIndex, PopulationRiskIndex
+from personatwin.columnar import PersonaTable, ColumnarRiskScorer
+from personatwin.profiling import NULL_PROFILER
+
 # Try to import census module
 try:
     from .census import CensusEnhancedPrivacyCalculator, create_census_enhanced_calculator
@@ -34,6 +38,13 @@ class PrivacyLevel(Enum):
     MAXIMUM = "maximum"  # Maximum protection, minimal utility
 
 
+class RiskEngine(Enum):
+    """How per-persona uniqueness is scored against the population."""
+    EXHAUSTIVE = "exhaustive"  # Compare every persona with every other (O(n²))
+    INDEXED = "indexed"  # Equivalence-class lookups built once per pass
+    VECTORIZED = "vectorized"  # NumPy array operations over a columnar persona table
+
+
 # Risk thresholds based on requirements
 POPULATION_RISK_THRESHOLDS = {
     "SAFE_FOR_PUBLIC_RELEASE": 0.01,  # <1% average re-identification risk
@@ -118,17 +129,22 @@ class PopulationTraceability:
     - External linkage risks
     
     Can optionally use census data for enhanced privacy assessment.
+    Uniqueness is scored through equivalence-class indexes by default;
+    RiskEngine.EXHAUSTIVE keeps the pairwise reference computation.
     """
     
     def __init__(
         self, 
         privacy_level: PrivacyLevel = PrivacyLevel.MEDIUM,
-        use_census_data: bool = True
+        use_census_data: bool = True,
+        risk_engine: RiskEngine = RiskEngine.INDEXED
     ):
         self.privacy_level = privacy_level
         self.risk_weights = self._get_risk_weights()
         self.use_census_data = use_census_data
+        self.risk_engine = risk_engine
         self.census_calculator = None
+        self.profiler = NULL_PROFILER  # Set by the pipeline to time census lookups
         
         # Initialize census calculator if available and enabled
         if use_census_data and CENSUS_AVAILABLE:
@@ -190,12 +206,45 @@ class PopulationTraceability:
         if not personas:
             return RiskMetrics(recommendation="NO_DATA")
         
-        # Calculate individual risks
-        individual_risks = {}
-        for persona in personas:
-            risk = self._calculate_individual_risk(persona, personas)
-            individual_risks[persona.persona_id] = risk
+        if self.risk_engine == RiskEngine.VECTORIZED:
+            # Encode once, then score every component as array operations
+            table = PersonaTable.from_personas(personas)
+            scorer = ColumnarRiskScorer(self.risk_weights)
+            scores = scorer.score(table)
+            individual_risks = scores.individual_risks()
+            demographic_risk = scorer.demographic_concentration(table)
+            event_pattern_risk = scorer.event_pattern_concentration(table)
+            external_risk = float(np.mean(scores.external_linkage))
+        else:
+            # Build uniqueness indexes once for the whole pass
+            index = None
+            if self.risk_engine == RiskEngine.INDEXED:
+                index = PopulationRiskIndex(personas)
+            
+            # Calculate individual risks
+            individual_risks = {}
+            for persona in personas:
+                risk = self._calculate_individual_risk(persona, personas, index)
+                individual_risks[persona.persona_id] = risk
+            
+            # Calculate component risks
+            demographic_risk = self._calculate_demographic_concentration(personas)
+            event_pattern_risk = self._calculate_event_pattern_concentration(personas)
+            external_risk = self._estimate_external_linkage_risk(personas)
         
+        return self._build_risk_metrics(
+            personas, individual_risks, demographic_risk, event_pattern_risk, external_risk
+        )
+    
+    def _build_risk_metrics(
+        self,
+        personas: List['Persona'],  # type: ignore
+        individual_risks: Dict[str, float],
+        demographic_risk: float,
+        event_pattern_risk: float,
+        external_risk: float
+    ) -> RiskMetrics:
+        """Aggregate per-persona and component risks into RiskMetrics."""
         # Calculate population metrics
         population_avg_risk = np.mean(list(individual_risks.values()))
         
@@ -206,11 +255,6 @@ class PopulationTraceability:
             if risk > high_risk_threshold
         ]
         
-        # Calculate component risks
-        demographic_risk = self._calculate_demographic_concentration(personas)
-        event_pattern_risk = self._calculate_event_pattern_concentration(personas)
-        external_risk = self._estimate_external_linkage_risk(personas)
-        
         # Calculate k-anonymity
         k_anonymity = self._calculate_k_anonymity(personas)
         
@@ -218,9 +262,10 @@ class PopulationTraceability:
         census_enhanced_metrics = {}
         if self.census_calculator:
             try:
-                census_enhanced_metrics = self.census_calculator.enhance_risk_metrics(
-                    personas, None  # Will create basic metrics internally
-                )
+                with self.profiler.stage("census", items=len(personas)):
+                    census_enhanced_metrics = self.census_calculator.enhance_risk_metrics(
+                        personas, None  # Will create basic metrics internally
+                    )
                 # Update external risk with census-enhanced version if available
                 if "census_enhanced_external_risk" in census_enhanced_metrics:
                     external_risk = census_enhanced_metrics["census_enhanced_external_risk"]
@@ -236,9 +281,10 @@ class PopulationTraceability:
         # Add census recommendation if available
         if self.census_calculator and census_enhanced_metrics:
             try:
-                census_rec = self.census_calculator.get_recommendation_with_census(
-                    personas, None, float(population_avg_risk)
-                )
+                with self.profiler.stage("census", items=len(personas)):
+                    census_rec = self.census_calculator.get_recommendation_with_census(
+                        personas, None, float(population_avg_risk)
+                    )
                 recommendation = f"{recommendation} | CENSUS: {census_rec}"
             except Exception as e:
                 logger.warning(f"Census recommendation failed: {e}")
@@ -257,14 +303,19 @@ class PopulationTraceability:
     def _calculate_individual_risk(
         self, 
         persona: 'Persona',  # type: ignore
-        all_personas: List['Persona']  # type: ignore
+        all_personas: List['Persona'],  # type: ignore
+        index: Optional[PopulationRiskIndex] = None
     ) -> float:
         """Calculate re-identification risk for a single persona."""
-        # Demographic uniqueness
-        demo_risk = self._calculate_demographic_uniqueness(persona, all_personas)
-        
-        # Event pattern uniqueness
-        event_risk = self._calculate_event_pattern_uniqueness(persona, all_personas)
+        if index is not None:
+            demo_risk = index.demographic_uniqueness(persona)
+            event_risk = index.event_pattern_uniqueness(persona)
+        else:
+            # Demographic uniqueness
+            demo_risk = self._calculate_demographic_uniqueness(persona, all_personas)
+            
+            # Event pattern uniqueness
+            event_risk = self._calculate_event_pattern_uniqueness(persona, all_personas)
         
         # K-anonymity risk (inverse of merge count)
         k_risk = 1.0 / max(persona.merged_from, 1)
@@ -272,7 +323,16 @@ class PopulationTraceability:
         # External linkage risk (based on geographic specificity)
         external_risk = self._calculate_persona_external_risk(persona)
         
-        # Weighted combination
+        return self._combine_risk(demo_risk, event_risk, k_risk, external_risk)
+    
+    def _combine_risk(
+        self,
+        demo_risk: float,
+        event_risk: float,
+        k_risk: float,
+        external_risk: float
+    ) -> float:
+        """Weighted combination of the four risk components."""
         weights = self.risk_weights
         total_risk = (
             weights["demographic"] * demo_risk +
@@ -428,6 +488,259 @@ class PopulationTraceability:
             return "INCREASE_PROTECTION - Both merging and noise needed"
 
 
+class IncrementalRiskTracker:
+    """
+    Keep population risk up to date across privacy-adjustment iterations.
+    
+    Holds the equivalence-class indexes and per-persona risk components
+    between iterations instead of rebuilding them on every pass. Callers
+    report which personas changed (mark_changed, or update's changed
+    argument); only those are re-indexed, and only personas in the
+    demographic classes or event-type sets those changes can affect are
+    re-scored. After re-merging (a different persona list), call reset.
+    
+    Scores are the same as PopulationTraceability.calculate_population_risk.
+    """
+    
+    def __init__(self, traceability: PopulationTraceability, age_tolerance: int = 5):
+        self.traceability = traceability
+        self.age_tolerance = age_tolerance
+        self._persona_ids: List[str] = []
+        self._snapshots: List[tuple] = []
+        self._changed: Set[int] = set()
+    
+    def reset(self, personas: List['Persona']) -> RiskMetrics:  # type: ignore
+        """Index personas from scratch and return their risk metrics."""
+        self._changed = set()
+        if not personas:
+            self._persona_ids = []
+            self._snapshots = []
+            return RiskMetrics(recommendation="NO_DATA")
+        
+        self._persona_ids = [p.persona_id for p in personas]
+        self._snapshots = [self._snapshot(p) for p in personas]
+        self._demographic_index = DemographicIndex(age_tolerance=self.age_tolerance)
+        self._event_index = EventPatternIndex()
+        self._class_members: Dict[tuple, set] = defaultdict(set)
+        self._pattern_members: Dict[frozenset, set] = defaultdict(set)
+        self._pattern_risk: Dict[frozenset, float] = {}
+        self._gender_counts: Counter = Counter()
+        self._ethnicity_counts: Counter = Counter()
+        self._pattern_counts: Counter = Counter()
+        
+        for position, snapshot in enumerate(self._snapshots):
+            self._add(position, snapshot)
+        
+        n = len(personas)
+        self._demo_risk = [0.0] * n
+        self._event_risk = [0.0] * n
+        self._k_risk = [1.0 / max(p.merged_from, 1) for p in personas]
+        self._external_risk = [
+            self.traceability._calculate_persona_external_risk(p) for p in personas
+        ]
+        self._totals = [0.0] * n
+        
+        dirty = self._rescore_classes(list(self._class_members))
+        dirty |= self._rescore_patterns(list(self._pattern_members))
+        self._recombine(dirty)
+        return self._metrics(personas)
+    
+    def mark_changed(self, positions: Iterable[int]) -> None:
+        """Record personas (by position) whose risk-relevant fields changed."""
+        self._changed.update(positions)
+    
+    def update(
+        self,
+        personas: List['Persona'],  # type: ignore
+        changed: Optional[Iterable[int]] = None
+    ) -> RiskMetrics:
+        """
+        Apply changes to the personas marked as changed and return metrics.
+        
+        personas must be the list last passed to reset, in the same order.
+        Personas that changed without being marked keep their old scores.
+        """
+        if changed is not None:
+            self.mark_changed(changed)
+        if len(personas) != len(self._snapshots):
+            return self.reset(personas)
+        
+        touched_classes = set()
+        touched_patterns = set()  # Event-type sets that gained or lost members
+        moved = []  # Personas whose event-type set changed
+        dirty = set()
+        
+        for position in sorted(self._changed):
+            persona = personas[position]
+            old = self._snapshots[position]
+            new = self._snapshot(persona)
+            if new == old:
+                continue
+            
+            self._remove(position, old)
+            self._add(position, new)
+            self._snapshots[position] = new
+            
+            if new[0] != old[0]:
+                touched_classes.add(old[0][:2])
+                touched_classes.add(new[0][:2])
+            if new[3] != old[3]:
+                touched_patterns.add(frozenset(old[3]))
+                touched_patterns.add(frozenset(new[3]))
+                moved.append(position)
+            
+            self._k_risk[position] = 1.0 / max(persona.merged_from, 1)
+            self._external_risk[position] = self.traceability._calculate_persona_external_risk(
+                persona
+            )
+            dirty.add(position)
+        self._changed = set()
+        
+        dirty |= self._rescore_classes(touched_classes)
+        if moved:
+            # Only sets sharing a type with a moved set can change count
+            affected = set()
+            for key in touched_patterns:
+                affected |= self._event_index.sets_sharing(key)
+            affected.add(frozenset())
+            dirty |= self._rescore_patterns(affected)
+            # A persona joining a set whose risk did not move still takes that risk
+            for position in moved:
+                self._event_risk[position] = self._pattern_risk[
+                    frozenset(self._snapshots[position][3])
+                ]
+        self._recombine(dirty)
+        
+        logger.debug(f"Incremental risk update re-scored {len(dirty)} of {len(personas)} personas")
+        return self._metrics(personas)
+    
+    def _snapshot(self, persona: 'Persona') -> tuple:  # type: ignore
+        """Capture the persona fields that risk scoring depends on."""
+        demo = persona.demographics
+        return (
+            (demo.gender, demo.ethnicity, demo.age),
+            (demo.geography, bool(demo.age_range)),
+            persona.merged_from,
+            tuple(persona.event_patterns.event_types),
+        )
+    
+    def _add(self, position: int, snapshot: tuple) -> None:
+        """Add one persona's snapshot to the indexes and counters."""
+        gender, ethnicity, age = snapshot[0]
+        self._demographic_index.add(gender, ethnicity, age)
+        self._class_members[(gender, ethnicity)].add(position)
+        if gender:
+            self._gender_counts[gender] += 1
+        if ethnicity:
+            self._ethnicity_counts[ethnicity] += 1
+        
+        event_types = snapshot[3]
+        self._event_index.add(event_types)
+        self._pattern_members[frozenset(event_types)].add(position)
+        self._pattern_counts[tuple(sorted(event_types))] += 1
+    
+    def _remove(self, position: int, snapshot: tuple) -> None:
+        """Remove one persona's snapshot from the indexes and counters."""
+        gender, ethnicity, age = snapshot[0]
+        self._demographic_index.remove(gender, ethnicity, age)
+        if gender:
+            _decrement(self._gender_counts, gender)
+        if ethnicity:
+            _decrement(self._ethnicity_counts, ethnicity)
+        
+        class_key = (gender, ethnicity)
+        _discard(self._class_members, class_key, position)
+        
+        event_types = snapshot[3]
+        self._event_index.remove(event_types)
+        key = frozenset(event_types)
+        if _discard(self._pattern_members, key, position):
+            self._pattern_risk.pop(key, None)
+        _decrement(self._pattern_counts, tuple(sorted(event_types)))
+    
+    def _rescore_classes(self, classes) -> set:
+        """Recompute demographic uniqueness for members of the given classes."""
+        dirty = set()
+        for key in classes:
+            for position in self._class_members.get(key, ()):
+                gender, ethnicity, age = self._snapshots[position][0]
+                similar_count = self._demographic_index.count(gender, ethnicity, age)
+                self._demo_risk[position] = 1.0 / max(similar_count, 1)
+                dirty.add(position)
+        return dirty
+    
+    def _rescore_patterns(self, keys) -> set:
+        """Recompute event pattern uniqueness for the given event-type sets."""
+        dirty = set()
+        for key in keys:
+            members = self._pattern_members.get(key)
+            if not members:
+                continue
+            if key:
+                risk = 1.0 / max(self._event_index.count_similar(key), 1)
+            else:
+                risk = 0.0
+            if self._pattern_risk.get(key) != risk:
+                self._pattern_risk[key] = risk
+                for position in members:
+                    self._event_risk[position] = risk
+                dirty |= members
+        return dirty
+    
+    def _recombine(self, positions) -> None:
+        """Recompute combined risk for the given personas."""
+        combine = self.traceability._combine_risk
+        for position in positions:
+            self._totals[position] = combine(
+                self._demo_risk[position],
+                self._event_risk[position],
+                self._k_risk[position],
+                self._external_risk[position],
+            )
+    
+    def _metrics(self, personas: List['Persona']) -> RiskMetrics:  # type: ignore
+        """Assemble RiskMetrics from the tracked state."""
+        def herfindahl(counts):
+            total = sum(counts.values())
+            if total == 0:
+                return 0.0
+            return sum((count / total) ** 2 for count in counts.values())
+        
+        demographic_risk = (
+            herfindahl(self._gender_counts) + herfindahl(self._ethnicity_counts)
+        ) / 2
+        total = len(personas)
+        event_pattern_risk = sum((count / total) ** 2 for count in self._pattern_counts.values())
+        external_risk = float(np.mean(self._external_risk))
+        
+        return self.traceability._build_risk_metrics(
+            personas,
+            dict(zip(self._persona_ids, self._totals)),
+            demographic_risk,
+            event_pattern_risk,
+            external_risk,
+        )
+
+
+def _discard(members: Dict, key, position: int) -> bool:
+    """Remove a position from a member set, dropping the set once empty."""
+    positions = members.get(key)
+    if positions is None:
+        return False
+    positions.discard(position)
+    if positions:
+        return False
+    del members[key]
+    return True
+
+
+def _decrement(counts: Counter, key) -> None:
+    """Decrement a counter entry, dropping it when it reaches zero."""
+    counts[key] -= 1
+    if counts[key] <= 0:
+        del counts[key]
+
+
 @dataclass
 class PrivacyActions:
     """Actions to take for privacy protection."""
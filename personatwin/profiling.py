@@ -0,0 +1,301 @@
+"""
+Stage-level profiling for the PersonaTwin pipeline.
+
+A Profiler records, for each pipeline stage it wraps, the wall-clock time,
+CPU time, number of items processed and the process's peak RSS at the end
+of the stage. Stages can nest (census lookups happen inside risk scoring,
+grouping inside merging); a nested stage's time is also part of its
+parent's.
+
+    profiler = Profiler()
+    with profiler.stage("merging", items=len(people)):
+        ...
+    profile = profiler.report()  # PipelineProfile, also sent to the sinks
+
+A disabled profiler hands out one shared no-op stage, so instrumented code
+costs an attribute lookup and a method call per stage when profiling is off.
+
+Sinks receive the finished PipelineProfile:
+- LoggingSink: one log line per stage
+- JSONFileSink: the profile as a JSON document
+- PrometheusTextfileSink: gauges for the node_exporter textfile collector
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Not available on Windows
+    RESOURCE_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far, if the platform reports it."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+@dataclass
+class StageTiming:
+    """Measurements of one run of one pipeline stage."""
+    stage: str
+    iteration: int = 0  # Privacy-adjustment iteration (0 = initial pass)
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0  # CPU time of this process (not of pool workers)
+    items: Optional[int] = None  # People, personas or events handled, when known
+    peak_rss_bytes: Optional[int] = None  # Process high-water mark at the end of the stage
+    parent: Optional[str] = None  # Enclosing stage, for nested stages
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "stage": self.stage,
+            "iteration": self.iteration,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "items": self.items,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "parent": self.parent,
+        }
+
+
+@dataclass
+class PipelineProfile:
+    """All stage timings of a pipeline run, in the order stages finished."""
+    stages: List[StageTiming] = field(default_factory=list)
+    
+    def totals(self) -> Dict[Tuple[str, int], StageTiming]:
+        """
+        Timings summed per (stage, iteration).
+        
+        Stages that ran several times in one iteration (e.g. once per
+        partition) are combined: times and items add up, peak RSS is the
+        maximum.
+        """
+        totals: Dict[Tuple[str, int], StageTiming] = {}
+        for timing in self.stages:
+            key = (timing.stage, timing.iteration)
+            total = totals.get(key)
+            if total is None:
+                totals[key] = StageTiming(**timing.to_dict())
+                continue
+            total.wall_seconds += timing.wall_seconds
+            total.cpu_seconds += timing.cpu_seconds
+            if timing.items is not None:
+                total.items = (total.items or 0) + timing.items
+            if timing.peak_rss_bytes is not None:
+                total.peak_rss_bytes = max(total.peak_rss_bytes or 0, timing.peak_rss_bytes)
+        return totals
+    
+    def wall_seconds_by_stage(self) -> Dict[str, float]:
+        """Wall time per stage over all iterations."""
+        seconds: Dict[str, float] = {}
+        for timing in self.stages:
+            seconds[timing.stage] = seconds.get(timing.stage, 0.0) + timing.wall_seconds
+        return seconds
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {"stages": [timing.to_dict() for timing in self.stages]}
+
+
+class ProfileSink(ABC):
+    """Destination for finished profiles."""
+    
+    @abstractmethod
+    def emit(self, profile: PipelineProfile) -> None:
+        """Deliver a finished profile."""
+
+
+class LoggingSink(ProfileSink):
+    """Log one line per stage and iteration."""
+    
+    def __init__(self, log: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.log = log or logger
+        self.level = level
+    
+    def emit(self, profile: PipelineProfile) -> None:
+        for (stage, iteration), timing in profile.totals().items():
+            rss = (
+                f", peak RSS {timing.peak_rss_bytes / 2**20:.1f} MiB"
+                if timing.peak_rss_bytes
+                else ""
+            )
+            items = f", {timing.items} items" if timing.items is not None else ""
+            self.log.log(
+                self.level,
+                f"Stage {stage} (iteration {iteration}): {timing.wall_seconds:.3f}s wall, "
+                f"{timing.cpu_seconds:.3f}s CPU{items}{rss}"
+            )
+
+
+class JSONFileSink(ProfileSink):
+    """Write the profile to a JSON file (replaced on every run)."""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def emit(self, profile: PipelineProfile) -> None:
+        _write_atomically(self.path, json.dumps(profile.to_dict(), indent=2))
+
+
+class PrometheusTextfileSink(ProfileSink):
+    """
+    Write gauges in Prometheus text format, for node_exporter's textfile collector.
+    
+    The file is replaced atomically, so the collector never reads a
+    partial file. Series are labelled by stage and iteration.
+    """
+    
+    METRICS = (
+        ("wall_seconds", "Wall-clock time of a pipeline stage"),
+        ("cpu_seconds", "CPU time of a pipeline stage"),
+        ("items", "Items processed by a pipeline stage"),
+        ("peak_rss_bytes", "Peak resident set size at the end of a pipeline stage"),
+    )
+    
+    def __init__(self, path: str, prefix: str = "personatwin_stage"):
+        self.path = path
+        self.prefix = prefix
+    
+    def emit(self, profile: PipelineProfile) -> None:
+        totals = profile.totals()
+        lines = []
+        for metric, description in self.METRICS:
+            name = f"{self.prefix}_{metric}"
+            lines.append(f"# HELP {name} {description}.")
+            lines.append(f"# TYPE {name} gauge")
+            for (stage, iteration), timing in totals.items():
+                value = getattr(timing, metric)
+                if value is not None:
+                    lines.append(
+                        f'{name}{{stage="{_escape(stage)}",iteration="{iteration}"}} {value}'
+                    )
+        _write_atomically(self.path, "\n".join(lines) + "\n")
+
+
+class _Stage:
+    """Context manager timing one stage run."""
+    
+    __slots__ = ("profiler", "timing", "_wall", "_cpu")
+    
+    def __init__(self, profiler: 'Profiler', timing: StageTiming):
+        self.profiler = profiler
+        self.timing = timing
+    
+    @property
+    def items(self) -> Optional[int]:
+        return self.timing.items
+    
+    @items.setter
+    def items(self, value: Optional[int]) -> None:
+        self.timing.items = value
+    
+    def __enter__(self) -> '_Stage':
+        self.profiler._open.append(self.timing.stage)
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.timing.wall_seconds = time.perf_counter() - self._wall
+        self.timing.cpu_seconds = time.process_time() - self._cpu
+        self.timing.peak_rss_bytes = peak_rss_bytes()
+        self.profiler._open.pop()
+        self.profiler.profile.stages.append(self.timing)
+
+
+class _NullStage:
+    """Stage of a disabled profiler: does nothing."""
+    
+    __slots__ = ()
+    
+    items = property(lambda self: None, lambda self, value: None)
+    
+    def __enter__(self) -> '_NullStage':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """
+    Records stage timings for one pipeline.
+    
+    Set iteration as privacy adjustment proceeds; stages record the
+    current value. Set items on the object returned by stage() when the
+    count is only known at the end.
+    """
+    
+    def __init__(self, enabled: bool = True, sinks: Sequence[ProfileSink] = ()):
+        self.enabled = enabled
+        self.sinks = list(sinks)
+        self.iteration = 0
+        self.profile = PipelineProfile()
+        self._open: List[str] = []
+    
+    def stage(self, name: str, items: Optional[int] = None):
+        """Context manager timing one run of a stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        parent = self._open[-1] if self._open else None
+        return _Stage(self, StageTiming(name, self.iteration, items=items, parent=parent))
+    
+    def reset(self) -> None:
+        """Start a new profile."""
+        self.iteration = 0
+        self.profile = PipelineProfile()
+        self._open = []
+    
+    def report(self) -> Optional[PipelineProfile]:
+        """Send the profile to every sink and return it (None when disabled)."""
+        if not self.enabled:
+            return None
+        for sink in self.sinks:
+            try:
+                sink.emit(self.profile)
+            except Exception as e:
+                logger.warning(f"Profile sink {type(sink).__name__} failed: {e}")
+        return self.profile
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Shipped to worker processes as a disabled profiler; workers' stages
+        # would be recorded in their own copy and lost
+        return {"enabled": False, "sinks": [], "iteration": self.iteration,
+                "profile": PipelineProfile(), "_open": []}
+
+
+# Shared disabled profiler for components used outside a pipeline
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomically(path: str, text: str) -> None:
+    """Write text to path through a temporary file in the same directory."""
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        handle.write(text)
+    os.replace(temporary, path)
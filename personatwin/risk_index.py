@@ -0,0 +1,244 @@
+"""
+Equivalence-class indexes for population risk scoring.
+
+PopulationTraceability scores every persona against the whole population:
+how many personas share its demographics and how many share its event
+pattern. Done pairwise that is O(n²) per risk pass. The indexes in this
+module are built once per pass and answer the same questions by lookup:
+
+- DemographicIndex: hash index on (gender, ethnicity) with sorted ages
+- EventPatternIndex: hash index on distinct event-type sets
+- PopulationRiskIndex: both indexes for one persona population
+
+Counts are exactly those of the pairwise scoring in privacy.py.
+"""
+
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+from collections import Counter, defaultdict
+import bisect
+import math
+
+from personatwin.models import Demographics, Persona
+
+
+def _first_index(values: Sequence[float], predicate: Callable[[float], bool]) -> int:
+    """Return the first index in sorted values where predicate becomes true."""
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(values[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _is_nan(value) -> bool:
+    """Check for NaN ages (e.g. missing values coming from pandas)."""
+    return isinstance(value, float) and math.isnan(value)
+
+
+class _DemographicClass:
+    """Personas sharing gender and ethnicity."""
+    
+    def __init__(self):
+        self.size = 0
+        self.unknown_age = 0  # Ages of None match every age
+        self.ages: List[float] = []  # Known, non-NaN ages (sorted once built)
+
+
+class DemographicIndex:
+    """
+    Index personas by (gender, ethnicity) with sorted ages per class.
+    
+    Answers "how many personas have the same gender and ethnicity and an
+    age within tolerance" in O(log n) instead of a full scan. Entries can
+    be added and removed so the index can follow changing personas.
+    """
+    
+    def __init__(self, demographics: Iterable[Demographics] = (), age_tolerance: int = 5):
+        self.age_tolerance = age_tolerance
+        self.classes: Dict[Tuple, _DemographicClass] = defaultdict(_DemographicClass)
+        
+        for demo in demographics:
+            cls = self.classes[(demo.gender, demo.ethnicity)]
+            cls.size += 1
+            if demo.age is None:
+                cls.unknown_age += 1
+            elif not _is_nan(demo.age):
+                cls.ages.append(demo.age)
+        
+        for cls in self.classes.values():
+            cls.ages.sort()
+    
+    def add(self, gender: Optional[str], ethnicity: Optional[str], age) -> None:
+        """Add one persona's demographics to the index."""
+        cls = self.classes[(gender, ethnicity)]
+        cls.size += 1
+        if age is None:
+            cls.unknown_age += 1
+        elif not _is_nan(age):
+            bisect.insort(cls.ages, age)
+    
+    def remove(self, gender: Optional[str], ethnicity: Optional[str], age) -> None:
+        """Remove demographics previously added to the index."""
+        key = (gender, ethnicity)
+        cls = self.classes[key]
+        cls.size -= 1
+        if age is None:
+            cls.unknown_age -= 1
+        elif not _is_nan(age):
+            del cls.ages[bisect.bisect_left(cls.ages, age)]
+        if cls.size == 0:
+            del self.classes[key]
+    
+    def count_similar(self, demo: Demographics) -> int:
+        """Count personas (including this one) with similar demographics."""
+        return self.count(demo.gender, demo.ethnicity, demo.age)
+    
+    def count(self, gender: Optional[str], ethnicity: Optional[str], age) -> int:
+        """Count indexed personas matching gender, ethnicity and age tolerance."""
+        cls = self.classes.get((gender, ethnicity))
+        if cls is None:
+            return 0
+        
+        if age is None:
+            return cls.size  # Unknown age is similar to every age
+        if _is_nan(age):
+            return cls.unknown_age  # NaN never compares within tolerance
+        
+        # Same predicate as abs(other - age) <= tolerance, located by bisection
+        tolerance = self.age_tolerance
+        lower = _first_index(cls.ages, lambda other: other - age >= -tolerance)
+        upper = _first_index(cls.ages, lambda other: other - age > tolerance)
+        return cls.unknown_age + (upper - lower)
+
+
+class EventPatternIndex:
+    """
+    Index personas by their distinct event-type sets.
+    
+    A persona's pattern is similar to another's when they share at least
+    half of its event types. Populations have far fewer distinct type sets
+    than personas, so counts are computed once per distinct set through an
+    inverted index (event type -> sets containing it) and cached. Adding or
+    removing a set only evicts the cached counts of sets sharing a type
+    with it, since no other count can change; sets whose count drops to
+    zero leave the index.
+    """
+    
+    def __init__(self, event_type_sets: Iterable[Iterable[str]] = ()):
+        self.set_counts: Counter = Counter(frozenset(types) for types in event_type_sets)
+        self._sets: Dict[int, FrozenSet[str]] = {}
+        self._set_ids: Dict[FrozenSet[str], int] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._next_id = 0
+        for types in self.set_counts:
+            self._register(types)
+        self._cache: Dict[FrozenSet[str], int] = {}  # Counts of indexed sets only
+    
+    def _register(self, types: FrozenSet[str]) -> None:
+        """Give a new distinct set an id and post it under each of its types."""
+        set_id = self._next_id
+        self._next_id += 1
+        self._sets[set_id] = types
+        self._set_ids[types] = set_id
+        for event_type in types:
+            self._postings[event_type].add(set_id)
+    
+    def _unregister(self, types: FrozenSet[str]) -> None:
+        """Drop an emptied set and its postings."""
+        set_id = self._set_ids.pop(types)
+        del self._sets[set_id]
+        del self.set_counts[types]
+        for event_type in types:
+            postings = self._postings[event_type]
+            postings.discard(set_id)
+            if not postings:
+                del self._postings[event_type]
+    
+    def sets_sharing(self, event_types: Iterable[str]) -> Set[FrozenSet[str]]:
+        """Indexed sets sharing at least one type with event_types."""
+        return {
+            self._sets[set_id]
+            for event_type in set(event_types)
+            for set_id in self._postings.get(event_type, ())
+        }
+    
+    def _evict(self, key: FrozenSet[str]) -> None:
+        """Forget cached counts that a change to key's count can affect."""
+        cache = self._cache
+        if not cache:
+            return
+        for event_type in key:
+            for set_id in self._postings.get(event_type, ()):
+                cache.pop(self._sets[set_id], None)
+    
+    def add(self, event_types: Iterable[str]) -> None:
+        """Add one persona's event types to the index."""
+        key = frozenset(event_types)
+        if key not in self._set_ids:
+            self._register(key)
+        self.set_counts[key] += 1
+        self._evict(key)
+    
+    def remove(self, event_types: Iterable[str]) -> None:
+        """Remove event types previously added to the index."""
+        key = frozenset(event_types)
+        self._evict(key)
+        self.set_counts[key] -= 1
+        if self.set_counts[key] <= 0:
+            self._unregister(key)
+    
+    def count_similar(self, event_types: Iterable[str]) -> int:
+        """Count personas sharing at least half of the given event types."""
+        key = frozenset(event_types)
+        if not key:
+            return 0
+        
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        
+        overlaps: Counter = Counter()
+        for event_type in key:
+            for set_id in self._postings.get(event_type, ()):
+                overlaps[set_id] += 1
+        
+        required = len(key) * 0.5
+        count = sum(
+            self.set_counts[self._sets[set_id]]
+            for set_id, overlap in overlaps.items()
+            if overlap >= required
+        )
+        if key in self._set_ids:
+            self._cache[key] = count
+        return count
+
+
+class PopulationRiskIndex:
+    """
+    Uniqueness lookups for one persona population.
+    
+    Build once per risk pass, then query each persona in O(log n).
+    """
+    
+    def __init__(self, personas: List[Persona], age_tolerance: int = 5):
+        self.demographic_index = DemographicIndex(
+            (p.demographics for p in personas), age_tolerance
+        )
+        self.event_pattern_index = EventPatternIndex(
+            p.event_patterns.event_types for p in personas
+        )
+    
+    def demographic_uniqueness(self, persona: Persona) -> float:
+        """Risk inversely proportional to the number of similar personas."""
+        similar_count = self.demographic_index.count_similar(persona.demographics)
+        return 1.0 / max(similar_count, 1)
+    
+    def event_pattern_uniqueness(self, persona: Persona) -> float:
+        """Risk inversely proportional to personas with similar event patterns."""
+        if not persona.event_patterns.event_types:
+            return 0.0
+        similar_count = self.event_pattern_index.count_similar(persona.event_patterns.event_types)
+        return 1.0 / max(similar_count, 1)
@@ -0,0 +1,206 @@
+"""
+Batched demographic similarity between people.
+
+PeopleMerging.calculate_similarity compares two people at a time. This
+module encodes demographics once into NumPy columns and computes the same
+weighted scores for whole blocks of people:
+
+- SimilarityEncoder / SimilarityBlock: shared integer codes for two or
+  more populations
+- similarity_matrix: scores of every pair of rows of two blocks
+- top_k_similar: the k most similar candidates per row, in bounded chunks
+
+Scores are bit-for-bit those of calculate_similarity: every term is
+added in the same order and skipped terms add exact zeros.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Sequence, Tuple
+import numpy as np
+
+from personatwin.models import Demographics
+
+
+DEFAULT_CHUNK_CELLS = 1 << 22  # Pair scores held in memory at once
+
+
+@dataclass
+class SimilarityBlock:
+    """
+    Encoded demographics of a block of people.
+    
+    Codes of -1 mark missing (falsy) values, which take no part in the
+    score. NaN values are present but coded -2, which matches nothing (not
+    even itself), as in the scalar comparison.
+    """
+    age: np.ndarray  # float64, NaN allowed
+    has_age: np.ndarray  # bool: age is not None
+    gender: np.ndarray  # int64 codes
+    ethnicity: np.ndarray  # int64 codes
+    geography: np.ndarray  # int64 codes of the full geography
+    county: np.ndarray  # int64 codes of the normalized county part
+    
+    def __len__(self) -> int:
+        return len(self.age)
+    
+    def __getitem__(self, rows) -> 'SimilarityBlock':
+        """Select rows (e.g. a slice for chunking)."""
+        return SimilarityBlock(
+            age=self.age[rows],
+            has_age=self.has_age[rows],
+            gender=self.gender[rows],
+            ethnicity=self.ethnicity[rows],
+            geography=self.geography[rows],
+            county=self.county[rows],
+        )
+
+
+class SimilarityEncoder:
+    """
+    Encode demographics into SimilarityBlocks with shared vocabularies.
+    
+    Blocks compared with each other must come from the same encoder.
+    """
+    
+    def __init__(self):
+        self.vocabularies: Dict[str, Dict[Any, int]] = {
+            "gender": {}, "ethnicity": {}, "geography": {}, "county": {}
+        }
+    
+    def _code(self, vocabulary: str, value: Any) -> int:
+        if not value:
+            return -1
+        if value != value:
+            return -2  # NaN is truthy but equal to nothing
+        codes = self.vocabularies[vocabulary]
+        code = codes.get(value)
+        if code is None:
+            code = len(codes)
+            codes[value] = code
+        return code
+    
+    def encode(self, demographics: Sequence[Demographics]) -> SimilarityBlock:
+        """Encode a sequence of demographics."""
+        n = len(demographics)
+        has_age = np.fromiter((d.age is not None for d in demographics), dtype=bool, count=n)
+        age = np.fromiter(
+            (d.age if d.age is not None else np.nan for d in demographics),
+            dtype=np.float64,
+            count=n
+        )
+        
+        def codes(vocabulary: str, values) -> np.ndarray:
+            return np.fromiter(
+                (self._code(vocabulary, value) for value in values), dtype=np.int64, count=n
+            )
+        
+        geographies = [d.geography for d in demographics]
+        return SimilarityBlock(
+            age=age,
+            has_age=has_age,
+            gender=codes("gender", (d.gender for d in demographics)),
+            ethnicity=codes("ethnicity", (d.ethnicity for d in demographics)),
+            geography=codes("geography", geographies),
+            county=codes("county", (
+                # Same normalization as PeopleMerging._same_county
+                geo.split(",")[0].strip().lower() if isinstance(geo, str) and geo else geo
+                for geo in geographies
+            )),
+        )
+
+
+def similarity_matrix(a: SimilarityBlock, b: SimilarityBlock) -> np.ndarray:
+    """
+    Similarity of every row of a to every row of b, shape (len(a), len(b)).
+    
+    Matches PeopleMerging.calculate_similarity exactly. Memory is
+    proportional to len(a) * len(b); see iter_similarity_chunks for
+    bounded memory.
+    """
+    # Terms are added in place, in calculate_similarity's order
+    # Age similarity (weight: 0.2)
+    both = a.has_age[:, None] & b.has_age[None, :]
+    score = np.abs(a.age[:, None] - b.age[None, :])
+    score /= 20
+    np.subtract(1, score, out=score)
+    np.fmax(score, 0, out=score)  # max(0, nan) is 0, as in Python
+    score *= 0.2
+    score[~both] = 0.0
+    total_weight = np.where(both, 0.2, 0.0)
+    
+    # Gender and ethnicity match (weight: 0.3 each)
+    for left, right in ((a.gender, b.gender), (a.ethnicity, b.ethnicity)):
+        both = (left[:, None] != -1) & (right[None, :] != -1)
+        same = (left[:, None] == right[None, :]) & (left[:, None] >= 0)
+        np.add(score, 0.3, out=score, where=same)
+        np.add(total_weight, 0.3, out=total_weight, where=both)
+    
+    # Geography proximity (weight: 0.2, or 0.1 for the same county)
+    both = (a.geography[:, None] != -1) & (b.geography[None, :] != -1)
+    same_geo = (a.geography[:, None] == b.geography[None, :]) & (a.geography[:, None] >= 0)
+    same_county = (a.county[:, None] == b.county[None, :]) & (a.county[:, None] >= 0)
+    np.add(score, 0.2, out=score, where=same_geo)
+    np.add(score, 0.1, out=score, where=same_county & both & ~same_geo)
+    np.add(total_weight, 0.2, out=total_weight, where=both)
+    
+    # Normalize by total weight (scores are still 0 where nothing was compared)
+    np.divide(score, total_weight, out=score, where=total_weight > 0)
+    return score
+
+
+def iter_similarity_chunks(
+    a: SimilarityBlock,
+    b: SimilarityBlock,
+    chunk_size: int = DEFAULT_CHUNK_CELLS
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (first row, matrix) for blocks of rows of a against all of b."""
+    rows = max(1, chunk_size // max(len(b), 1))
+    for start in range(0, len(a), rows):
+        yield start, similarity_matrix(a[start:start + rows], b)
+
+
+def top_k_similar(
+    a: SimilarityBlock,
+    b: SimilarityBlock,
+    k: int,
+    chunk_size: int = DEFAULT_CHUNK_CELLS,
+    exclude_self: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The k rows of b most similar to each row of a.
+    
+    Args:
+        a: Query rows
+        b: Candidate rows
+        k: Neighbours per query (fewer if b is smaller)
+        chunk_size: Pair scores computed at once
+        exclude_self: Skip candidate i for query i (when a and b are the same block)
+    
+    Returns:
+        (indices, scores), both of shape (len(a), k), best first; ties go
+        to the lower candidate index
+    """
+    k = min(k, len(b) - (1 if exclude_self else 0))
+    indices = np.zeros((len(a), max(k, 0)), dtype=np.int64)
+    scores = np.zeros((len(a), max(k, 0)), dtype=np.float64)
+    if k <= 0:
+        return indices, scores
+    
+    for start, matrix in iter_similarity_chunks(a, b, chunk_size):
+        rows = np.arange(len(matrix))
+        if exclude_self:
+            matrix[rows, start + rows] = -np.inf
+        # Everything above the k-th best score, then the lowest-index ties
+        threshold = -np.partition(-matrix, k - 1, axis=1)[:, k - 1:k]
+        above = matrix > threshold
+        tied = matrix == threshold
+        needed = k - above.sum(axis=1, keepdims=True)
+        chosen = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+        candidates = np.nonzero(chosen)[1].reshape(len(matrix), k)  # Ascending index
+        
+        best = np.take_along_axis(matrix, candidates, axis=1)
+        order = np.argsort(-best, axis=1, kind="stable")
+        indices[start:start + len(matrix)] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:start + len(matrix)] = np.take_along_axis(best, order, axis=1)
+    
+    return indices, scores
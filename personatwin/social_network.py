@@ -8,12 +8,20 @@ This module handles:
 4. External dataset integration for realistic social structures
 """
 
+from array import array
+from collections.abc import Mapping
 from dataclasses import dataclass, field
-from typing import List, Dict, Set, Optional, Tuple
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Dict, Set, Optional, Tuple, Union
 from enum import Enum
 import logging
 from collections import defaultdict
-import random
+import numpy as np
+
+from personatwin.graph import (
+    CliqueGraph, CSRGraph, UnionFind, clique_pairs, connected_components, group_edges
+)
+from personatwin.rng import RandomStreams, sample, sample_indices
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +86,388 @@ class SocialCircle:
         self.size = len(self.members)
 
 
+@dataclass
+class SharedEvent:
+    """
+    An event several people took part in: a hyperedge over its participants.
+    
+    Stands for a connection between every pair of participants without
+    creating them; pairs() expands them on demand, all or a numbered
+    subset. participants holds one entry per matching event, so a person
+    with two matching events appears twice; pairs of an entry with
+    another entry of the same participant are skipped. An anonymized
+    event lists a persona once per merged person, so it stands for the
+    same records anonymize_network keeps for the expanded pairs.
+    """
+    event_type: str
+    date: Optional[datetime]
+    location: Optional[str]
+    participants: List[str] = field(default_factory=list)  # Person (or persona) ids
+    event_ids: List[str] = field(default_factory=list)  # Parallel to participants, when known
+    connection_type: ConnectionType = ConnectionType.INFERRED
+    strength: ConnectionStrength = ConnectionStrength.MODERATE
+    confidence: float = 0.9  # High confidence - explicit shared event
+    context: Optional[str] = None  # Defaults to "Shared event: <event_type>"
+    
+    def __post_init__(self):
+        if self.context is None:
+            self.context = f"Shared event: {self.event_type}"
+    
+    @property
+    def num_pairs(self) -> int:
+        """Number of pairs of participant entries, same-participant pairs included."""
+        size = len(self.participants)
+        return size * (size - 1) // 2
+    
+    def pairs(self, numbers: Optional[np.ndarray] = None) -> Iterator[SocialConnection]:
+        """
+        Connections between participants, in order (0, 1), (0, 2), ..., (1, 2), ...
+        
+        Args:
+            numbers: Only these pair numbers (positions in that order)
+        """
+        firsts, seconds = clique_pairs(len(self.participants), numbers)
+        for i, j in zip(firsts.tolist(), seconds.tolist()):
+            if self.participants[i] == self.participants[j]:
+                continue
+            yield SocialConnection(
+                person1_id=self.participants[i],
+                person2_id=self.participants[j],
+                connection_type=self.connection_type,
+                strength=self.strength,
+                context=self.context,
+                shared_events=[self.event_ids[i], self.event_ids[j]] if self.event_ids else [],
+                confidence=self.confidence
+            )
+    
+    def sample_pairs(self, rng: np.random.Generator, max_pairs: int) -> Iterator[SocialConnection]:
+        """All pairs, or max_pairs of them sampled uniformly (in pair order) if there are more."""
+        if self.num_pairs <= max_pairs:
+            return self.pairs()
+        numbers = np.sort(sample_indices(rng, np.array([max_pairs]), self.num_pairs))
+        return self.pairs(numbers)
+
+
+# Codes of enum members in SocialGraph's attribute arrays
+_CONNECTION_TYPES = tuple(ConnectionType)
+_CONNECTION_TYPE_CODES = {member: code for code, member in enumerate(_CONNECTION_TYPES)}
+_STRENGTHS = tuple(ConnectionStrength)
+_STRENGTH_CODES = {member: code for code, member in enumerate(_STRENGTHS)}
+
+
+class EdgeList:
+    """
+    Append-only store of connection records with interned person ids.
+    
+    Each record costs a few typed array entries instead of a
+    SocialConnection; contexts are interned too, and shared event ids are
+    kept only for the records that have them. Shared events are kept as
+    cliques: the node codes of their participants, not their pairs.
+    """
+    
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.node_index: Dict[str, int] = {}
+        self.sources = array("i")
+        self.targets = array("i")
+        self.types = array("b")
+        self.strengths = array("b")
+        self.confidences = array("d")
+        self.contexts = array("i")  # -1 = no context
+        self.context_labels: List[str] = []
+        self._context_index: Dict[str, int] = {}
+        self.shared_events: Dict[int, List[str]] = {}  # Record index -> event ids
+        self.cliques: List[np.ndarray] = []  # Participant node codes of each shared event
+        self.clique_confidences = array("d")
+    
+    def __len__(self) -> int:
+        return len(self.sources)
+    
+    def node(self, node_id: str) -> int:
+        """Integer code of a person id, interning it if new."""
+        code = self.node_index.get(node_id)
+        if code is None:
+            code = self.node_index[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+        return code
+    
+    def add(self, connection: SocialConnection) -> int:
+        """Append one connection; returns its record index."""
+        record = len(self.sources)
+        self.sources.append(self.node(connection.person1_id))
+        self.targets.append(self.node(connection.person2_id))
+        self.types.append(_CONNECTION_TYPE_CODES[connection.connection_type])
+        self.strengths.append(_STRENGTH_CODES[connection.strength])
+        self.confidences.append(connection.confidence)
+        self.contexts.append(self.context_code(connection.context))
+        if connection.shared_events:
+            self.shared_events[record] = list(connection.shared_events)
+        return record
+    
+    def extend(self, connections: Iterable[SocialConnection]) -> None:
+        for connection in connections:
+            self.add(connection)
+    
+    def add_edges(
+        self,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        connection_type: ConnectionType,
+        strength: ConnectionStrength,
+        context: Optional[str],
+        confidence: float
+    ) -> None:
+        """Append many connections of one kind between node codes, without creating objects."""
+        count = len(sources)
+        self.sources.frombytes(np.asarray(sources, dtype="i").tobytes())
+        self.targets.frombytes(np.asarray(targets, dtype="i").tobytes())
+        self.types.frombytes(
+            np.full(count, _CONNECTION_TYPE_CODES[connection_type], dtype="b").tobytes()
+        )
+        self.strengths.frombytes(np.full(count, _STRENGTH_CODES[strength], dtype="b").tobytes())
+        self.confidences.frombytes(np.full(count, confidence, dtype="d").tobytes())
+        self.contexts.frombytes(np.full(count, self.context_code(context), dtype="i").tobytes())
+    
+    def add_shared_event(self, event: SharedEvent) -> None:
+        """Append a shared event as a clique over its participants, without expanding its pairs."""
+        self.cliques.append(
+            np.array([self.node(person_id) for person_id in event.participants], dtype=np.int32)
+        )
+        self.clique_confidences.append(event.confidence)
+    
+    def context_code(self, context: Optional[str]) -> int:
+        """Integer code of a context label (-1 for None), interning it if new."""
+        if context is None:
+            return -1
+        code = self._context_index.get(context)
+        if code is None:
+            code = self._context_index[context] = len(self.context_labels)
+            self.context_labels.append(context)
+        return code
+
+
+@dataclass
+class PatternEdges:
+    """Connections of one kind produced by a network pattern, as index pairs into people."""
+    sources: np.ndarray
+    targets: np.ndarray
+    connection_type: ConnectionType
+    strength: ConnectionStrength
+    context: str
+    confidence: float
+
+
+class SocialGraph:
+    """
+    Read-only social network: CSR adjacency over interned person ids.
+    
+    Each distinct pair of people is one edge of a CSRGraph. Edge attributes
+    (connection type, strength, confidence, context) are parallel arrays
+    indexed by edge id. When several records connect the same pair, the
+    last one's attributes are kept, as a dict keyed by pair would keep
+    them; multiplicity counts the records and best_confidence keeps their
+    highest confidence.
+    
+    Shared events stay cliques over their participants. They count in
+    num_records, record_degrees and the adjacency (a CliqueGraph then),
+    in closed form per event, but their pairs are not edges: iterating,
+    get and num_edges cover the connection records only, and
+    SharedEvent.pairs() expands an event's connections when needed.
+    
+    Iterating yields one SocialConnection per edge, created on demand.
+    Build it once and pass it to every analysis instead of the connection
+    list.
+    """
+    
+    def __init__(self, edges: EdgeList):
+        # Snapshot: the edge list may keep growing
+        self.node_ids = list(edges.node_ids)
+        self.node_index = dict(edges.node_index)
+        self.context_labels = list(edges.context_labels)
+        self.num_records = len(edges)
+        self.cliques = list(edges.cliques)
+        self.clique_confidences = np.array(edges.clique_confidences, dtype=np.float64)
+        
+        # Pairs of entries of an event, less the pairs of one participant's entries
+        self.clique_record_degrees = np.zeros(self.num_nodes, dtype=np.int64)
+        for nodes in self.cliques:
+            members, entries = np.unique(nodes, return_counts=True)
+            size = len(nodes)
+            self.num_records += (size * (size - 1) - int((entries * (entries - 1)).sum())) // 2
+            self.clique_record_degrees[members] += entries * (size - entries)
+        
+        sources = np.array(edges.sources, dtype=np.int32)
+        targets = np.array(edges.targets, dtype=np.int32)
+        confidences = np.array(edges.confidences, dtype=np.float64)
+        order, starts = group_edges(sources, targets, self.num_nodes)
+        ends = np.append(starts[1:], len(order)) if len(order) else starts
+        last = order[ends - 1]  # Latest record of each pair
+        
+        self.records = last
+        self.multiplicity = (ends - starts).astype(np.int32)
+        self.best_confidence = (
+            np.maximum.reduceat(confidences[order], starts) if len(order) else confidences
+        )
+        self.types = np.array(edges.types, dtype=np.int8)[last]
+        self.strengths = np.array(edges.strengths, dtype=np.int8)[last]
+        self.confidences = confidences[last]
+        self.contexts = np.array(edges.contexts, dtype=np.int32)[last]
+        self.shared_events = {
+            edge: edges.shared_events[record]
+            for edge, record in enumerate(last.tolist())
+            if record in edges.shared_events
+        } if edges.shared_events else {}
+        
+        self.graph = CSRGraph(self.num_nodes, sources[last], targets[last])
+        self._adjacency: Dict[Optional[float], Union[CSRGraph, CliqueGraph]] = {}
+    
+    @classmethod
+    def from_connections(
+        cls,
+        connections: Iterable[SocialConnection],
+        shared_events: Iterable[SharedEvent] = ()
+    ) -> 'SocialGraph':
+        """
+        Build a graph from SocialConnection objects and shared events.
+        
+        Each shared event counts a record for every pair of its
+        participants, kept as a clique instead of expanded.
+        """
+        edges = EdgeList()
+        edges.extend(connections)
+        for event in shared_events:
+            edges.add_shared_event(event)
+        return cls(edges)
+    
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+    
+    @property
+    def num_edges(self) -> int:
+        """Number of distinct connected pairs."""
+        return self.graph.n_edges
+    
+    def __len__(self) -> int:
+        return self.num_edges
+    
+    def __iter__(self) -> Iterator[SocialConnection]:
+        for edge in range(self.num_edges):
+            yield self.connection(edge)
+    
+    def connection(self, edge: int) -> SocialConnection:
+        """SocialConnection of one edge."""
+        context = int(self.contexts[edge])
+        return SocialConnection(
+            person1_id=self.node_ids[self.graph.sources[edge]],
+            person2_id=self.node_ids[self.graph.targets[edge]],
+            connection_type=_CONNECTION_TYPES[self.types[edge]],
+            strength=_STRENGTHS[self.strengths[edge]],
+            context=self.context_labels[context] if context >= 0 else None,
+            shared_events=list(self.shared_events.get(edge, ())),
+            confidence=float(self.confidences[edge])
+        )
+    
+    def get(self, person1_id: str, person2_id: str) -> Optional[SocialConnection]:
+        """Connection between two people, or None."""
+        u = self.node_index.get(person1_id)
+        v = self.node_index.get(person2_id)
+        if u is None or v is None:
+            return None
+        edge = self.graph.find_edge(u, v)
+        return self.connection(edge) if edge is not None else None
+    
+    def keys(self) -> Iterator[Tuple[str, str]]:
+        """Connection keys (see SocialConnection.get_connection_key) of all edges."""
+        for u, v in zip(self.graph.sources.tolist(), self.graph.targets.tolist()):
+            first, second = self.node_ids[u], self.node_ids[v]
+            yield (first, second) if first <= second else (second, first)
+    
+    def adjacency(self, min_confidence: Optional[float] = None) -> Union[CSRGraph, CliqueGraph]:
+        """
+        Adjacency of all edges, or of the pairs with a record of at least
+        min_confidence. Cached per threshold.
+        
+        With shared events, a CliqueGraph over the edges and the events'
+        cliques (those of at least min_confidence).
+        """
+        if min_confidence is None and not self.cliques:
+            return self.graph
+        adjacency = self._adjacency.get(min_confidence)
+        if adjacency is None:
+            graph = self.graph
+            if min_confidence is not None:
+                mask = self.best_confidence >= min_confidence
+                graph = graph if mask.all() else graph.edge_subgraph(mask)
+            if self.cliques:
+                adjacency = CliqueGraph(
+                    self.num_nodes,
+                    graph.sources,
+                    graph.targets,
+                    [
+                        nodes
+                        for nodes, confidence in zip(self.cliques, self.clique_confidences.tolist())
+                        if min_confidence is None or confidence >= min_confidence
+                    ],
+                )
+            else:
+                adjacency = graph
+            self._adjacency[min_confidence] = adjacency
+        return adjacency
+    
+    def local_clustering(self) -> np.ndarray:
+        """
+        Local clustering coefficient of each node, aligned with node_ids.
+        
+        Computed once per graph (by triangle counting) and shared with
+        calculate_network_metrics.
+        """
+        return self.adjacency().local_clustering()
+    
+    def record_degrees(self) -> np.ndarray:
+        """Connection records touching each node (repeated records all count)."""
+        weights = self.multiplicity.astype(np.float64)
+        degrees = (
+            np.bincount(self.graph.sources, weights=weights, minlength=self.num_nodes)
+            + np.bincount(self.graph.targets, weights=weights, minlength=self.num_nodes)
+        )
+        return degrees.astype(np.int64) + self.clique_record_degrees
+
+
+class ConnectionMap(Mapping):
+    """Read-only {(person1_id, person2_id): SocialConnection} view of a SocialGraph."""
+    
+    def __init__(self, graph: SocialGraph):
+        self.graph = graph
+    
+    def __getitem__(self, key: Tuple[str, str]) -> SocialConnection:
+        connection = self.graph.get(*key)
+        if connection is None:
+            raise KeyError(key)
+        return connection
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self.graph.keys()
+    
+    def __len__(self) -> int:
+        return len(self.graph)
+    
+    def values(self) -> Iterator[SocialConnection]:  # type: ignore[override]
+        return iter(self.graph)
+
+
+def as_social_graph(
+    connections: Union[SocialGraph, Iterable[SocialConnection]],
+    shared_events: Optional[Iterable[SharedEvent]] = None
+) -> SocialGraph:
+    """The graph itself, or a graph built from a connection list and shared events."""
+    if isinstance(connections, SocialGraph):
+        if shared_events is not None:
+            raise ValueError("Add shared events when building the SocialGraph")
+        return connections
+    return SocialGraph.from_connections(connections, shared_events or ())
+
+
 class SocialNetworkBuilder:
     """
     Builds social networks from people data with privacy protection.
@@ -92,17 +482,76 @@ class SocialNetworkBuilder:
         self,
         min_connection_confidence: float = 0.6,
         preserve_strong_connections: bool = True,
-        use_external_patterns: bool = True
+        use_external_patterns: bool = True,
+        random_seed: Optional[int] = None,
+        max_shared_event_pairs: Optional[int] = 10_000
     ):
         self.min_confidence = min_connection_confidence
         self.preserve_strong = preserve_strong_connections
         self.use_external = use_external_patterns
-        self.connections: Dict[Tuple[str, str], SocialConnection] = {}
+        # Random draws keyed by geography / person, reproducible when seeded
+        self.streams = RandomStreams(random_seed)
+        self.edges = EdgeList()  # All stored connection records
+        self._graph: Optional[SocialGraph] = None
+        # Components over stored connections of at least min_confidence,
+        # updated as connections are stored
+        self.components = UnionFind()
+        # Events with more participant pairs only yield a sample of them
+        self.max_shared_event_pairs = max_shared_event_pairs
+        self.shared_events: List[SharedEvent] = []  # Hyperedges found by extract_connections
         self.circles: Dict[str, SocialCircle] = {}
     
+    @property
+    def graph(self) -> SocialGraph:
+        """Graph of the stored connections, rebuilt only after new ones are added."""
+        if self._graph is None or self._graph.num_records != len(self.edges):
+            self._graph = SocialGraph(self.edges)
+        return self._graph
+    
+    @property
+    def connections(self) -> ConnectionMap:
+        """
+        Stored connections by (person1_id, person2_id), created on access.
+        
+        A pair stored more than once shows its latest record; circles count
+        the pair if any of its records reaches min_confidence.
+        """
+        return ConnectionMap(self.graph)
+    
+    def store_connections(self, connections: Iterable[SocialConnection]) -> None:
+        """Add connections to the stored network and its circles."""
+        edges = self.edges
+        for connection in connections:
+            record = edges.add(connection)
+            if connection.confidence >= self.min_confidence:
+                self.components.union(edges.sources[record], edges.targets[record])
+    
+    def store_pattern_edges(
+        self,
+        people: List['Person'],  # type: ignore
+        batches: List[PatternEdges]
+    ) -> None:
+        """Add pattern connections to the stored network and its circles, in bulk."""
+        if not batches:
+            return
+        nodes = np.array([self.edges.node(person.person_id) for person in people], dtype=np.int32)
+        for batch in batches:
+            sources, targets = nodes[batch.sources], nodes[batch.targets]
+            self.edges.add_edges(
+                sources,
+                targets,
+                batch.connection_type,
+                batch.strength,
+                batch.context,
+                batch.confidence,
+            )
+            if batch.confidence >= self.min_confidence:
+                self.components.union_edges(sources, targets)
+    
     def extract_connections(
         self,
-        people: List['Person']  # type: ignore
+        people: List['Person'],  # type: ignore
+        expand_shared_events: bool = True
     ) -> List[SocialConnection]:
         """
         Extract explicit connections from people data.
@@ -111,47 +560,25 @@ class SocialNetworkBuilder:
         - Shared events (co-defendants, same hospital admission)
         - Same household/family indicators
         - Explicit relationship fields
+        
+        Shared events are kept whole in self.shared_events. Each yields a
+        connection per pair of participants, or a uniform sample of
+        max_shared_event_pairs of them for larger events; circles still
+        join all participants. With expand_shared_events=False they yield
+        no connections at all, for analyses that take the events
+        themselves (shared_events= of the analyzer methods).
         """
         connections = []
         
-        # Index people by various attributes for fast lookup
-        by_geography = defaultdict(list)
-        by_event_location = defaultdict(list)
-        event_participants = defaultdict(list)
-        
-        for person in people:
-            # Index by geography
-            if person.demographics.geography:
-                by_geography[person.demographics.geography].append(person)
-            
-            # Index by events
-            for event in person.events:
-                event_key = f"{event.event_type}_{event.date}_{event.location}"
-                event_participants[event_key].append((person, event))
-                
-                if event.location:
-                    by_event_location[event.location].append(person)
-        
-        # Find people who share events (likely connected)
-        for event_key, participants in event_participants.items():
-            if len(participants) >= 2:
-                # People at same event are connected
-                for i, (person1, event1) in enumerate(participants):
-                    for person2, event2 in participants[i+1:]:
-                        conn_type = self._infer_connection_type_from_event(
-                            event1.event_type
-                        )
-                        
-                        connection = SocialConnection(
-                            person1_id=person1.person_id,
-                            person2_id=person2.person_id,
-                            connection_type=conn_type,
-                            strength=ConnectionStrength.MODERATE,
-                            context=f"Shared event: {event1.event_type}",
-                            shared_events=[event1.event_id, event2.event_id],
-                            confidence=0.9  # High confidence - explicit shared event
-                        )
-                        connections.append(connection)
+        # People at same event are connected
+        shared_events = self.find_shared_events(people)
+        for event in shared_events:
+            if expand_shared_events:
+                connections.extend(
+                    self.shared_event_pairs(
+                        event, event.event_type, str(event.date), str(event.location)
+                    )
+                )
         
         # Infer family/household connections from demographics
         if self.use_external:
@@ -159,12 +586,59 @@ class SocialNetworkBuilder:
             connections.extend(inferred)
         
         # Store connections
-        for conn in connections:
-            self.connections[conn.get_connection_key()] = conn
+        self.store_connections(connections)
+        self.shared_events.extend(shared_events)
+        for event in shared_events:
+            if event.confidence >= self.min_confidence:
+                nodes = [self.edges.node(person_id) for person_id in event.participants]
+                for node in nodes[1:]:
+                    self.components.union(nodes[0], node)
         
         logger.info(f"Extracted {len(connections)} connections from {len(people)} people")
         return connections
     
+    def shared_event_pairs(self, event: SharedEvent, *key: Any) -> Iterable[SocialConnection]:
+        """
+        Connections of a shared event: all its pairs, or a uniform sample of
+        max_shared_event_pairs of them for larger events, drawn from the
+        stream keyed by key.
+        """
+        if self.max_shared_event_pairs is None:
+            return event.pairs()
+        rng = self.streams.generator("shared_event_pairs", *key)
+        return event.sample_pairs(rng, self.max_shared_event_pairs)
+    
+    def find_shared_events(
+        self,
+        people: List['Person']  # type: ignore
+    ) -> List[SharedEvent]:
+        """
+        Events (same type, date and location) that two or more people share.
+        
+        Returns:
+            One SharedEvent per event, participants in input order
+        """
+        event_participants = defaultdict(list)
+        for person in people:
+            for event in person.events:
+                event_participants[(event.event_type, event.date, event.location)].append(
+                    (person.person_id, event.event_id)
+                )
+        
+        shared_events = []
+        for (event_type, date, location), participants in event_participants.items():
+            if len(participants) >= 2:
+                person_ids, event_ids = zip(*participants)
+                shared_events.append(SharedEvent(
+                    event_type=event_type,
+                    date=date,
+                    location=location,
+                    participants=list(person_ids),
+                    event_ids=list(event_ids),
+                    connection_type=self._infer_connection_type_from_event(event_type)
+                ))
+        return shared_events
+    
     def _infer_connection_type_from_event(self, event_type: str) -> ConnectionType:
         """Infer connection type based on shared event type."""
         event_type_lower = event_type.lower()
@@ -203,12 +677,14 @@ class SocialNetworkBuilder:
         # Infer neighbor connections in small areas
         for geo, geo_people in by_geography.items():
             if len(geo_people) >= 2 and len(geo_people) <= 100:  # Small community
+                rng = self.streams.generator("neighbors", geo)
                 # In small areas, people likely know each other
                 for i, person1 in enumerate(geo_people):
                     # Connect to a few neighbors (not everyone)
                     sample_size = min(3, len(geo_people) - i - 1)
                     if sample_size > 0:
-                        neighbors = random.sample(
+                        neighbors = sample(
+                            rng,
                             geo_people[i+1:],
                             sample_size
                         )
@@ -247,48 +723,40 @@ class SocialNetworkBuilder:
     def detect_social_circles(
         self,
         people: List['Person'],  # type: ignore
-        connections: Optional[List[SocialConnection]] = None
+        connections: Optional[Union[SocialGraph, Iterable[SocialConnection]]] = None
     ) -> List[SocialCircle]:
         """
         Detect communities/circles using connection patterns.
         
-        Uses graph clustering to find groups of highly connected people.
+        Uses graph clustering to find groups of highly connected people:
+        connected components over connections of at least min_confidence.
+        Defaults to the stored connections, whose components are kept up
+        to date as they are stored.
+        
+        A pair recorded several times links its people if any of its
+        records reaches min_confidence, with the stored connections as with
+        a connection list, even when self.connections shows a later,
+        less confident record for the pair. Components only grow as
+        connections are stored; a later record never unlinks a pair.
         """
         if connections is None:
-            connections = list(self.connections.values())
-        
-        # Build adjacency lists
-        graph = defaultdict(set)
-        for conn in connections:
-            if conn.confidence >= self.min_confidence:
-                graph[conn.person1_id].add(conn.person2_id)
-                graph[conn.person2_id].add(conn.person1_id)
+            node_ids = self.edges.node_ids
+            components = self.components.components(min_size=2)
+        else:
+            graph = as_social_graph(connections)
+            node_ids = graph.node_ids
+            components = connected_components(graph.adjacency(self.min_confidence))
         
-        # Find connected components (simple approach)
-        visited = set()
         circles = []
-        
-        for person_id in graph.keys():
-            if person_id not in visited:
-                # BFS to find all connected people
-                circle_members = set()
-                queue = [person_id]
-                
-                while queue:
-                    current = queue.pop(0)
-                    if current not in visited:
-                        visited.add(current)
-                        circle_members.add(current)
-                        queue.extend(graph[current] - visited)
-                
-                if len(circle_members) >= 2:
-                    circle = SocialCircle(
-                        circle_id=f"circle_{len(circles)}",
-                        members=circle_members,
-                        circle_type="community"
-                    )
-                    circles.append(circle)
-                    self.circles[circle.circle_id] = circle
+        for component in components:
+            if len(component) >= 2:
+                circle = SocialCircle(
+                    circle_id=f"circle_{len(circles)}",
+                    members={node_ids[node] for node in component.tolist()},
+                    circle_type="community"
+                )
+                circles.append(circle)
+                self.circles[circle.circle_id] = circle
         
         logger.info(f"Detected {len(circles)} social circles")
         return circles
@@ -308,13 +776,7 @@ class SocialNetworkBuilder:
         3. Generalize weak connections
         4. Add noise to connection counts
         """
-        # Build person -> persona mapping
-        person_to_persona = {}
-        for persona in personas:
-            # Assume persona has merged_person_ids tracking which people were merged
-            if hasattr(persona, 'merged_person_ids'):
-                for person_id in persona.merged_person_ids:
-                    person_to_persona[person_id] = persona.persona_id
+        person_to_persona = self._person_to_persona(personas)
         
         # Map connections to personas
         anonymized = []
@@ -361,12 +823,83 @@ class SocialNetworkBuilder:
         
         # Add noise to connection counts for privacy
         for persona_id in connection_counts:
-            noise = random.randint(-2, 2)
+            rng = self.streams.generator("connection_count_noise", persona_id)
+            noise = int(rng.integers(-2, 2, endpoint=True))
             connection_counts[persona_id] = max(0, connection_counts[persona_id] + noise)
         
         logger.info(f"Anonymized {len(anonymized)} connections for {len(personas)} personas")
         return anonymized
     
+    def anonymize_shared_events(
+        self,
+        shared_events: List[SharedEvent],
+        personas: List['Persona'],  # type: ignore
+        preserve_structure: bool = True
+    ) -> List[SharedEvent]:
+        """
+        Anonymize shared events without expanding them into pairs.
+        
+        Each participant is replaced by their persona, so a persona is
+        listed once per merged person and the event stands for the same
+        records anonymize_network keeps for its expanded pairs; people
+        without a persona are dropped, as are events left with fewer than
+        two personas. Dates, locations and event ids are removed and,
+        unless the event is strong and strong connections are preserved,
+        the implied connections generalized as anonymize_network does
+        (those are dropped when preserve_structure is False).
+        """
+        person_to_persona = self._person_to_persona(personas)
+        
+        anonymized = []
+        for event in shared_events:
+            strong = self.preserve_strong and event.strength == ConnectionStrength.STRONG
+            if not (strong or preserve_structure):
+                continue
+            members = [
+                persona_id for persona_id in map(person_to_persona.get, event.participants)
+                if persona_id is not None
+            ]
+            if len(set(members)) < 2:
+                continue
+            if strong:
+                anonymized.append(SharedEvent(
+                    event_type=event.event_type,
+                    date=None,
+                    location=None,
+                    participants=members,
+                    connection_type=event.connection_type,
+                    strength=event.strength,
+                    confidence=event.confidence,
+                    context=event.context
+                ))
+            else:
+                anonymized.append(SharedEvent(
+                    event_type=event.event_type,
+                    date=None,
+                    location=None,
+                    participants=members,
+                    connection_type=ConnectionType.INFERRED,
+                    strength=ConnectionStrength.WEAK,
+                    confidence=min(event.confidence, 0.5),
+                    context="Anonymized connection"
+                ))
+        
+        logger.info(f"Anonymized {len(anonymized)} of {len(shared_events)} shared events")
+        return anonymized
+    
+    def _person_to_persona(
+        self,
+        personas: List['Persona']  # type: ignore
+    ) -> Dict[str, str]:
+        """Build person -> persona mapping."""
+        person_to_persona = {}
+        for persona in personas:
+            # Assume persona has merged_person_ids tracking which people were merged
+            if hasattr(persona, 'merged_person_ids'):
+                for person_id in persona.merged_person_ids:
+                    person_to_persona[person_id] = persona.persona_id
+        return person_to_persona
+    
     def integrate_external_network_patterns(
         self,
         people: List['Person'],  # type: ignore
@@ -380,15 +913,17 @@ class SocialNetworkBuilder:
         - "community": Strong clusters with weak inter-cluster links
         - "hierarchical": Tree-like structure (workplaces, schools)
         """
-        connections = []
+        batches = []
         
         if pattern_source == "small_world":
-            connections = self._add_small_world_pattern(people)
+            batches = self._small_world_edges(people)
         elif pattern_source == "community":
-            connections = self._add_community_pattern(people)
+            batches = self._community_edges(people)
         elif pattern_source == "hierarchical":
-            connections = self._add_hierarchical_pattern(people)
+            batches = self._hierarchical_edges(people)
         
+        self.store_pattern_edges(people, batches)
+        connections = self._pattern_connections(people, batches)
         logger.info(f"Added {len(connections)} connections from {pattern_source} pattern")
         return connections
     
@@ -396,115 +931,158 @@ class SocialNetworkBuilder:
         self,
         people: List['Person']  # type: ignore
     ) -> List[SocialConnection]:
+        """Add small-world network pattern."""
+        return self._pattern_connections(people, self._small_world_edges(people))
+    
+    def _add_community_pattern(
+        self,
+        people: List['Person']  # type: ignore
+    ) -> List[SocialConnection]:
+        """Add community structure with strong intra-cluster connections."""
+        return self._pattern_connections(people, self._community_edges(people))
+    
+    def _add_hierarchical_pattern(
+        self,
+        people: List['Person']  # type: ignore
+    ) -> List[SocialConnection]:
+        """Add hierarchical structure (e.g., workplace, school)."""
+        return self._pattern_connections(people, self._hierarchical_edges(people))
+    
+    def _small_world_edges(
+        self,
+        people: List['Person']  # type: ignore
+    ) -> List[PatternEdges]:
         """
-        Add small-world network pattern.
+        Small-world network pattern.
         
         Characteristics:
         - Most people have 2-5 connections
         - Few people have 10+ connections (hubs)
         - High clustering (friends of friends are friends)
         """
-        connections = []
+        n = len(people)
+        rng = self.streams.generator("small_world")
         
-        # Randomly assign connection counts (power-law distribution)
-        for person in people:
-            # Most people have few connections
-            if random.random() < 0.8:
-                num_connections = random.randint(2, 5)
-            else:
-                # Some people are hubs
-                num_connections = random.randint(10, 20)
-            
-            # Connect to random others (simplified)
-            potential_connections = [p for p in people if p.person_id != person.person_id]
-            if len(potential_connections) >= num_connections:
-                connected_to = random.sample(potential_connections, num_connections)
-                
-                for other in connected_to:
-                    connection = SocialConnection(
-                        person1_id=person.person_id,
-                        person2_id=other.person_id,
-                        connection_type=ConnectionType.FRIEND,
-                        strength=ConnectionStrength.WEAK,
-                        context="Small-world pattern",
-                        confidence=0.5
-                    )
-                    connections.append(connection)
+        # Randomly assign connection counts (power-law distribution):
+        # most people have few connections, some are hubs
+        hubs = rng.random(n) >= 0.8
+        num_connections = np.where(
+            hubs,
+            rng.integers(10, 20, size=n, endpoint=True),
+            rng.integers(2, 5, size=n, endpoint=True)
+        )
+        # People who cannot find that many others get none
+        num_connections[num_connections > n - 1] = 0
         
-        return connections
+        # Connect to random others
+        sources = np.repeat(np.arange(n), num_connections)
+        targets = sample_indices(rng, num_connections, n, exclude=np.arange(n))
+        return [
+            PatternEdges(
+                sources,
+                targets,
+                ConnectionType.FRIEND,
+                ConnectionStrength.WEAK,
+                "Small-world pattern",
+                0.5,
+            )
+        ]
     
-    def _add_community_pattern(
+    def _community_edges(
         self,
         people: List['Person']  # type: ignore
-    ) -> List[SocialConnection]:
-        """Add community structure with strong intra-cluster connections."""
-        connections = []
+    ) -> List[PatternEdges]:
+        """Community structure with strong intra-cluster connections."""
+        batches = []
         
         # Group people by geography
         by_geo = defaultdict(list)
-        for person in people:
+        for index, person in enumerate(people):
             geo = person.demographics.geography or "unknown"
-            by_geo[geo].append(person)
+            by_geo[geo].append(index)
         
         # Create strong connections within each community
         for geo, community in by_geo.items():
             if len(community) >= 3:
-                # Each person connects to 3-5 others in community
-                for person in community:
-                    num_connections = min(5, len(community) - 1)
-                    others = [p for p in community if p.person_id != person.person_id]
-                    connected_to = random.sample(others, min(num_connections, len(others)))
-                    
-                    for other in connected_to:
-                        connection = SocialConnection(
-                            person1_id=person.person_id,
-                            person2_id=other.person_id,
-                            connection_type=ConnectionType.NEIGHBOR,
-                            strength=ConnectionStrength.MODERATE,
-                            context=f"Community: {geo}",
-                            confidence=0.7
-                        )
-                        connections.append(connection)
+                # Each person connects to up to 5 others in community
+                rng = self.streams.generator("community", geo)
+                size = len(community)
+                num_connections = np.full(size, min(5, size - 1))
+                members = np.array(community)
+                sources = np.repeat(members, num_connections)
+                targets = members[
+                    sample_indices(rng, num_connections, size, exclude=np.arange(size))
+                ]
+                batches.append(
+                    PatternEdges(
+                        sources,
+                        targets,
+                        ConnectionType.NEIGHBOR,
+                        ConnectionStrength.MODERATE,
+                        f"Community: {geo}",
+                        0.7,
+                    )
+                )
         
-        return connections
+        return batches
     
-    def _add_hierarchical_pattern(
+    def _hierarchical_edges(
         self,
         people: List['Person']  # type: ignore
-    ) -> List[SocialConnection]:
-        """Add hierarchical structure (e.g., workplace, school)."""
-        connections = []
+    ) -> List[PatternEdges]:
+        """Hierarchical structure (e.g., workplace, school)."""
+        batches = []
         
         # Group by age ranges (proxy for hierarchy levels)
         by_age = defaultdict(list)
-        for person in people:
+        for index, person in enumerate(people):
             age = person.demographics.age or 40
             age_group = (age // 10) * 10  # 20s, 30s, 40s, etc.
-            by_age[age_group].append(person)
+            by_age[age_group].append(index)
         
         # Create supervisor-employee type connections
         age_groups = sorted(by_age.keys())
         for i in range(len(age_groups) - 1):
             older_group = by_age[age_groups[i + 1]]
-            younger_group = by_age[age_groups[i]]
+            younger_group = np.array(by_age[age_groups[i]])
             
-            # Each older person supervises 2-5 younger people
-            for supervisor in older_group[:len(older_group)//2]:
-                num_reports = min(5, len(younger_group))
-                reports = random.sample(younger_group, min(num_reports, len(younger_group)))
-                
-                for employee in reports:
-                    connection = SocialConnection(
-                        person1_id=supervisor.person_id,
-                        person2_id=employee.person_id,
-                        connection_type=ConnectionType.SUPERVISOR_EMPLOYEE,
-                        strength=ConnectionStrength.MODERATE,
-                        context="Hierarchical structure",
-                        confidence=0.6
-                    )
-                    connections.append(connection)
+            # Each supervisor (first half of the older group) has up to 5 reports
+            rng = self.streams.generator("hierarchy", age_groups[i])
+            supervisors = np.array(older_group[:len(older_group)//2], dtype=np.int64)
+            num_reports = np.full(len(supervisors), min(5, len(younger_group)))
+            sources = np.repeat(supervisors, num_reports)
+            targets = younger_group[sample_indices(rng, num_reports, len(younger_group))]
+            batches.append(
+                PatternEdges(
+                    sources,
+                    targets,
+                    ConnectionType.SUPERVISOR_EMPLOYEE,
+                    ConnectionStrength.MODERATE,
+                    "Hierarchical structure",
+                    0.6,
+                )
+            )
         
-        return connections
+        return batches
+    
+    def _pattern_connections(
+        self,
+        people: List['Person'],  # type: ignore
+        batches: List[PatternEdges]
+    ) -> List[SocialConnection]:
+        """SocialConnection objects of pattern edges."""
+        return [
+            SocialConnection(
+                person1_id=people[source].person_id,
+                person2_id=people[target].person_id,
+                connection_type=batch.connection_type,
+                strength=batch.strength,
+                context=batch.context,
+                confidence=batch.confidence
+            )
+            for batch in batches
+            for source, target in zip(batch.sources.tolist(), batch.targets.tolist())
+        ]
 
 
 class SocialNetworkAnalyzer:
@@ -517,37 +1095,34 @@ class SocialNetworkAnalyzer:
     
     def calculate_network_metrics(
         self,
-        connections: List[SocialConnection]
+        connections: Union[SocialGraph, Iterable[SocialConnection]],
+        shared_events: Optional[List[SharedEvent]] = None
     ) -> Dict[str, float]:
         """
         Calculate network statistics.
         
+        Takes a SocialGraph or a connection list, plus shared events whose
+        participant pairs all count as connections; pass the graph when
+        running several analyses on one network.
+        
         Returns:
         - average_degree: Average number of connections per person
         - clustering_coefficient: How clustered the network is
         - density: Proportion of possible connections that exist
         - largest_component_size: Size of largest connected group
         """
-        # Build graph
-        graph = defaultdict(set)
-        all_nodes = set()
-        
-        for conn in connections:
-            graph[conn.person1_id].add(conn.person2_id)
-            graph[conn.person2_id].add(conn.person1_id)
-            all_nodes.add(conn.person1_id)
-            all_nodes.add(conn.person2_id)
+        network = as_social_graph(connections, shared_events)
+        graph = network.adjacency()
         
         # Calculate metrics
-        num_nodes = len(all_nodes)
-        num_edges = len(connections)
+        num_nodes = network.num_nodes
+        num_edges = network.num_records
         
         if num_nodes == 0:
             return {}
         
         # Average degree
-        degrees = [len(graph[node]) for node in all_nodes]
-        avg_degree = sum(degrees) / num_nodes if num_nodes > 0 else 0
+        avg_degree = int(graph.degrees.sum()) / num_nodes
         
         # Density
         max_edges = num_nodes * (num_nodes - 1) / 2
@@ -575,58 +1150,26 @@ class SocialNetworkAnalyzer:
     
     def _calculate_clustering_coefficient(
         self,
-        graph: Dict[str, Set[str]]
+        graph: Union[CSRGraph, CliqueGraph]
     ) -> float:
-        """Calculate clustering coefficient (simplified version)."""
-        coefficients = []
-        
-        for node, neighbors in graph.items():
-            if len(neighbors) < 2:
-                continue
-            
-            # Count triangles (connections between neighbors)
-            possible_edges = len(neighbors) * (len(neighbors) - 1) / 2
-            actual_edges = 0
-            
-            neighbor_list = list(neighbors)
-            for i, n1 in enumerate(neighbor_list):
-                for n2 in neighbor_list[i+1:]:
-                    if n2 in graph[n1]:
-                        actual_edges += 1
-            
-            coefficient = actual_edges / possible_edges if possible_edges > 0 else 0
-            coefficients.append(coefficient)
-        
-        return sum(coefficients) / len(coefficients) if coefficients else 0
+        """Average local clustering coefficient of nodes with at least 2 neighbors."""
+        eligible = graph.degrees >= 2
+        if not eligible.any():
+            return 0
+        return float(graph.local_clustering()[eligible].mean())
     
     def _find_components(
         self,
-        graph: Dict[str, Set[str]]
-    ) -> List[Set[str]]:
-        """Find connected components."""
-        visited = set()
-        components = []
-        
-        for node in graph.keys():
-            if node not in visited:
-                component = set()
-                queue = [node]
-                
-                while queue:
-                    current = queue.pop(0)
-                    if current not in visited:
-                        visited.add(current)
-                        component.add(current)
-                        queue.extend(graph[current] - visited)
-                
-                components.append(component)
-        
-        return components
+        graph: Union[CSRGraph, CliqueGraph]
+    ) -> List[np.ndarray]:
+        """Find connected components (arrays of node codes)."""
+        return connected_components(graph)
     
     def assess_privacy_risk_from_network(
         self,
-        connections: List[SocialConnection],
-        personas: List['Persona']  # type: ignore
+        connections: Union[SocialGraph, Iterable[SocialConnection]],
+        personas: List['Persona'],  # type: ignore
+        shared_events: Optional[List[SharedEvent]] = None
     ) -> Dict[str, float]:
         """
         Assess privacy risks from social network structure.
@@ -636,18 +1179,16 @@ class SocialNetworkAnalyzer:
         - Small isolated groups are vulnerable
         - Dense connections increase re-identification risk
         """
-        metrics = self.calculate_network_metrics(connections)
+        network = as_social_graph(connections, shared_events)
+        metrics = self.calculate_network_metrics(network)
         
-        # Build persona connection counts
-        persona_degrees = defaultdict(int)
-        for conn in connections:
-            persona_degrees[conn.person1_id] += 1
-            persona_degrees[conn.person2_id] += 1
+        # Persona connection counts
+        persona_degrees = network.record_degrees()
         
         # Identify high-risk network positions
-        if persona_degrees:
-            avg_degree = sum(persona_degrees.values()) / len(persona_degrees)
-            max_degree = max(persona_degrees.values())
+        if len(persona_degrees):
+            avg_degree = int(persona_degrees.sum()) / len(persona_degrees)
+            max_degree = int(persona_degrees.max())
             
             # Hubs (many connections) are identifiable
             hub_risk = max_degree / (avg_degree + 1)
@@ -673,28 +1214,40 @@ def add_social_network(
     people: List['Person'],  # type: ignore
     personas: List['Persona'],  # type: ignore
     use_external_patterns: bool = True,
-    preserve_connections: bool = True
+    preserve_connections: bool = True,
+    random_seed: Optional[int] = None,
+    max_shared_event_pairs: Optional[int] = 10_000
 ) -> Tuple[List[SocialConnection], Dict[str, float]]:
     """
     Add social network to personas with privacy protection.
     
+    Shared events are anonymized whole (anonymize_shared_events) and the
+    risk is assessed on them directly, so it counts every pair of
+    participants however large the event. The returned connections hold
+    each anonymized event's pairs, or a sample of max_shared_event_pairs
+    of them for larger events, as extract_connections does.
+    
     Args:
         people: Original people data
         personas: Generated personas
         use_external_patterns: Use realistic network patterns
         preserve_connections: Preserve strong connections
-        
+        random_seed: Seed for reproducible inferred connections and noise
+        max_shared_event_pairs: Connections returned per shared event (None for all)
+    
     Returns:
         Tuple of (anonymized_connections, privacy_metrics)
     """
     # Build network
     builder = SocialNetworkBuilder(
         preserve_strong_connections=preserve_connections,
-        use_external_patterns=use_external_patterns
+        use_external_patterns=use_external_patterns,
+        random_seed=random_seed,
+        max_shared_event_pairs=max_shared_event_pairs
     )
     
-    # Extract explicit connections
-    connections = builder.extract_connections(people)
+    # Extract explicit connections; shared events stay compressed
+    connections = builder.extract_connections(people, expand_shared_events=False)
     
     # Add realistic patterns if requested
     if use_external_patterns:
@@ -706,10 +1259,15 @@ def add_social_network(
     
     # Anonymize for personas
     anonymized = builder.anonymize_network(connections, personas)
+    anonymized_events = builder.anonymize_shared_events(builder.shared_events, personas)
     
     # Assess privacy risks
     analyzer = SocialNetworkAnalyzer()
-    network_risk = analyzer.assess_privacy_risk_from_network(anonymized, personas)
+    network_risk = analyzer.assess_privacy_risk_from_network(
+        anonymized, personas, shared_events=anonymized_events
+    )
+    for index, event in enumerate(anonymized_events):
+        anonymized.extend(builder.shared_event_pairs(event, "anonymized", index))
     
     logger.info(f"Social network: {len(anonymized)} connections, "
                 f"risk: {network_risk.get('overall_network_risk', 0):.2%}")
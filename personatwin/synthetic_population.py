@@ -0,0 +1,242 @@
+"""
+Synthetic people-events populations for benchmarks and tests.
+
+generate_population builds a reproducible population of Person objects
+for any built-in Domain, at any scale (10k to millions of people):
+
+- Demographics: ages, genders and ethnicities drawn from fixed
+  distributions, and counties drawn with a tunable Zipf skew so a few
+  counties hold most people, as in real administrative data
+- Events: a tunable mean number per person, with the domain's event types
+  and outcomes; sequences start with the domain's first event type and
+  only use types whose required predecessors (DomainEventRules) have
+  already occurred
+- Shared events: a fraction of events are shared with other people, who
+  get a copy with the same type, date, location and outcome, so
+  find_shared_events sees one event with all of them as participants.
+  Shared event sizes follow a tunable Zipf distribution, so a few events
+  are large enough to exercise the shared-event pair cap. Partners are
+  people whose history has started by the event date; the copies come on
+  top of events_per_person and are not checked against sequence rules
+
+All random draws come from one seeded NumPy generator, in bulk, so the
+same arguments always give the same population.
+"""
+
+import bisect
+from datetime import datetime, timedelta
+from typing import List, Sequence
+import numpy as np
+
+from personatwin.models import Person, Event, Demographics
+from personatwin.domains import Domain, get_domain_config
+from personatwin.event_merging import DomainEventRules
+
+
+GENDERS = ("Male", "Female", "Other")
+GENDER_WEIGHTS = (0.49, 0.49, 0.02)
+ETHNICITIES = ("White", "Black", "Hispanic", "Asian", "Other")
+ETHNICITY_WEIGHTS = (0.58, 0.13, 0.19, 0.06, 0.04)
+
+COUNTY_NAMES = (
+    "Adams", "Baker", "Clark", "Douglas", "Franklin", "Grant", "Hamilton",
+    "Jackson", "Jefferson", "Lake", "Lincoln", "Madison", "Marion", "Monroe",
+    "Montgomery", "Morgan", "Polk", "Scott", "Union", "Warren", "Washington",
+    "Wayne", "Cuyahoga", "Harris", "Orange",
+)
+STATES = ("OH", "TX", "CA", "NY", "FL", "IL", "PA", "GA")
+
+GENERIC_EVENT_TYPES = ("event",)  # For domains without an event vocabulary
+GENERIC_OUTCOMES = ("completed", "pending")
+
+START_DATE = datetime(2015, 1, 1)
+HISTORY_DAYS = 8 * 365  # Span of first-event dates
+MEAN_GAP_DAYS = 60  # Mean days between a person's consecutive events
+
+
+def county_names(n_counties: int) -> List[str]:
+    """Distinct "Name County, ST" geographies, as many as requested (up to 200)."""
+    names = [f"{name} County, {state}" for state in STATES for name in COUNTY_NAMES]
+    if not 1 <= n_counties <= len(names):
+        raise ValueError(f"n_counties must be between 1 and {len(names)}")
+    return names[:n_counties]
+
+
+def zipf_weights(n: int, skew: float) -> np.ndarray:
+    """Probabilities proportional to 1 / rank ** skew (skew 0 is uniform)."""
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** skew
+    return weights / weights.sum()
+
+
+def generate_population(
+    domain: Domain,
+    n_people: int,
+    events_per_person: float = 3.0,
+    geography_skew: float = 1.0,
+    n_counties: int = 50,
+    shared_event_rate: float = 0.05,
+    shared_event_skew: float = 2.0,
+    max_shared_event_size: int = 200,
+    seed: int = 0,
+    id_prefix: str = "P"
+) -> List[Person]:
+    """
+    Generate a synthetic population for a domain.
+    
+    Args:
+        domain: Domain whose event types, outcomes and sequence rules are used
+        n_people: Number of people
+        events_per_person: Mean events per person (every person has at least one)
+        geography_skew: Zipf exponent of county sizes (0 = equal counties)
+        n_counties: Number of distinct counties
+        shared_event_rate: Fraction of events shared with other people
+        shared_event_skew: Zipf exponent of shared event sizes (participants)
+        max_shared_event_size: Most participants of one shared event
+        seed: Seed of the random generator
+        id_prefix: Prefix of person IDs
+    
+    Returns:
+        People with demographics and date-ordered events
+    """
+    if n_people <= 0:
+        return []
+    if max_shared_event_size < 2:
+        raise ValueError("max_shared_event_size must be at least 2")
+    
+    rng = np.random.default_rng(seed)
+    config = get_domain_config(domain)
+    event_types = list(config.event_types) or list(GENERIC_EVENT_TYPES)
+    outcomes = list(config.outcomes) or list(GENERIC_OUTCOMES)
+    predecessors = DomainEventRules.get_compiled_rules(domain).predecessors
+    counties = county_names(n_counties)
+    
+    # Per-person draws
+    ages = np.clip(np.rint(rng.normal(38, 14, n_people)), 18, 90).astype(np.int64).tolist()
+    genders = rng.choice(len(GENDERS), n_people, p=GENDER_WEIGHTS).tolist()
+    ethnicities = rng.choice(len(ETHNICITIES), n_people, p=ETHNICITY_WEIGHTS).tolist()
+    geographies = rng.choice(
+        n_counties, n_people, p=zipf_weights(n_counties, geography_skew)
+    ).tolist()
+    event_counts = 1 + rng.poisson(max(events_per_person - 1, 0), n_people)
+    first_days = rng.integers(0, HISTORY_DAYS, n_people).tolist()
+    
+    # Per-event draws, consumed person by person
+    n_events = int(event_counts.sum())
+    gaps = np.rint(rng.exponential(MEAN_GAP_DAYS, n_events)).astype(np.int64).tolist()
+    type_picks = rng.random(n_events).tolist()
+    outcome_picks = rng.integers(len(outcomes), size=n_events).tolist()
+    sites = rng.integers(1, 100, size=n_events).tolist()
+    
+    # Shared events: host event indices, sizes and partner draws
+    hosts = np.flatnonzero(rng.random(n_events) < shared_event_rate).tolist()
+    n_sizes = max(min(max_shared_event_size, n_people) - 1, 1)
+    sizes = (
+        2 + rng.choice(n_sizes, len(hosts), p=zipf_weights(n_sizes, shared_event_skew))
+    ).tolist()
+    partner_picks = rng.random(sum(sizes) - len(hosts)).tolist()
+    
+    people = []
+    all_events = []  # Every generated event, in draw order
+    owners = []  # Person index of each event
+    k = 0  # Index into the per-event draws
+    for i, count in enumerate(event_counts.tolist()):
+        person_id = f"{id_prefix}{i}"
+        geography = counties[geographies[i]]
+        county, state = geography.split(", ")
+        seen = set()
+        day = first_days[i]
+        events = []
+        for j in range(count):
+            event_type = _next_event_type(
+                event_types, predecessors, seen, type_picks[k], first=(j == 0)
+            )
+            seen.add(event_type)
+            day += gaps[k] if j else 0
+            events.append(Event(
+                event_id=f"{person_id}_E{j}",
+                date=START_DATE + timedelta(days=day),
+                event_type=event_type,
+                outcome=outcomes[outcome_picks[k]],
+                location=f"Site {sites[k]}, {county} City, {county}, {state}",
+                category=domain.value,
+            ))
+            owners.append(i)
+            k += 1
+        all_events.extend(events)
+        
+        people.append(Person(
+            person_id=person_id,
+            demographics=Demographics(
+                age=ages[i],
+                gender=GENDERS[genders[i]],
+                ethnicity=ETHNICITIES[ethnicities[i]],
+                geography=geography,
+            ),
+            events=events,
+        ))
+    
+    if hosts and n_people > 1:
+        _share_events(people, all_events, owners, hosts, sizes, partner_picks, first_days)
+    
+    return people
+
+
+def _share_events(
+    people: List[Person],
+    events: Sequence[Event],
+    owners: Sequence[int],
+    hosts: Sequence[int],
+    sizes: Sequence[int],
+    picks: Sequence[float],
+    first_days: Sequence[int]
+) -> None:
+    """Copy each host event to partners drawn from people started by its date."""
+    order = sorted(range(len(people)), key=first_days.__getitem__)
+    started = [first_days[i] for i in order]  # Ascending first-event days
+    changed = set()
+    p = 0  # Index into picks
+    
+    for host, size in zip(hosts, sizes):
+        event = events[host]
+        owner = owners[host]
+        pool = bisect.bisect_right(started, (event.date - START_DATE).days)
+        participants = [owner]
+        for pick in picks[p:p + size - 1]:
+            partner = order[int(pick * pool)]
+            if partner not in participants:  # Skip repeats rather than redraw
+                participants.append(partner)
+        p += size - 1
+        if len(participants) < 2:
+            continue
+        
+        ids = [people[i].person_id for i in participants]
+        event.associated_people = ids[1:]
+        for i, person_id in zip(participants[1:], ids[1:]):
+            person = people[i]
+            person.events.append(Event(
+                event_id=f"{person_id}_E{len(person.events)}",
+                date=event.date,
+                event_type=event.event_type,
+                outcome=event.outcome,
+                location=event.location,
+                associated_people=[other for other in ids if other != person_id],
+                category=event.category,
+            ))
+            changed.add(i)
+    
+    for i in changed:
+        people[i].events.sort(key=lambda e: e.date)  # Stable: copies follow same-day events
+
+
+def _next_event_type(
+    event_types: Sequence[str],
+    predecessors,
+    seen: set,
+    pick: float,
+    first: bool
+) -> str:
+    """Event type for the next event: the domain's first type, then any allowed one."""
+    if first:
+        return event_types[0]
+    allowed = [t for t in event_types if all(p in seen for p in predecessors.get(t, ()))]
+    return allowed[int(pick * len(allowed))]
@@ -3,10 +3,50 @@ Basic tests for PersonaTwin package.
 """
 
 import pytest
-from datetime import datetime
+import random
+import numpy as np
+from datetime import datetime, timedelta
 import personatwin as pt
 
 
+def _make_persona(i, age=None, gender=None, ethnicity=None, geography=None,
+                  event_types=None, merged_from=5):
+    """Build a persona for risk tests."""
+    return pt.Persona(
+        persona_id=f"PA{i}",
+        merged_from=merged_from,
+        demographics=pt.Demographics(
+            age=age, gender=gender, ethnicity=ethnicity, geography=geography
+        ),
+        event_patterns=pt.EventPatterns(event_types=list(event_types or [])),
+        privacy_metadata=pt.PrivacyMetadata(
+            traceability_score=0.1,
+            noise_level=0.0,
+            merge_count=merged_from,
+            generation_method="test"
+        ),
+    )
+
+
+def _random_personas(n, seed=0):
+    """Build a varied persona population with missing values."""
+    rng = random.Random(seed)
+    types = ["arrest", "charge", "trial", "sentencing", "release", "appeal"]
+    geographies = [None, "Test County", "Some City", "12 Main Street", "Region"]
+    return [
+        _make_persona(
+            i,
+            age=rng.choice([None, rng.randint(18, 80), rng.randint(18, 80)]),
+            gender=rng.choice([None, "Male", "Female"]),
+            ethnicity=rng.choice([None, "White", "Black", "Hispanic"]),
+            geography=rng.choice(geographies),
+            event_types=rng.sample(types, rng.randint(0, 4)),
+            merged_from=rng.randint(1, 10),
+        )
+        for i in range(n)
+    ]
+
+
 def test_demographics_creation():
     """Test Demographics model creation."""
     demo = pt.Demographics(
@@ -102,6 +142,51 @@ def test_people_merging():
     assert all(p.merged_from >= 1 for p in personas)
 
 
+def test_parallel_merging_is_deterministic():
+    """Process-pool persona construction matches the serial result."""
+    rng = random.Random(0)
+    people = [
+        pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(
+                age=rng.randint(20, 40),
+                gender=rng.choice(["Male", "Female"]),
+                ethnicity="White",
+                geography="Test County",
+            ),
+            events=[
+                pt.Event(
+                    event_id=f"E{i}_{j}",
+                    date=datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 900)),
+                    event_type=rng.choice(["arrest", "trial"]),
+                )
+                for j in range(3)
+            ],
+        )
+        for i in range(60)
+    ]
+    
+    serial = pt.PeopleMerging(seed=7).merge_similar_people(people)
+    parallel = pt.PeopleMerging(seed=7, workers=2, chunk_size=1).merge_similar_people(people)
+    
+    assert [p.persona_id for p in parallel] == [p.persona_id for p in serial]
+    assert [p.merged_person_ids for p in parallel] == [p.merged_person_ids for p in serial]
+    assert [[e.event_id for e in p.events] for p in parallel] == [
+        [e.event_id for e in p.events] for p in serial
+    ]
+    
+    # Spawned workers hash strings with their own seeds
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        spawned = pt.PeopleMerging(seed=7, executor=executor, chunk_size=1).merge_similar_people(
+            people
+        )
+    assert [p.event_patterns.event_types for p in spawned] == [
+        p.event_patterns.event_types for p in serial
+    ]
+
+
 def test_risk_calculation():
     """Test privacy risk calculation."""
     # Create sample personas
@@ -133,6 +218,1071 @@ def test_risk_calculation():
     assert metrics.k_anonymity == 5
 
 
+def test_indexed_risk_matches_exhaustive():
+    """Indexed risk engine gives the same scores as pairwise scoring."""
+    personas = _random_personas(300)
+    
+    exhaustive = pt.PopulationTraceability(
+        use_census_data=False, risk_engine=pt.RiskEngine.EXHAUSTIVE
+    ).calculate_population_risk(personas)
+    indexed = pt.PopulationTraceability(
+        use_census_data=False, risk_engine=pt.RiskEngine.INDEXED
+    ).calculate_population_risk(personas)
+    
+    assert indexed.individual_risks == exhaustive.individual_risks
+    assert indexed.population_average_risk == exhaustive.population_average_risk
+
+
+def test_vectorized_risk_matches_exhaustive():
+    """Columnar NumPy scoring gives the same per-persona risks."""
+    personas = _random_personas(300, seed=1)
+    
+    exhaustive = pt.PopulationTraceability(
+        use_census_data=False, risk_engine=pt.RiskEngine.EXHAUSTIVE
+    ).calculate_population_risk(personas)
+    vectorized = pt.PopulationTraceability(
+        use_census_data=False, risk_engine=pt.RiskEngine.VECTORIZED
+    ).calculate_population_risk(personas)
+    
+    assert vectorized.individual_risks == exhaustive.individual_risks
+    assert vectorized.external_linkage_risk == exhaustive.external_linkage_risk
+    assert vectorized.demographic_concentration_risk == exhaustive.demographic_concentration_risk
+    assert vectorized.event_pattern_concentration_risk == pytest.approx(
+        exhaustive.event_pattern_concentration_risk
+    )
+
+
+def test_vectorized_pattern_uniqueness_with_many_types():
+    """Subset counting agrees with pairwise comparison for wide and large patterns."""
+    rng = random.Random(3)
+    types = [f"event_{t}" for t in range(90)]
+    personas = [
+        _make_persona(
+            i,
+            age=30,
+            event_types=rng.sample(types[:20], rng.choice([1, 2, 3, 5, 14]))
+            + rng.sample(types[20:], rng.randint(0, 2)),
+            merged_from=rng.randint(1, 10),
+        )
+        for i in range(400)
+    ]
+    
+    exhaustive = pt.PopulationTraceability(
+        use_census_data=False, risk_engine=pt.RiskEngine.EXHAUSTIVE
+    ).calculate_population_risk(personas)
+    vectorized = pt.PopulationTraceability(
+        use_census_data=False, risk_engine=pt.RiskEngine.VECTORIZED
+    ).calculate_population_risk(personas)
+    
+    assert vectorized.individual_risks == exhaustive.individual_risks
+    assert vectorized.event_pattern_concentration_risk == pytest.approx(
+        exhaustive.event_pattern_concentration_risk
+    )
+
+
+def test_incremental_risk_tracker_matches_full_pass():
+    """Tracker updates agree with recomputing risk from scratch."""
+    from personatwin.privacy import IncrementalRiskTracker
+    
+    personas = _random_personas(200, seed=2)
+    calc = pt.PopulationTraceability(use_census_data=False)
+    tracker = IncrementalRiskTracker(calc)
+    tracker.reset(personas)
+    
+    # Generalize some demographics and change some event patterns
+    for persona in personas[::7]:
+        persona.demographics.age = None
+        persona.demographics.age_range = "30-39"
+        persona.demographics.geography = "Test County"
+    for persona in personas[::11]:
+        persona.event_patterns.event_types = ["arrest", "trial"]
+    tracker.mark_changed(range(0, len(personas), 7))
+    
+    updated = tracker.update(personas, changed=range(0, len(personas), 11))
+    expected = calc.calculate_population_risk(personas)
+    
+    assert updated.individual_risks == expected.individual_risks
+    assert updated.population_average_risk == expected.population_average_risk
+    assert updated.external_linkage_risk == expected.external_linkage_risk
+    assert updated.demographic_concentration_risk == pytest.approx(
+        expected.demographic_concentration_risk
+    )
+    assert updated.event_pattern_concentration_risk == pytest.approx(
+        expected.event_pattern_concentration_risk
+    )
+    
+    # Moving into an existing event-type set whose risk stays the same
+    few = _random_personas(4, seed=3)
+    for persona, types in zip(few, [["x", "y"], ["x", "y"], ["x", "y", "z"], ["x"]]):
+        persona.event_patterns.event_types = types
+    tracker.reset(few)
+    few[0].event_patterns.event_types = ["x", "y", "z"]
+    assert (
+        tracker.update(few, changed=[0]).individual_risks
+        == calc.calculate_population_risk(few).individual_risks
+    )
+    
+    # Emptied sets leave the index and its postings
+    few[3].event_patterns.event_types = ["x", "y"]
+    assert (
+        tracker.update(few, changed=[3]).individual_risks
+        == calc.calculate_population_risk(few).individual_risks
+    )
+    assert frozenset(["x"]) not in tracker._pattern_members
+    assert frozenset(["x"]) not in tracker._event_index.set_counts
+    assert tracker._event_index.sets_sharing(["x"]) == {
+        frozenset(["x", "y"]),
+        frozenset(["x", "y", "z"]),
+    }
+
+
+def test_blocked_event_grouping_matches_exhaustive():
+    """Blocked event grouping produces the same groups as the full scan."""
+    from personatwin.event_merging import IntelligentEventMerger
+    
+    rng = random.Random(0)
+    start = datetime(2020, 1, 1)
+    events = [
+        pt.Event(
+            event_id=f"E{i}",
+            date=start + timedelta(
+                days=rng.choice([rng.randint(0, 1500), rng.randint(0, 40) * 30]),
+                hours=rng.choice([0, 0, 5, 23]),
+            ),
+            event_type=rng.choice(["arrest", "charge", "trial"]),
+            outcome=rng.choice(["guilty", "dismissed", None]),
+            location=rng.choice(
+                ["A County", "A County, OH", "B County", "A County City", "X", None]
+            ),
+        )
+        for i in range(200)
+    ]
+    events.sort(key=lambda e: e.date)
+    
+    for threshold in [0.5, 0.6, 0.7, 0.8]:
+        exhaustive = IntelligentEventMerger(
+            pt.Domain.CRIMINAL_JUSTICE, blocked_grouping=False
+        )._group_similar_events(events, threshold)
+        blocked = IntelligentEventMerger(
+            pt.Domain.CRIMINAL_JUSTICE, blocked_grouping=True
+        )._group_similar_events(events, threshold)
+        assert [[e.event_id for e in g] for g in blocked] == [
+            [e.event_id for e in g] for g in exhaustive
+        ]
+
+
+def test_blocked_event_grouping_prunes_candidates():
+    """Blocked event grouping only scores blocks that can reach the threshold."""
+    from collections import Counter
+    from personatwin.event_merging import IntelligentEventMerger
+    
+    people = pt.generate_population(pt.Domain.CRIMINAL_JUSTICE, 100, events_per_person=5)
+    events = sorted((e for p in people for e in p.events), key=lambda e: e.date)
+    
+    merger = IntelligentEventMerger(pt.Domain.CRIMINAL_JUSTICE)
+    compared = Counter()
+    calculate = merger.similarity_calculator.calculate_similarity
+    
+    class CountingCalculator:
+        def calculate_similarity(self, event1, event2, domain):
+            compared[event1.event_id] += 1
+            return calculate(event1, event2, domain)
+    
+    merger.similarity_calculator = CountingCalculator()
+    blocked = merger._group_similar_events(events)
+    exhaustive = IntelligentEventMerger(
+        pt.Domain.CRIMINAL_JUSTICE, blocked_grouping=False
+    )._group_similar_events(events)
+    
+    assert [[e.event_id for e in g] for g in blocked] == [
+        [e.event_id for e in g] for g in exhaustive
+    ]
+    assert sum(compared.values()) < 2 * len(events)
+    assert all(compared[event.event_id] < max(i, 10) for i, event in enumerate(events))
+
+
+def test_dataframe_to_people_groups_event_rows():
+    """Event rows become one Person per person_id with parsed dates."""
+    import pandas as pd
+    from personatwin.api import _dataframe_to_people
+    
+    df = pd.DataFrame({
+        "person_id": ["B", "A", "B", "A", "C"],
+        "age": [40, 30, 41, 31, 50],
+        "gender": ["Female", "Male", "Female", "Male", None],
+        "event_id": ["E1", "E2", "E3", "E4", "E5"],
+        "date": ["2020-01-05", "2020-02-01", "2020-03-10", "2020-04-01", "2020-05-01"],
+        "event_type": ["arrest", "trial", "charge", "", "arrest"],
+    })
+    
+    people = _dataframe_to_people(df)
+    
+    assert [p.person_id for p in people] == ["A", "B", "C"]
+    assert people[0].demographics.age == 30
+    assert [e.event_id for e in people[0].events] == ["E2"]  # Empty event type skipped
+    assert [e.event_id for e in people[1].events] == ["E1", "E3"]
+    assert people[1].events[1].date == datetime(2020, 3, 10)
+    assert people[2].demographics.age == 50
+
+
+def test_stream_people_from_csv(tmp_path):
+    """Chunked CSV streaming yields complete people and feeds the pipeline."""
+    import pandas as pd
+    
+    rows = []
+    for i in range(30):
+        for j in range(i % 4 + 1):
+            rows.append({
+                "person_id": f"P{i:02d}",
+                "age": 30 + i % 5,
+                "gender": "Male",
+                "ethnicity": "White",
+                "geography": "Test County",
+                "event_id": f"E{i}_{j}",
+                "date": f"2020-0{j + 1}-01",
+                "event_type": "arrest",
+                "outcome": "guilty",
+            })
+    path = tmp_path / "events.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    
+    batches = list(pt.stream_people(str(path), chunksize=7))
+    people = [person for batch in batches for person in batch]
+    
+    assert len(batches) > 1
+    assert [p.person_id for p in people] == [f"P{i:02d}" for i in range(30)]
+    assert [len(p.events) for p in people] == [i % 4 + 1 for i in range(30)]
+    
+    # A person whose rows come back after being yielded is an error, not a second person
+    shuffled = tmp_path / "shuffled.csv"
+    pd.DataFrame(rows + rows[:1]).to_csv(shuffled, index=False)
+    with pytest.raises(ValueError, match="P00"):
+        list(pt.stream_people(str(shuffled), chunksize=7))
+    
+    result = pt.create_safe_personas_from_file(
+        str(path), use_census_data=False, chunksize=7
+    )
+    assert result.personas
+
+
+def test_event_store_round_trips_events():
+    """Test that the compact event store reads back the events it was given."""
+    import pickle
+    
+    events = [
+        pt.Event(
+            event_id=f"E{i}",
+            date=datetime(2020, 1, 1 + i, 14 if i == 2 else 0),
+            event_type="arrest" if i % 2 else "trial",
+            outcome="guilty" if i % 3 else None,
+            details={"charge": "theft"} if i == 1 else {},
+            location="County A",
+        )
+        for i in range(6)
+    ]
+    store = pt.EventStore(events)
+    
+    assert len(store) == 6
+    assert list(store) == events
+    assert all(isinstance(e, pt.Event) for e in store)
+    assert store[2].date == datetime(2020, 1, 3, 14)
+    
+    # Writes through a view land in the store
+    store[0].details["note"] = "x"
+    store[3].outcome = "dismissed"
+    assert store[0].details == {"note": "x"}
+    assert store[3].outcome == "dismissed"
+    
+    store.append(events[0])
+    del store[1]
+    assert [e.event_id for e in store] == ["E0", "E2", "E3", "E4", "E5", "E0"]
+    
+    # Insertion and deletion shift the columns and side tables in place
+    expected = store.to_events()
+    store.insert(1, events[1])
+    expected.insert(1, events[1])
+    del store[3:5]
+    del expected[3:5]
+    store[0:1] = [events[2], events[3]]
+    expected[0:1] = [events[2], events[3]]
+    assert store == expected and store[2].details == {"charge": "theft"}
+    
+    # Stores of one run share a vocabulary; pickling keeps it shared
+    vocabulary = pt.event_store.Interner()
+    first, second = pt.EventStore(events[:3], vocabulary), pt.EventStore(events[3:], vocabulary)
+    assert first.codes("location")[0] == second.codes("location")[0]
+    copies = pickle.loads(pickle.dumps([first, second]))
+    assert copies[0].vocabulary is copies[1].vocabulary and list(copies[1]) == events[3:]
+
+
+def test_fused_noise_matches_chained_noise():
+    """Test that the single-pass noise transform reproduces the chained one."""
+    events = [
+        pt.Event(
+            event_id=f"E{i}",
+            date=datetime(2020, 1, 1) + timedelta(days=3 * i),
+            event_type="arrest",
+            outcome=["guilty", "dismissed"][i % 2],
+            location="123 Main St, City, County, State",
+        )
+        for i in range(50)
+    ]
+    outcomes = ["guilty", "dismissed", "acquitted"]
+    noise_gen = pt.EventNoiseGeneration(privacy_level=pt.PrivacyLevel.MAXIMUM)
+    
+    random.seed(7)
+    chained = noise_gen.generalize_temporal_precision(
+        noise_gen.generalize_locations(
+            noise_gen.add_outcome_noise(noise_gen.add_temporal_noise(events), outcomes)
+        ),
+        precision="week",
+    )
+    
+    random.seed(7)
+    fused = noise_gen.apply_noise(events, outcomes, precision="week")
+    assert fused == chained
+    
+    random.seed(7)
+    in_place = noise_gen.apply_noise(list(events), outcomes, precision="week", in_place=True)
+    assert in_place == chained
+    assert in_place[0] is events[0]
+
+
+def test_vectorized_temporal_noise():
+    """Test the day-array noise and truncation against the per-event versions."""
+    from personatwin.noise import temporal_noise_days, truncate_days
+    
+    lengths = [4, 0, 6, 1]
+    days = [737000 + 2 * i for i in range(sum(lengths))]
+    noised = temporal_noise_days(days, lengths, 30, np.random.default_rng(3))
+    
+    # Each persona's events stay strictly ordered
+    start = 0
+    for length in lengths:
+        segment = noised[start:start + length]
+        assert all(b > a for a, b in zip(segment, segment[1:]))
+        start += length
+    
+    noise_gen = pt.EventNoiseGeneration()
+    for precision in ("day", "week", "month", "quarter", "year"):
+        expected = [
+            noise_gen._truncate_date(datetime.fromordinal(d), precision).toordinal()
+            for d in range(736900, 737400)
+        ]
+        assert truncate_days(list(range(736900, 737400)), precision).tolist() == expected
+
+
+def test_mondrian_grouping_guarantees_min_group_size():
+    """Test that Mondrian grouping covers everyone in groups of at least k."""
+    rng = random.Random(11)
+    people = [
+        pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(
+                age=rng.choice([None, 19, 25, 33, 47, 61]),
+                gender=rng.choice(["M", "F", None]),
+                ethnicity=rng.choice(["A", "B", "C"]),
+                geography=f"County{rng.randint(0, 40)}, ST",
+            ),
+        )
+        for i in range(500)
+    ]
+    merger = pt.PeopleMerging(
+        min_group_size=7,
+        grouping_strategy=pt.GroupingStrategy.MONDRIAN,
+    )
+    groups = merger._group_by_similarity(people, 0.7)
+    
+    assert all(7 <= len(group) <= merger.criteria["maximum_group_size"] for group in groups)
+    assert sorted(p.person_id for group in groups for p in group) == sorted(
+        p.person_id for p in people
+    )
+
+
+def test_stragglers_join_most_similar_group():
+    """Test that people left in undersized groups join the closest group."""
+    def person(i, age, gender, ethnicity, geography):
+        return pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(
+                age=age, gender=gender, ethnicity=ethnicity, geography=geography
+            ),
+        )
+    
+    people = [person(i, 30, "M", "A", "County1, ST") for i in range(5)]
+    people += [person(5 + i, 60, "F", "B", "County2, ST") for i in range(5)]
+    people.append(person(10, 55, "F", "B", "County2, ST"))
+    
+    groups = pt.PeopleMerging()._group_by_similarity(people, 0.7)
+    
+    assert [len(group) for group in groups] == [5, 6]
+    assert groups[1][-1].person_id == "P10"
+
+
+def test_similarity_matrix_matches_scalar_similarity():
+    """Test that batched similarity scores equal calculate_similarity exactly."""
+    rng = random.Random(5)
+    people = [
+        pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(
+                age=rng.choice([None, 19, 33, 33.5, 70]),
+                gender=rng.choice([None, "M", "F"]),
+                ethnicity=rng.choice([None, "A", "B"]),
+                geography=rng.choice([None, "King, WA", "king , OR", "Pierce"]),
+            ),
+        )
+        for i in range(60)
+    ]
+    merger = pt.PeopleMerging()
+    
+    matrix = merger.similarity_matrix(people)
+    for i, person in enumerate(people):
+        for j, other in enumerate(people):
+            assert matrix[i, j] == merger.calculate_similarity(person, other)
+    
+    indices, scores = merger.top_k_similar(people, k=3, chunk_size=100)
+    assert indices.shape == (60, 3)
+    for i in range(60):
+        assert i not in indices[i]
+        expected = sorted((matrix[i, j] for j in range(60) if j != i), reverse=True)[:3]
+        assert scores[i].tolist() == expected
+
+
+def test_merge_tree_coalesces_to_larger_k():
+    """Test that the merge tree raises k by combining sibling personas."""
+    rng = random.Random(4)
+    people = [
+        pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(
+                age=rng.randint(18, 80),
+                gender=rng.choice(["M", "F"]),
+                ethnicity=rng.choice(["A", "B"]),
+                geography=f"County{rng.randint(0, 5)}, ST",
+            ),
+            events=[pt.Event(f"E{i}", datetime(2020, 1, 1) + timedelta(days=i), "arrest")],
+        )
+        for i in range(300)
+    ]
+    merger = pt.PeopleMerging(grouping_strategy=pt.GroupingStrategy.MONDRIAN)
+    personas = merger.merge_similar_people(people)
+    
+    tree = pt.MergeTree(merger, personas)
+    coalesced = tree.coalesce(20)
+    
+    assert all(p.merged_from >= 20 for p in coalesced)
+    assert sum(p.merged_from for p in coalesced) == 300
+    assert sorted(pid for p in coalesced for pid in p.merged_person_ids) == sorted(
+        p.person_id for p in people
+    )
+    assert tree.holds(coalesced)
+    
+    # Pooled events are merged again, as a re-merge of the member personas would be
+    owner = {pid: p for p in personas for pid in p.merged_person_ids}
+    for persona in coalesced:
+        members = list({id(owner[pid]): owner[pid] for pid in persona.merged_person_ids}.values())
+        if len(members) == 1:
+            assert persona is members[0]
+            continue
+        remerged = merger.event_merger.merge_events(members)
+        assert len(persona.events) == len(remerged) < sum(len(p.events) for p in members)
+        assert [(e.date, e.event_type, e.outcome) for e in persona.events] == [
+            (e.date, e.event_type, e.outcome) for e in remerged
+        ]
+        assert persona.event_patterns == merger._extract_event_patterns(remerged)
+    
+    # Combined demographics weigh each persona by the people it stands for
+    small = _make_persona(0, age=20, gender="M", ethnicity="A", geography="X", merged_from=2)
+    large = _make_persona(1, age=50, gender="F", ethnicity="B", geography="Y", merged_from=8)
+    combined = tree._combine([small, large], 0, [], {})
+    assert combined.merged_from == 10 and combined.demographics.age == 44
+    assert (
+        combined.demographics.gender,
+        combined.demographics.ethnicity,
+        combined.demographics.geography,
+    ) == ("F", "B", "Y")
+
+
+def test_aggregation_helpers():
+    """Test mode tie-breaking, selection medians and batch outcome shares."""
+    from personatwin.aggregation import mode, median_high, outcome_distributions
+    
+    assert mode(["b", "a", "a", "b", "c"]) == "b"  # First seen among ties
+    assert mode([], default="none") == "none"
+    assert mode(["a", "b", "a"], weights=[1, 5, 1]) == "b"
+    
+    rng = random.Random(8)
+    dates = [datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 900)) for _ in range(1001)]
+    assert median_high(dates) == sorted(dates)[500]
+    
+    def events(*outcomes):
+        return [
+            pt.Event(f"E{i}", datetime(2020, 1, 1), "t", outcome)
+            for i, outcome in enumerate(outcomes)
+        ]
+    
+    assert outcome_distributions([events("a", None, "a", "b"), [], events("b")]) == [
+        {"a": 0.5, "unknown": 0.25, "b": 0.25},
+        {},
+        {"b": 1.0},
+    ]
+
+
+
+def test_sequence_validation_inserts_predecessors_and_closures():
+    """Test one-pass rule validation of event sequences."""
+    from personatwin.event_merging import IntelligentEventMerger
+    
+    merger = IntelligentEventMerger(pt.Domain.HEALTHCARE)
+    start = datetime(2021, 1, 1)
+    events = [
+        pt.Event("E1", start, "treatment"),
+        pt.Event("E2", start + timedelta(days=100), "admission"),
+        pt.Event("E3", start + timedelta(days=200), "admission"),
+        pt.Event("E4", start + timedelta(days=300), "discharge"),
+        pt.Event("E5", start + timedelta(days=400), "admission"),
+    ]
+    
+    validated = merger._validate_and_fix_sequence(events)
+    
+    assert [e.event_type for e in validated] == [
+        "diagnosis", "treatment", "admission", "discharge", "admission",
+        "discharge", "admission", "discharge",
+    ]
+    synthetic = [e for e in validated if e.details.get("_synthetic")]
+    assert [e.details["_reason"] for e in synthetic] == [
+        "Required before treatment",
+        "Closing previous admission",
+        "Closing open admission",
+    ]
+    assert validated == sorted(validated, key=lambda e: e.date)
+
+
+def test_assigned_rules_are_applied():
+    """Test that rules assigned after construction drive sequence validation."""
+    import pickle
+    from personatwin.event_merging import IntelligentEventMerger, EventSequenceRule
+    
+    merger = IntelligentEventMerger(pt.Domain.CUSTOM)
+    events = [pt.Event("E1", datetime(2021, 1, 1), "b")]
+    assert [e.event_type for e in merger._validate_and_fix_sequence(events)] == ["b"]
+    
+    merger.rules = {
+        "a": EventSequenceRule("a"),
+        "b": EventSequenceRule("b", must_follow=["a"]),
+    }
+    validated = merger._validate_and_fix_sequence(events)
+    assert [e.event_type for e in validated] == ["a", "b"]
+    assert validated[0].details["_reason"] == "Required before b"
+    
+    restored = pickle.loads(pickle.dumps(merger))
+    assert [e.event_type for e in restored._validate_and_fix_sequence(events)] == ["a", "b"]
+
+
+def test_compiled_domain_config_is_cached_and_picklable():
+    """Test frozen domain configurations shared through the process cache."""
+    import pickle
+    from personatwin.event_merging import (
+        IntelligentEventMerger, DomainEventRules, EventSequenceRule
+    )
+    
+    compiled = pt.get_compiled_domain_config(pt.Domain.HEALTHCARE)
+    assert compiled is pt.HEALTHCARE_CONFIG.compiled()
+    assert pickle.loads(pickle.dumps(compiled)) is compiled
+    assert compiled.is_valid_event_type("admission")
+    assert not compiled.is_valid_event_type("arrest")
+    assert compiled.event_type_codes["admission"] == 0
+    
+    custom = pt.create_custom_config(["a", "b"], [], set(), set()).compiled()
+    assert custom.event_types == frozenset({"a", "b"})
+    assert custom.is_valid_outcome("anything")  # No outcome restrictions
+    
+    merger = IntelligentEventMerger(pt.Domain.HEALTHCARE)
+    assert pickle.loads(pickle.dumps(merger)).compiled_rules is merger.compiled_rules
+    assert merger.rules == IntelligentEventMerger(pt.Domain.HEALTHCARE).rules
+    assert merger.compiled_rules.ruled_types == frozenset(merger.rules)
+    with pytest.raises(AttributeError):
+        merger.rules["admission"].closure_event_type = "transfer"  # Shared rules are frozen
+    
+    # Each merger edits its own rules in place, recompiling them
+    merger.rules["scan"] = EventSequenceRule("scan", must_follow=["admission"])
+    assert merger.compiled_rules.predecessors["scan"] == ("admission",)
+    assert "scan" not in IntelligentEventMerger(pt.Domain.HEALTHCARE).rules
+    copy = pickle.loads(pickle.dumps(merger))
+    del copy.rules["scan"]
+    assert (
+        "scan" not in copy.compiled_rules.ruled_types
+        and "scan" in merger.compiled_rules.ruled_types
+    )
+    
+    merger.rules = DomainEventRules.get_rules(pt.Domain.HEALTHCARE)
+    assert merger.compiled_rules is DomainEventRules.get_compiled_rules(pt.Domain.HEALTHCARE)
+
+
+def test_random_streams_are_keyed_and_reproducible():
+    """Test keyed random streams and stream-driven noise."""
+    streams = pt.RandomStreams(seed=11)
+    
+    def draws(*key):
+        return streams.generator("noise", *key).integers(1000, size=8).tolist()
+    
+    replayed = pt.RandomStreams(seed=11).generator("noise", 0, "persona-a")
+    assert draws(0, "persona-a") == replayed.integers(1000, size=8).tolist()
+    assert draws(0, "persona-a") != draws(0, "persona-b")
+    assert draws(0, "persona-a") != draws(1, "persona-a")
+    assert draws(1) != draws("1")
+    
+    events = [
+        pt.Event(f"E{i}", datetime(2020, 1, 1) + timedelta(days=40 * i), "arrest", outcome="guilty")
+        for i in range(10)
+    ]
+    noise_gen = pt.EventNoiseGeneration(privacy_level=pt.PrivacyLevel.HIGH)
+    
+    def noised():
+        rng = streams.generator("noise", 0, "persona-a")
+        return [
+            (e.date, e.outcome)
+            for e in noise_gen.apply_noise(events, valid_outcomes=["guilty", "dismissed"], rng=rng)
+        ]
+    
+    first = noised()
+    random.seed(99)  # The global random module plays no part
+    assert noised() == first
+    assert [d for d, _ in first] == sorted(d for d, _ in first)
+    
+    # Vectorized noise: each persona's draws depend on its own stream only
+    def batch(keys):
+        return noise_gen.add_noise_to_event_batch(
+            [events] * len(keys), valid_outcomes=["guilty", "dismissed"],
+            rngs=[streams.generator("noise", 0, key) for key in keys]
+        )
+    
+    assert batch(["persona-a", "persona-b"])[1] == batch(["persona-b"])[0]
+    assert batch(["persona-a", "persona-b"])[0] != batch(["persona-a", "persona-b"])[1]
+    
+    # Identical partitions are merged into differently keyed personas and noised apart
+    people = [
+        pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(age=30),
+            events=[
+                pt.Event(
+                    f"P{i}_E{j}",
+                    datetime(2020, 1, 1) + timedelta(days=45 * j),
+                    "arrest",
+                    outcome="guilty",
+                )
+                for j in range(20)
+            ],
+        )
+        for i in range(4)
+    ]
+    config = pt.ProcessingConfig(use_census_data=False, vectorized_noise=True, random_seed=3)
+    result = pt.PersonaTwinPipeline(config).process_partitions(
+        [people, people], target_risk_level=1.0
+    )
+    assert result.iterations == 0 and len(result.personas) == 2
+    first_dates, second_dates = ([e.date for e in p.events] for p in result.personas)
+    assert first_dates != second_dates
+
+
+def test_pipeline_stage_profiling(tmp_path):
+    """Test stage timings on ProcessingResult and the file sinks."""
+    import json
+    
+    rng = random.Random(4)
+    people = [
+        pt.Person(
+            person_id=f"P{i}",
+            demographics=pt.Demographics(
+                age=rng.randint(20, 60), gender=rng.choice(["Male", "Female"])
+            ),
+            events=[pt.Event(f"E{i}", datetime(2020, 1, 1) + timedelta(days=i), "arrest")],
+        )
+        for i in range(50)
+    ]
+    config = pt.ProcessingConfig(
+        random_seed=1,
+        use_census_data=False,
+        profile_sinks=[
+            pt.JSONFileSink(str(tmp_path / "profile.json")),
+            pt.PrometheusTextfileSink(str(tmp_path / "profile.prom")),
+        ],
+    )
+    
+    result = pt.PersonaTwinPipeline(config).process_dataset(people)
+    
+    stages = {timing.stage: timing for timing in result.profile.stages if timing.iteration == 0}
+    expected = {"validation", "grouping", "event_merging", "merging", "noise", "risk_scoring"}
+    assert expected <= set(stages)
+    assert stages["validation"].items == 50
+    assert stages["grouping"].parent == "merging"
+    assert all(timing.wall_seconds >= 0 for timing in result.profile.stages)
+    
+    written = json.loads((tmp_path / "profile.json").read_text())
+    assert len(written["stages"]) == len(result.profile.stages)
+    assert (
+        'personatwin_stage_wall_seconds{stage="noise",iteration="0"}'
+        in (tmp_path / "profile.prom").read_text()
+    )
+    
+    # Disabled by default
+    assert (
+        pt.PersonaTwinPipeline(pt.ProcessingConfig(use_census_data=False))
+        .process_dataset(people)
+        .profile
+        is None
+    )
+    
+    # Sinks must implement emit
+    from personatwin.profiling import ProfileSink
+    
+    class IncompleteSink(ProfileSink):
+        pass
+    
+    with pytest.raises(TypeError):
+        IncompleteSink()
+
+
+def test_synthetic_population_is_reproducible():
+    """Test the synthetic population generator used by the benchmarks."""
+    people = pt.generate_population(pt.Domain.HEALTHCARE, 300, events_per_person=4, seed=5)
+    again = pt.generate_population(pt.Domain.HEALTHCARE, 300, events_per_person=4, seed=5)
+    
+    assert len(people) == 300
+    assert [[e.event_id for e in p.events] for p in people] == [
+        [e.event_id for e in p.events] for p in again
+    ]
+    assert [p.demographics for p in people] == [p.demographics for p in again]
+    
+    events = [e for p in people for e in p.events]
+    assert 3 < len(events) / len(people) < 5
+    assert all(pt.HEALTHCARE_CONFIG.is_valid_event_type(e.event_type) for e in events)
+    assert all(p.events[0].event_type == "admission" for p in people)
+    assert all(
+        [e.date for e in p.events] == sorted(e.date for e in p.events) for p in people
+    )
+    
+    # Shared events are copied to their partners, so they are found by key
+    from personatwin.social_network import SocialNetworkBuilder
+    shared = SocialNetworkBuilder().find_shared_events(people)
+    assert len(shared) > 5
+    assert max(len(event.participants) for event in shared) > 2
+    owners = {e.event_id: p.person_id for p in people for e in p.events}
+    for event in shared:
+        copies = [e for p in people for e in p.events if e.event_id in event.event_ids]
+        assert {owners[e.event_id] for e in copies} == set(event.participants)
+        assert all(
+            sorted(e.associated_people + [owners[e.event_id]]) == sorted(event.participants)
+            for e in copies
+        )
+    
+    # Strong skew puts most people in the largest county
+    skewed = pt.generate_population(pt.Domain.EDUCATION, 300, geography_skew=3.0, seed=5)
+    largest = max(
+        sum(p.demographics.geography == g for p in skewed)
+        for g in {p.demographics.geography for p in skewed}
+    )
+    assert largest > 200
+
+def test_social_graph_matches_connection_list():
+    """Test the CSR social graph against the connection list it was built from."""
+    from personatwin.social_network import SocialNetworkBuilder, SocialNetworkAnalyzer
+    
+    # An empty network has no metrics and no stored connections
+    assert SocialNetworkAnalyzer().calculate_network_metrics([]) == {}
+    assert len(SocialNetworkBuilder().connections) == 0
+    assert pt.SocialGraph.from_connections([]).num_edges == 0
+    
+    C = pt.SocialConnection
+    connections = [
+        C("b", "a", pt.ConnectionType.FAMILY, pt.ConnectionStrength.STRONG, "Family", ["E1"], 0.9),
+        C("b", "c", pt.ConnectionType.FRIEND, pt.ConnectionStrength.WEAK, None, [], 0.5),
+        C("a", "c", pt.ConnectionType.FRIEND, pt.ConnectionStrength.WEAK, None, [], 0.8),
+        C("c", "b", pt.ConnectionType.COWORKER, pt.ConnectionStrength.MODERATE, "Work", [], 0.7),
+        C("d", "e", pt.ConnectionType.NEIGHBOR, pt.ConnectionStrength.WEAK, None, [], 0.4),
+    ]
+    graph = pt.SocialGraph.from_connections(connections)
+    
+    assert graph.num_nodes == 5 and graph.num_edges == 4 and graph.num_records == 5
+    # Repeated pairs keep the latest record, like a dict keyed by pair
+    latest = graph.get("b", "c")
+    assert (latest.connection_type, latest.context, latest.confidence) == (
+        pt.ConnectionType.COWORKER,
+        "Work",
+        0.7,
+    )
+    assert graph.get("a", "b").shared_events == ["E1"]
+    assert graph.get("a", "e") is None
+    assert sorted(graph.keys()) == sorted(c.get_connection_key() for c in graph)
+    
+    analyzer = SocialNetworkAnalyzer()
+    metrics = analyzer.calculate_network_metrics(graph)
+    assert metrics == analyzer.calculate_network_metrics(connections)
+    assert metrics["num_edges"] == 5 and metrics["largest_component_size"] == 3
+    assert metrics["num_components"] == 2 and metrics["clustering_coefficient"] == 1.0
+    assert metrics["average_degree"] == 8 / 5
+    
+    builder = SocialNetworkBuilder(min_connection_confidence=0.6)
+    circles = builder.detect_social_circles([], graph)
+    assert [circle.members for circle in circles] == [{"a", "b", "c"}]
+
+
+def test_union_find_circles_follow_stored_connections():
+    """Test incremental component tracking for social circles."""
+    from personatwin.graph import UnionFind
+    from personatwin.social_network import SocialNetworkBuilder
+    
+    components = UnionFind()
+    assert components.union(0, 1) and components.union(3, 4)
+    assert not components.union(1, 0)
+    assert components.find(0) == components.find(1) != components.find(3)
+    assert [c.tolist() for c in components.components()] == [[0, 1], [2], [3, 4]]
+    assert [c.tolist() for c in components.components(min_size=2)] == [[0, 1], [3, 4]]
+    
+    def link(a, b, confidence=0.9):
+        return pt.SocialConnection(
+            a, b, pt.ConnectionType.FRIEND, pt.ConnectionStrength.WEAK, confidence=confidence
+        )
+    
+    builder = SocialNetworkBuilder(min_connection_confidence=0.6)
+    builder.store_connections([link("a", "b"), link("c", "d"), link("d", "e", 0.3)])
+    assert [c.members for c in builder.detect_social_circles([])] == [{"a", "b"}, {"c", "d"}]
+    
+    # New connections join existing circles without rebuilding
+    builder.store_connections([link("b", "c")])
+    assert [c.members for c in builder.detect_social_circles([])] == [{"a", "b", "c", "d"}]
+    assert [
+        c.members for c in builder.detect_social_circles([], list(builder.connections.values()))
+    ] == [{"a", "b", "c", "d"}]
+    
+    # A pair stored again with lower confidence stays linked: any record counts,
+    # while the connection map shows the latest record
+    builder.store_connections([link("a", "f"), link("a", "f", 0.5)])
+    assert builder.connections[("a", "f")].confidence == 0.5
+    assert [c.members for c in builder.detect_social_circles([])] == [{"a", "b", "c", "d", "f"}]
+    assert [c.members for c in builder.detect_social_circles([], builder.graph)] == [
+        {"a", "b", "c", "d", "f"}
+    ]
+
+
+def test_triangle_counting_clustering():
+    """Test triangle counts and local clustering on a hub with a closed wedge."""
+    from personatwin.graph import CSRGraph, count_triangles
+    
+    # Hub 0 linked to 1..4; 1-2 and 2-3 linked; 5-6 a separate pair
+    sources = np.array([0, 0, 0, 0, 1, 2, 5])
+    targets = np.array([1, 2, 3, 4, 2, 3, 6])
+    assert count_triangles(7, sources, targets).tolist() == [2, 1, 2, 1, 0, 0, 0]
+    
+    graph = CSRGraph(7, sources, targets)
+    assert np.allclose(graph.local_clustering(), [2 / 6, 1.0, 2 / 3, 1.0, 0, 0, 0])
+    assert graph.local_clustering() is graph.local_clustering()
+    
+    names = "abcdefg"
+    social = pt.SocialGraph.from_connections(
+        pt.SocialConnection(
+            names[u], names[v], pt.ConnectionType.FRIEND, pt.ConnectionStrength.WEAK
+        )
+        for u, v in zip(sources.tolist(), targets.tolist())
+    )
+    metrics = pt.SocialNetworkAnalyzer().calculate_network_metrics(social)
+    assert metrics["clustering_coefficient"] == pytest.approx((2 / 6 + 1 + 2 / 3 + 1) / 4)
+    assert social.local_clustering()[social.node_index["a"]] == pytest.approx(2 / 6)
+
+
+def test_pattern_generators_sample_distinct_neighbors():
+    """Test the index-sampling network pattern generators."""
+    from collections import Counter
+    from personatwin.rng import sample_indices
+    from personatwin.social_network import SocialNetworkBuilder
+    
+    rng = np.random.default_rng(0)
+    counts = np.array([3, 0, 9, 1])
+    drawn = sample_indices(rng, counts, 10, exclude=np.array([0, 1, 2, 3]))
+    for i, part in enumerate(np.split(drawn, np.cumsum(counts)[:-1])):
+        assert len(set(part.tolist())) == counts[i] and i not in part and part.max(initial=0) < 10
+    with pytest.raises(ValueError):
+        sample_indices(rng, np.array([10]), 10, exclude=np.array([0]))
+    
+    people = pt.generate_population(pt.Domain.EDUCATION, 400, seed=2)
+    for pattern in ("small_world", "community", "hierarchical"):
+        connections = SocialNetworkBuilder(random_seed=4).integrate_external_network_patterns(
+            people, pattern
+        )
+        again = SocialNetworkBuilder(random_seed=4).integrate_external_network_patterns(
+            people, pattern
+        )
+        assert connections and [c.get_connection_key() for c in connections] == [
+            c.get_connection_key() for c in again
+        ]
+        assert all(c.person1_id != c.person2_id for c in connections)
+    
+    # 2-5 connections per person, 10-20 for about a fifth (hubs)
+    small_world = SocialNetworkBuilder(random_seed=4).integrate_external_network_patterns(
+        people, "small_world"
+    )
+    assert (
+        400 * (0.8 * 3.5 + 0.2 * 15) * 0.8 < len(small_world) < 400 * (0.8 * 3.5 + 0.2 * 15) * 1.2
+    )
+    
+    # Exactly 5 distinct others per person in large enough communities
+    by_geo = Counter(p.demographics.geography for p in people)
+    community = SocialNetworkBuilder(random_seed=4).integrate_external_network_patterns(
+        people, "community"
+    )
+    assert len(community) == sum(size * min(5, size - 1) for size in by_geo.values() if size >= 3)
+    
+    # Too few people for anyone's connection count
+    assert (
+        SocialNetworkBuilder(random_seed=4).integrate_external_network_patterns(
+            people[:2], "small_world"
+        )
+        == []
+    )
+
+
+def test_shared_events_are_hyperedges():
+    """Test compressed shared-event extraction, anonymization and metrics."""
+    from personatwin.social_network import (
+        SocialNetworkBuilder,
+        SocialNetworkAnalyzer,
+        add_social_network,
+    )
+    
+    day = datetime(2021, 3, 1)
+    people = [
+        pt.Person(
+            person_id=f"S{i}",
+            demographics=pt.Demographics(age=30),
+            events=[
+                pt.Event(event_id=f"S{i}_E", date=day, event_type="arrest", location="Main St")
+            ],
+        )
+        for i in range(6)
+    ]
+    builder = SocialNetworkBuilder(use_external_patterns=False, max_shared_event_pairs=None)
+    connections = builder.extract_connections(people)
+    (event,) = builder.shared_events
+    assert event.participants == [f"S{i}" for i in range(6)] and event.num_pairs == 15
+    assert [c.get_connection_key() for c in connections] == [
+        c.get_connection_key() for c in event.pairs()
+    ]
+    assert connections[0].shared_events == ["S0_E", "S1_E"]
+    assert connections[0].connection_type == pt.ConnectionType.CODEFENDANT
+    
+    # Above the cap: a sample of distinct pairs, but one circle for everyone
+    capped = SocialNetworkBuilder(
+        use_external_patterns=False, max_shared_event_pairs=4, random_seed=1
+    )
+    sampled = capped.extract_connections(people)
+    assert len({c.get_connection_key() for c in sampled}) == 4
+    assert [circle.members for circle in capped.detect_social_circles(people)] == [
+        set(event.participants)
+    ]
+    
+    # Metrics on the compressed form match the expanded pairs
+    analyzer = SocialNetworkAnalyzer()
+    assert analyzer.calculate_network_metrics([]) == {}
+    expected = analyzer.calculate_network_metrics(connections)
+    assert analyzer.calculate_network_metrics([], shared_events=[event]) == expected
+    
+    # Anonymized per persona, without expansion
+    personas = []
+    for i in range(0, 6, 2):
+        persona = _make_persona(i)
+        persona.merged_person_ids = [f"S{i}", f"S{i + 1}"]
+        personas.append(persona)
+    (anonymized,) = builder.anonymize_shared_events([event], personas)
+    assert (
+        anonymized.participants == ["PA0", "PA0", "PA2", "PA2", "PA4", "PA4"]
+        and anonymized.date is None
+    )
+    expanded = builder.anonymize_network(connections, personas)
+    assert sorted(c.get_connection_key() for c in anonymized.pairs()) == sorted(
+        c.get_connection_key() for c in expanded
+    )
+    assert analyzer.calculate_network_metrics([], shared_events=[anonymized]) == (
+        analyzer.calculate_network_metrics(expanded)
+    )
+    assert analyzer.assess_privacy_risk_from_network([], personas, shared_events=[anonymized]) == (
+        analyzer.assess_privacy_risk_from_network(expanded, personas)
+    )
+    
+    # add_social_network assesses large events in full, as the expanded pairs
+    crowd = [
+        pt.Person(
+            person_id=f"C{i}",
+            demographics=pt.Demographics(age=30),
+            events=[
+                pt.Event(event_id=f"C{i}_E", date=day, event_type="arrest", location="Main St")
+            ],
+        )
+        for i in range(300)
+    ]
+    crowd_personas = []
+    for i in range(0, 300, 3):
+        persona = _make_persona(i)
+        persona.merged_person_ids = [f"C{i + j}" for j in range(3)]
+        crowd_personas.append(persona)
+    uncapped = SocialNetworkBuilder(use_external_patterns=False, max_shared_event_pairs=None)
+    baseline = uncapped.anonymize_network(uncapped.extract_connections(crowd), crowd_personas)
+    connections, risk = add_social_network(
+        crowd, crowd_personas, use_external_patterns=False, max_shared_event_pairs=None
+    )
+    assert len(connections) == len(baseline) == 300 * 299 // 2 - 300
+    assert risk == analyzer.assess_privacy_risk_from_network(baseline, crowd_personas)
+    
+    # ...and returns a bounded sample of their pairs, not one connection per pair
+    sampled, sampled_risk = add_social_network(
+        crowd, crowd_personas, use_external_patterns=False, max_shared_event_pairs=500
+    )
+    assert 0 < len(sampled) <= 500 and sampled_risk == risk
+
+
+def test_overlapping_shared_events_match_expanded_pairs():
+    """Test clique metrics of overlapping shared events against their expanded pairs."""
+    from personatwin.social_network import SharedEvent, SocialGraph, SocialNetworkAnalyzer
+    
+    rng = np.random.default_rng(5)
+    ids = [f"P{i}" for i in range(40)]
+    events = [
+        SharedEvent("arrest", None, None, participants=[ids[i] for i in rng.integers(0, 40, size)])
+        for size in (25, 12, 12, 6, 3, 2)
+    ]
+    events[4].confidence = 0.5
+    connections = [
+        pt.SocialConnection(ids[u], ids[v], pt.ConnectionType.FAMILY, pt.ConnectionStrength.STRONG)
+        for u, v in rng.integers(0, 40, (30, 2)).tolist()
+    ]
+    expanded = connections + [pair for event in events for pair in event.pairs()]
+    
+    compressed = SocialGraph.from_connections(connections, events)
+    baseline = SocialGraph.from_connections(expanded)
+    assert (
+        compressed.num_nodes == baseline.num_nodes
+        and compressed.num_records == baseline.num_records
+    )
+    order = [baseline.node_index[node_id] for node_id in compressed.node_ids]
+    assert np.array_equal(compressed.record_degrees(), baseline.record_degrees()[order])
+    for threshold in (None, 0.7):
+        cliques, pairs = compressed.adjacency(threshold), baseline.adjacency(threshold)
+        assert np.array_equal(cliques.degrees, pairs.degrees[order])
+        assert np.array_equal(cliques.triangles(), pairs.triangles()[order])
+        assert np.allclose(cliques.local_clustering(), pairs.local_clustering()[order])
+    
+    analyzer = SocialNetworkAnalyzer()
+    metrics = analyzer.calculate_network_metrics(connections, shared_events=events)
+    assert metrics == pytest.approx(analyzer.calculate_network_metrics(expanded))
+    
+    # One large event over merged personas: closed form, no expansion
+    crowd = SharedEvent("arrest", None, None, participants=[f"PA{i // 2}" for i in range(2000)])
+    metrics = analyzer.calculate_network_metrics([], shared_events=[crowd])
+    assert metrics["num_nodes"] == 1000 and metrics["num_edges"] == 2000 * 1999 // 2 - 1000
+    assert metrics["average_degree"] == 999 and metrics["clustering_coefficient"] == 1.0
+
+
 def test_privacy_levels():
     """Test privacy level enum."""
     assert pt.PrivacyLevel.LOW.value == "low"